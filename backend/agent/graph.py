@@ -5,6 +5,7 @@ from langchain_openai import ChatOpenAI
 from langgraph.graph import StateGraph, END
 import inspect
 import copy
+import time
 
 from backend.agent.tools.analysis_tool import analyze_video
 from backend.agent.tools.find_clip_tool import find_best_clip
@@ -16,6 +17,7 @@ from backend.agent.tools.caption_tool import generate_share_caption
 from backend.agent.tools.share_tool import share_on_instagram
 from backend.agent.tools.metrics_tool import rank_brands
 from backend.agent.config import config_manager
+from backend.utils.metrics import AGENT_TOOL_LATENCY
 
 class AgentState(TypedDict):
     messages: Annotated[Sequence[BaseMessage], operator.add]
@@ -73,7 +75,7 @@ class AgentGraph:
         messages = state["messages"]
         # Build a guiding system prompt that helps the LLM parse user intent
         file_info = state.get("file_info") or {}
-        timeline = file_info.get("timeline_stats_data") or {}
+        timeline = (file_info.get("timeline_intervals") or {}).get("intervals") or {}
         available_brands = list(timeline.keys())
 
         guidance_lines = [
@@ -144,12 +146,17 @@ class AgentGraph:
                 if 'file_info' in sig.parameters and state.get('file_info'):
                     kwargs['file_info'] = state['file_info']
 
+                started = time.perf_counter()
                 try:
                     output = tool_to_call.invoke(kwargs)
+                    # Tools report failures as "Error..." strings
+                    status = 'error' if str(output).startswith('Error') else 'ok'
+                    AGENT_TOOL_LATENCY.observe(time.perf_counter() - started, tool=tool_name, status=status)
                     tool_outputs.append(
                         ToolMessage(content=str(output), tool_call_id=call['id'])
                     )
                 except Exception as e:
+                    AGENT_TOOL_LATENCY.observe(time.perf_counter() - started, tool=tool_name, status='error')
                     error_message = f"Error executing tool {tool_name}: {e}"
                     print(error_message)
                     tool_outputs.append(
@@ -4,16 +4,45 @@ import json
 import cv2
 import numpy as np
 
+from backend.core.detection_store import DetectionStore
+from backend.core.video_decoder import open_decoder
+
 
 def _normalize_brand(name: str) -> str:
 	return (name or "").strip().lower()
 
 
-def _load_detections_map(jsonl_path: str):
-	"""Load frame->detections list map from JSONL file."""
+def _load_detections_map(jsonl_path: str, frame_ranges=None):
+	"""
+	Load frame->detections list map from a detection store or JSONL file.
+	Only inferred frames are stored; a record stands for the frames since the previous
+	one (its weight, or the frame gap), so every frame it covers maps to its detections.
+	frame_ranges: optional (first, last) frame numbers (1-based, inclusive) to load; a
+	detection store reads only those frames, a JSONL file is still parsed in full.
+	"""
 	frame_to_dets = {}
 	if not os.path.exists(jsonl_path):
 		return frame_to_dets
+	ranges = frame_ranges or [(1, None)]
+
+	def add(frm, weight, dets):
+		for first, last in ranges:
+			end = frm if last is None else min(frm, last)
+			for covered in range(max(frm - weight + 1, first), end + 1):
+				frame_to_dets[covered] = dets
+
+	if os.path.isdir(jsonl_path):
+		store = DetectionStore(jsonl_path)
+		for first, last in ranges:
+			# Read up to the first record at or after the range's end, which covers its last frames
+			read_to = None
+			if last is not None:
+				position = int(np.searchsorted(store.index_frame, last, 'left'))
+				read_to = int(store.index_frame[position]) if position < len(store) else None
+			for record in store.records(first, read_to):
+				add(record['frame'], record.get('weight', 1), record['detections'])
+		return frame_to_dets
+	previous = 0
 	with open(jsonl_path, 'r') as f:
 		for line in f:
 			line = line.strip()
@@ -22,13 +51,20 @@ def _load_detections_map(jsonl_path: str):
 			try:
 				obj = json.loads(line)
 				frm = int(obj.get('frame', 0))
-				dets = obj.get('detections', []) or []
-				frame_to_dets[frm] = dets
+				weight = int(obj.get('weight') or (frm - previous))
+				previous = frm
+				if weight > 0:
+					add(frm, weight, obj.get('detections', []) or [])
 			except Exception:
 				continue
 	return frame_to_dets
 
 
+def _open_raw_video(path: str):
+	"""Open a result video through the configured decoder backend."""
+	return open_decoder(path, os.environ.get('SPONSORSPOTLIGHT_DECODER_BACKEND') or 'opencv')
+
+
 def _compute_color(brand: str) -> tuple:
     """Deterministic vibrant BGR color from brand name."""
     palette = [
@@ -44,10 +80,25 @@ def _compute_color(brand: str) -> tuple:
     return palette[h % len(palette)]
 
 
-def _draw_brand_overlays(frame: np.ndarray, detections: list, target_brand_norm: str) -> np.ndarray:
-    """Spotlight the target brand: dim background, highlight only its polygons/bboxes, add label."""
+def _overlay_scale(video_meta: dict, width: int, height: int):
+    """Factors mapping stored detection coordinates (source resolution) onto the decoded video."""
+    meta_w = float(video_meta.get('width') or 0)
+    meta_h = float(video_meta.get('height') or 0)
+    if meta_w <= 0 or meta_h <= 0 or width <= 0 or height <= 0:
+        return None
+    if int(meta_w) == width and int(meta_h) == height:
+        return None
+    return (width / meta_w, height / meta_h)
+
+
+def _draw_brand_overlays(frame: np.ndarray, detections: list, target_brand_norm: str, scale=None) -> np.ndarray:
+    """Spotlight the target brand: dim background, highlight only its polygons/bboxes, add label.
+
+    scale: optional (sx, sy) mapping detection coordinates onto this frame.
+    """
     if not detections:
         return frame
+    sx, sy = scale if scale is not None else (1.0, 1.0)
 
     H, W = frame.shape[:2]
     brand_mask = np.zeros((H, W), dtype=np.uint8)
@@ -62,13 +113,13 @@ def _draw_brand_overlays(frame: np.ndarray, detections: list, target_brand_norm:
         polygon = det.get('polygon') or []
         bbox = det.get('bbox') or []
         if polygon and isinstance(polygon, list) and len(polygon) == 4:
-            pts = np.array(polygon, dtype=np.int32)
+            pts = (np.array(polygon, dtype=np.float32) * np.array([sx, sy], dtype=np.float32)).astype(np.int32)
             pts[:, 0] = np.clip(pts[:, 0], 0, W - 1)
             pts[:, 1] = np.clip(pts[:, 1], 0, H - 1)
             cv2.fillConvexPoly(brand_mask, pts, 255)
             outlines.append((brand, 'poly', pts))
         elif bbox and len(bbox) == 4:
-            x1, y1, x2, y2 = map(int, bbox)
+            x1, y1, x2, y2 = int(bbox[0] * sx), int(bbox[1] * sy), int(bbox[2] * sx), int(bbox[3] * sy)
             x1, y1 = max(0, x1), max(0, y1)
             x2, y2 = min(W - 1, x2), min(H - 1, y2)
             cv2.rectangle(brand_mask, (x1, y1), (x2, y2), 255, thickness=-1)
@@ -123,7 +174,7 @@ def create_brand_specific_clip(brand_name: str, start_time: float, end_time: flo
 	"""
 	Create a brand-specific annotated clip from the RAW video:
 	- Trims raw.mp4 between start_time and end_time
-	- Overlays only the requested brand's detections using saved frame_detections.jsonl
+	- Overlays only the requested brand's detections using the saved frame detections
 	Returns the output clip path, or an error message string.
 	"""
 	raw_video = (
@@ -141,20 +192,22 @@ def create_brand_specific_clip(brand_name: str, start_time: float, end_time: flo
 	if end_time <= start_time:
 		return "Error: end_time must be greater than start_time."
 
-	# Load detections
-	frame_map = _load_detections_map(jsonl_path)
 	brand_norm = _normalize_brand(brand_name)
 
 	# Prepare IO
-	cap = cv2.VideoCapture(raw_video)
-	width = int(cap.get(cv2.CAP_PROP_FRAME_WIDTH))
-	height = int(cap.get(cv2.CAP_PROP_FRAME_HEIGHT))
+	decoder = _open_raw_video(raw_video)
+	width = decoder.width
+	height = decoder.height
 	codec = cv2.VideoWriter_fourcc(*'avc1')
+	overlay_scale = _overlay_scale(video_meta, width, height)
 
 	# Frame range (OpenCV frames start at 0, our jsonl frames start at 1)
 	start_frame = max(0, int(round(start_time * fps)))
 	end_frame = max(start_frame + 1, int(round(end_time * fps)))
-	cap.set(cv2.CAP_PROP_POS_FRAMES, start_frame)
+	decoder.seek(start_frame)
+
+	# Load the detections of the clip's frames only
+	frame_map = _load_detections_map(jsonl_path, [(start_frame + 1, end_frame)])
 
 	# Output path
 	result_dir = os.path.dirname(file_info.get('video_path') or raw_video)
@@ -163,19 +216,19 @@ def create_brand_specific_clip(brand_name: str, start_time: float, end_time: flo
 	out = cv2.VideoWriter(output_path, codec, fps, (width, height))
 
 	current_frame_idx = start_frame
+	frame = np.empty(decoder.frame_shape, dtype=np.uint8)
 	try:
 		while current_frame_idx < end_frame:
-			ret, frame = cap.read()
-			if not ret:
+			if not decoder.read_into(frame):
 				break
 			# jsonl frames are 1-based
 			frame_num_jsonl = current_frame_idx + 1
 			dets = frame_map.get(frame_num_jsonl, [])
-			annotated = _draw_brand_overlays(frame, dets, brand_norm)
+			annotated = _draw_brand_overlays(frame, dets, brand_norm, scale=overlay_scale)
 			out.write(annotated)
 			current_frame_idx += 1
 	finally:
-		cap.release()
+		decoder.close()
 		out.release()
 
 	if os.path.exists(output_path):
@@ -2,6 +2,8 @@ from langchain_core.tools import tool
 import subprocess
 import os
 
+from backend.utils.metrics import SUBPROCESSES
+
 @tool
 def create_video_clip(start_time: float, end_time: float, file_info: dict) -> str:
     """
@@ -37,6 +39,7 @@ def create_video_clip(start_time: float, end_time: float, file_info: dict) -> st
         print(f"Executing ffmpeg command: {' '.join(command)}")
         
         # Execute the command
+        SUBPROCESSES.inc(command='ffmpeg', purpose='clip')
         result = subprocess.run(command, check=True, capture_output=True, text=True)
         
         print("ffmpeg output:", result.stdout)
@@ -1,6 +1,8 @@
 from langchain_core.tools import tool
 import json
 
+from backend.core.interval_index import IntervalIndex
+
 @tool
 def find_best_clip(brand_name: str, file_info: dict) -> dict:
     """
@@ -8,7 +10,8 @@ def find_best_clip(brand_name: str, file_info: dict) -> dict:
     Use this tool to identify the most exciting clip for a given brand.
     Returns the start and end time of the best clip in seconds.
     """
-    timeline_stats = file_info.get('timeline_stats_data', {})
+    timeline_index = IntervalIndex.from_payload(file_info.get('timeline_intervals'))
+    timeline_stats = timeline_index.intervals
     video_metadata = file_info.get('video_metadata', {})
 
     # Match brand case-insensitively; rely on LLM to normalize phrasing (e.g., removing 'logo')
@@ -32,28 +35,16 @@ def find_best_clip(brand_name: str, file_info: dict) -> dict:
     if brand_key is None:
         return {"error": f"No detections found for brand: {brand_name}"}
 
-    brand_frames = timeline_stats.get(brand_key)
-    if not brand_frames:
+    if not timeline_index.runs(brand_key):
         return {"error": f"No detections found for brand: {brand_name}"}
 
     fps = video_metadata.get('fps', 25)
     clip_duration_frames = 10 * fps
-    
-    max_detections = 0
-    best_clip_start_frame = -1
 
-    # This is a simple sliding window approach. More complex logic could be added here.
-    for i in range(len(brand_frames)):
-        start_frame = brand_frames[i]
-        end_frame = start_frame + clip_duration_frames
-        
-        detections_in_window = sum(1 for frame in brand_frames if start_frame <= frame < end_frame)
-        
-        if detections_in_window > max_detections:
-            max_detections = detections_in_window
-            best_clip_start_frame = start_frame
+    # The 10-second window starting at a detected frame that holds the most detected frames
+    best_clip_start_frame, _ = timeline_index.best_window(brand_key, clip_duration_frames)
 
-    if best_clip_start_frame == -1:
+    if best_clip_start_frame is None:
         return {"error": "Could not determine the best clip."}
 
     best_clip_start_time = best_clip_start_frame / fps
@@ -10,6 +10,8 @@ from backend.agent.tools.create_brand_clip_tool import (
     _normalize_brand,
     _load_detections_map,
     _draw_brand_overlays,
+    _overlay_scale,
+    _open_raw_video,
 )
 
 
@@ -66,7 +68,7 @@ def create_brand_highlight_montage(brand_name: str, file_info: dict, desired_tot
     - Uses coverage_per_frame.json to score frames
     - Selects top non-overlapping windows of length `segment_seconds`
       until reaching ~`desired_total_duration`
-    - Annotates only that brand via saved frame_detections.jsonl
+    - Annotates only that brand via the saved frame detections
 
     Returns the output clip path or an error message.
     """
@@ -112,21 +114,27 @@ def create_brand_highlight_montage(brand_name: str, file_info: dict, desired_tot
         return f"Error: Could not find highlight windows for '{brand_name}'."
 
     # Prepare IO
-    cap = cv2.VideoCapture(raw_video)
-    width = int(cap.get(cv2.CAP_PROP_FRAME_WIDTH))
-    height = int(cap.get(cv2.CAP_PROP_FRAME_HEIGHT))
+    decoder = _open_raw_video(raw_video)
+    width = decoder.width
+    height = decoder.height
     codec = cv2.VideoWriter_fourcc(*'avc1')
+    overlay_scale = _overlay_scale(video_meta, width, height)
     out_dir = os.path.dirname(file_info.get('video_path') or raw_video)
     brand_sanitized = ''.join(c for c in brand_name if c.isalnum() or c in ('-', '_')) or 'brand'
     out_path = os.path.join(out_dir, f"highlight_{brand_sanitized}_{int(desired_total_duration)}s.mp4")
     writer = cv2.VideoWriter(out_path, codec, fps, (width, height))
 
-    # Load detections
-    frame_map = _load_detections_map(detections_path)
+    # Load the detections of the selected windows only (jsonl frames are 1-based)
+    frame_ranges = []
+    for st, et in windows:
+        start_frame = max(0, int(round(st * fps)))
+        frame_ranges.append((start_frame + 1, max(start_frame + 1, int(round(et * fps)))))
+    frame_map = _load_detections_map(detections_path, frame_ranges)
 
     # Write windows sequentially; insert short black spacer between segments for visible transition
     spacer_frames = int(max(2, fps * 0.12))  # ~120ms spacer
     black = np.zeros((height, width, 3), dtype=np.uint8)
+    frame = np.empty(decoder.frame_shape, dtype=np.uint8)
 
     try:
         prev_end_frame = None
@@ -143,21 +151,22 @@ def create_brand_highlight_montage(brand_name: str, file_info: dict, desired_tot
                     for _ in range(spacer_frames):
                         writer.write(black)
 
-            cap.set(cv2.CAP_PROP_POS_FRAMES, start_frame)
+            # Contiguous segments continue decoding without a seek
+            if decoder.position != start_frame:
+                decoder.seek(start_frame)
             current = start_frame
             while current < end_frame:
-                ret, frame = cap.read()
-                if not ret:
+                if not decoder.read_into(frame):
                     break
                 frame_num_jsonl = current + 1
                 dets = frame_map.get(frame_num_jsonl, [])
-                annotated = _draw_brand_overlays(frame, dets, brand_norm)
+                annotated = _draw_brand_overlays(frame, dets, brand_norm, scale=overlay_scale)
                 writer.write(annotated)
                 current += 1
 
             prev_end_frame = end_frame
     finally:
-        cap.release()
+        decoder.close()
         writer.release()
 
     if os.path.exists(out_path):
@@ -1,4 +1,4 @@
-from flask import Flask, render_template, request, jsonify, redirect, url_for, flash, session
+from flask import Flask, render_template, request, jsonify, redirect, url_for, flash, session, Response, stream_with_context
 import os
 import uuid
 from werkzeug.utils import secure_filename
@@ -7,8 +7,16 @@ import time
 import json
 
 from backend.core.inference_manager import InferenceManager
+from backend.core.stream_monitor import StreamMonitor
+from backend.core.partial_results import is_partial, load_partial_intervals, load_partial_series
+from backend.core.reaggregation import REAGGREGATED_DIR, reaggregate, variant_id
+from backend.core.detection_store import DetectionStore, STORE_DIR, detections_path
+from backend.core.interval_index import load_intervals
+from backend.core.threshold_sweep import SWEEP_FILE, sweep_detections
 from backend.utils.progress_manager import ProgressManager
 from backend.utils.agent_task_manager import AgentTaskManager
+from backend.utils.change_stream import sse_events
+from backend.utils.metrics import registry as metrics_registry, RESULT_CACHE, SUBPROCESSES, UPLOAD_BYTES, UPLOADS
 import threading
 import base64
 import subprocess
@@ -47,6 +55,32 @@ print(f"Results directory: {RESULTS_DIR}")
 progress_manager = ProgressManager()
 inference_manager = InferenceManager(progress_manager)
 agent_task_manager = AgentTaskManager()
+stream_monitor = StreamMonitor(inference_manager)
+
+# Minimum seconds between two pushes to one event stream client
+SSE_MIN_INTERVAL = float(os.environ.get('SPONSORSPOTLIGHT_SSE_MIN_INTERVAL', '0.5'))
+
+def _is_final_progress(progress):
+    return progress.get('stage') in ('COMPLETE', 'ERROR')
+
+def event_stream_response(events):
+    """Wrap an SSE generator in a streaming response"""
+    return Response(stream_with_context(events), mimetype='text/event-stream',
+                    headers={'Cache-Control': 'no-cache', 'X-Accel-Buffering': 'no'})
+
+def _collect_service_metrics():
+    """Scrape-time metrics of the shared stream batching server"""
+    batch_server = stream_monitor.batch_server
+    if batch_server is not None:
+        stats = batch_server.get_stats()
+        yield ('sponsorspotlight_batch_queue_depth', 'gauge', 'Frames waiting for the shared batch server',
+               [((), stats['pending'])])
+        yield ('sponsorspotlight_batch_frames_total', 'counter', 'Frames inferred by the shared batch server',
+               [((), stats['frames'])])
+        yield ('sponsorspotlight_batches_total', 'counter', 'Batches run by the shared batch server',
+               [((), stats['batches'])])
+
+metrics_registry.add_collector(_collect_service_metrics)
 
 def allowed_file(filename):
     return '.' in filename and filename.rsplit('.', 1)[1].lower() in app.config['ALLOWED_EXTENSIONS']
@@ -80,7 +114,8 @@ def upload_url():
     result_dir = os.path.join(app.config['RESULTS_FOLDER'], file_hash)
     output_path = os.path.join(result_dir, 'output.mp4')
     stats_path = os.path.join(result_dir, 'stats.json')
-    if os.path.exists(output_path) and os.path.exists(stats_path):
+    if os.path.exists(output_path) and os.path.exists(stats_path) and not is_partial(result_dir):
+        RESULT_CACHE.inc(result='hit')
         session['file_info'] = {
             'path': url,
             'type': file_type,
@@ -90,6 +125,8 @@ def upload_url():
         return jsonify({'redirect': url_for('show_results', file_hash=file_hash)})
 
     # Otherwise, set session and start processing
+    # The job publishes its cost estimate in the progress details once it has probed the stream
+    RESULT_CACHE.inc(result='miss')
     session['file_info'] = {
         'path': url,
         'type': file_type,
@@ -113,6 +150,7 @@ def preview_frame():
             '-q:v', '2',
             '-f', 'image2pipe', '-vcodec', 'mjpeg', '-'
         ]
+        SUBPROCESSES.inc(command='ffmpeg', purpose='preview')
         proc = subprocess.Popen(cmd, stdout=subprocess.PIPE, stderr=subprocess.PIPE)
         img_bytes, err = proc.communicate(timeout=20)
         if proc.returncode != 0 or not img_bytes:
@@ -153,8 +191,10 @@ def upload_file():
             file_type = 'image'
         else:
             file_type = 'video'
+        UPLOADS.inc(type=file_type)
+        UPLOAD_BYTES.inc(os.path.getsize(file_path), type=file_type)
         
-        # Store file info in session
+        # Store file info in session; the job publishes the expected processing cost of videos
         session['file_info'] = {
             'path': file_path,
             'type': file_type,
@@ -168,6 +208,26 @@ def upload_file():
     flash('File type not allowed')
     return redirect(url_for('index'))
 
+@app.route('/api/estimate')
+def get_estimate():
+    """
+    Expected processing time and CPU-seconds of the session's video: as published by its
+    running job, or probed from the session's own stream URL when given as ?url=
+    """
+    file_info = session.get('file_info') or {}
+    url = request.args.get('url')
+    if url:
+        if url != file_info.get('path') or not inference_manager._is_url(url):
+            return jsonify({'error': "Only the session's stream URL can be estimated"}), 403
+        estimate = inference_manager.estimate_job(url)
+    elif file_info.get('hash') and inference_manager.current_job == file_info['hash']:
+        estimate = progress_manager.get_progress()['details'].get('estimate')
+    else:
+        estimate = None
+    if estimate is None:
+        return jsonify({'error': 'No estimate available'}), 404
+    return jsonify(estimate)
+
 @app.route('/process')
 def process_file():
     file_info = session.get('file_info')
@@ -190,6 +250,124 @@ def get_progress():
     progress_data = progress_manager.get_progress()
     return jsonify(progress_data)
 
+@app.route('/metrics')
+def metrics():
+    """Prometheus metrics: throughput, queue depths, latencies, uploads, subprocesses and cache lookups"""
+    return Response(metrics_registry.render(), mimetype='text/plain; version=0.0.4')
+
+@app.route('/api/monitor_streams', methods=['POST'])
+def monitor_streams():
+    """API endpoint to start monitoring several streams concurrently on the shared model"""
+    data = request.get_json(silent=True) or {}
+    urls = data.get('urls') or []
+    if isinstance(urls, str):
+        urls = [urls]
+    if not urls:
+        return jsonify({'error': 'No URLs provided'}), 400
+
+    jobs = []
+    try:
+        for url in urls:
+            job_id = stream_monitor.start_stream(url, get_url_hash(url))
+            jobs.append({'job_id': job_id, 'url': url})
+    except Exception as e:
+        return jsonify({'error': f'Failed to start monitoring: {str(e)}', 'jobs': jobs}), 500
+    return jsonify({'jobs': jobs})
+
+@app.route('/api/monitor_streams', methods=['GET'])
+def monitor_streams_status():
+    """API endpoint to get the progress of all monitored streams"""
+    return jsonify(stream_monitor.list_status())
+
+@app.route('/api/monitor_streams/<job_id>', methods=['GET'])
+def monitor_stream_status(job_id):
+    """API endpoint to get the progress of one monitored stream"""
+    status = stream_monitor.get_status(job_id)
+    if status is None:
+        return jsonify({'error': 'Job not found'}), 404
+    return jsonify(status)
+
+@app.route('/api/monitor_streams/<job_id>/stop', methods=['POST'])
+def stop_monitor_stream(job_id):
+    """API endpoint to stop a monitored stream; its results are written when it finishes"""
+    if not stream_monitor.stop_stream(job_id):
+        return jsonify({'error': 'Job not found'}), 404
+    return jsonify({'job_id': job_id, 'stopping': True})
+
+@app.route('/api/live_stats/<job_id>')
+def get_live_stats(job_id):
+    """API endpoint to get rolling 1/5/15-minute brand stats of a stream while it runs"""
+    live_stats = stream_monitor.get_live_stats(job_id)
+    if live_stats is None and inference_manager.current_job == job_id and inference_manager.live_stats is not None:
+        live_stats = inference_manager.live_stats.snapshot()
+    if live_stats is None:
+        return jsonify({'error': 'Live statistics not found'}), 404
+    return jsonify(live_stats)
+
+def _job_manager(job_id):
+    """InferenceManager currently running job_id (the main job or a monitored stream), or None"""
+    manager = stream_monitor.get_manager(job_id)
+    if manager is None and inference_manager.current_job == job_id:
+        manager = inference_manager
+    return manager
+
+@app.route('/api/profile/<job_id>', methods=['POST'])
+def start_profile(job_id):
+    """
+    API endpoint to profile a running job for N seconds and/or N frames. JSON body:
+    seconds, frames, modes (any of sample, cprofile, tracemalloc; default sample).
+    Dumps are written to the job's result directory under profiles/.
+    """
+    manager = _job_manager(job_id)
+    if manager is None:
+        return jsonify({'error': 'Job not found'}), 404
+    data = request.get_json(silent=True) or {}
+    modes = data.get('modes') or ['sample']
+    if isinstance(modes, str):
+        modes = [m.strip() for m in modes.split(',') if m.strip()]
+    try:
+        profiler = manager.attach_profiler(modes, seconds=data.get('seconds'), frames=data.get('frames'))
+    except ValueError as e:
+        return jsonify({'error': str(e)}), 400
+    except RuntimeError as e:
+        return jsonify({'error': str(e)}), 409
+    return jsonify({'job_id': job_id, 'profile': profiler.status()})
+
+@app.route('/api/profile/<job_id>', methods=['GET'])
+def profile_status(job_id):
+    """API endpoint to get the state and written files of a job's latest profile"""
+    manager = _job_manager(job_id)
+    if manager is None or manager.profiler is None:
+        return jsonify({'error': 'Profile not found'}), 404
+    return jsonify({'job_id': job_id, 'profile': manager.profiler.status()})
+
+@app.route('/api/profile/<job_id>/stop', methods=['POST'])
+def stop_profile(job_id):
+    """API endpoint to end a job's profile early and write its dumps"""
+    manager = _job_manager(job_id)
+    if manager is None or manager.profiler is None:
+        return jsonify({'error': 'Profile not found'}), 404
+    manager.profiler.stop()
+    return jsonify({'job_id': job_id, 'profile': manager.profiler.status()})
+
+@app.route('/progress/stream')
+def stream_progress():
+    """Server-Sent Events stream of the processing progress, ending at completion or error"""
+    return event_stream_response(sse_events(
+        progress_manager.changes, progress_manager.get_progress,
+        is_final=_is_final_progress, min_interval=SSE_MIN_INTERVAL
+    ))
+
+@app.route('/api/monitor_streams/<job_id>/stream')
+def stream_monitor_progress(job_id):
+    """Server-Sent Events stream of a monitored stream job's progress"""
+    tracker = stream_monitor.get_progress_tracker(job_id)
+    if tracker is None:
+        return jsonify({'error': 'Job not found'}), 404
+    return event_stream_response(sse_events(
+        tracker.changes, tracker.get_progress, is_final=_is_final_progress, min_interval=SSE_MIN_INTERVAL
+    ))
+
 @app.route('/results/<file_hash>')
 def show_results(file_hash):
     """Show the results page for a processed file"""
@@ -238,10 +416,74 @@ def show_dashboard(file_hash):
                           file_hash=file_hash,
                           original_name=file_info['original_name'])
 
+def _result_dir(file_hash):
+    """Result directory of a processed file, or of a re-aggregated variant of it (?variant=)"""
+    result_dir = os.path.join(app.config['RESULTS_FOLDER'], file_hash)
+    variant = request.args.get('variant')
+    if variant and variant.isalnum():
+        return os.path.join(result_dir, REAGGREGATED_DIR, variant)
+    return result_dir
+
+@app.route('/api/reaggregate/<file_hash>', methods=['POST'])
+def reaggregate_stats(file_hash):
+    """
+    API endpoint to rebuild a processed video's statistics and per-frame series from its
+    stored detections with other post-processing parameters (JSON body: min_detections,
+    min_confidence, prominence_weights, prominence_high_threshold, logo_groups). The
+    outputs are served by the stats/timeline/series endpoints with ?variant=, or replace
+    the file's own outputs with "apply": true.
+    """
+    data = request.get_json(silent=True) or {}
+    if not isinstance(data, dict):
+        return jsonify({'error': 'Expected a JSON object'}), 400
+    apply = bool(data.pop('apply', False))
+    result_dir = os.path.join(app.config['RESULTS_FOLDER'], file_hash)
+    try:
+        variant = variant_id(data)
+        stats = reaggregate(result_dir, data, output_dir=result_dir if apply else None)
+    except ValueError as e:
+        return jsonify({'error': str(e)}), 400
+    except FileNotFoundError:
+        return jsonify({'error': 'Stored detections not found'}), 404
+    except RuntimeError as e:
+        return jsonify({'error': str(e)}), 409
+    return jsonify({'file_hash': file_hash, 'variant': None if apply else variant, 'stats': stats})
+
+@app.route('/api/threshold_sweep/<file_hash>', methods=['POST'])
+def run_threshold_sweep(file_hash):
+    """
+    API endpoint to compute per-brand stats for several confidence thresholds and
+    min-detection filters (JSON body: thresholds, min_detections) in one pass over a
+    processed video's stored detections
+    """
+    data = request.get_json(silent=True) or {}
+    if not isinstance(data, dict):
+        return jsonify({'error': 'Expected a JSON object'}), 400
+    result_dir = os.path.join(app.config['RESULTS_FOLDER'], file_hash)
+    try:
+        sweep = sweep_detections(result_dir, data.get('thresholds'), data.get('min_detections'))
+    except ValueError as e:
+        return jsonify({'error': str(e)}), 400
+    except FileNotFoundError:
+        return jsonify({'error': 'Stored detections not found'}), 404
+    except RuntimeError as e:
+        return jsonify({'error': str(e)}), 409
+    return jsonify(sweep)
+
+@app.route('/api/threshold_sweep/<file_hash>', methods=['GET'])
+def get_threshold_sweep(file_hash):
+    """API endpoint to get the threshold x brand x metric stats matrix of a processed video"""
+    sweep_path = os.path.join(app.config['RESULTS_FOLDER'], file_hash, SWEEP_FILE)
+    if not os.path.exists(sweep_path):
+        return jsonify({'error': 'Threshold sweep not found'}), 404
+    with open(sweep_path, 'r') as f:
+        sweep = f.read()
+    return sweep, 200, {'Content-Type': 'application/json'}
+
 @app.route('/api/stats/<file_hash>')
 def get_stats(file_hash):
-    """API endpoint to get the logo statistics for a processed file"""
-    stats_path = os.path.join(app.config['RESULTS_FOLDER'], file_hash, 'stats.json')
+    """API endpoint to get the logo statistics for a processed file (flagged "partial" while processing)"""
+    stats_path = os.path.join(_result_dir(file_hash), 'stats.json')
     
     if not os.path.exists(stats_path):
         return jsonify({'error': 'Statistics not found'}), 404
@@ -251,23 +493,38 @@ def get_stats(file_hash):
     
     return stats, 200, {'Content-Type': 'application/json'}
 
+@app.route('/api/timeline_intervals/<file_hash>')
+def get_timeline_intervals(file_hash):
+    """API endpoint to get the per-brand (start_frame, end_frame) runs of frames present"""
+    result_dir = _result_dir(file_hash)
+    if is_partial(result_dir):
+        return jsonify(dict(load_partial_intervals(result_dir).to_payload(), partial=True))
+    index = load_intervals(result_dir)
+    if index is None:
+        return jsonify({'error': 'Timeline statistics not found'}), 404
+    return jsonify(index.to_payload())
+
 @app.route('/api/timeline_stats/<file_hash>')
 def get_timeline_stats(file_hash):
-    """API endpoint to get the frame-by-frame timeline statistics"""
-    timeline_stats_path = os.path.join(app.config['RESULTS_FOLDER'], file_hash, 'timeline_stats.json')
-    
-    if not os.path.exists(timeline_stats_path):
+    """API endpoint to get the frame-by-frame timeline statistics, expanded from the interval index"""
+    result_dir = _result_dir(file_hash)
+    if is_partial(result_dir):
+        # Plain {logo: frames} payload, so the partial flag goes in a header
+        response = jsonify(load_partial_intervals(result_dir).to_timeline())
+        response.headers['X-Partial-Results'] = 'true'
+        return response
+    index = load_intervals(result_dir)
+    if index is None:
         return jsonify({'error': 'Timeline statistics not found'}), 404
-        
-    with open(timeline_stats_path, 'r') as f:
-        timeline_stats = f.read()
-        
-    return timeline_stats, 200, {'Content-Type': 'application/json'}
+    return jsonify(index.to_timeline())
 
 @app.route('/api/coverage_per_frame/<file_hash>')
 def get_coverage_per_frame(file_hash):
     """API endpoint to get per-frame coverage percentages per logo"""
-    coverage_path = os.path.join(app.config['RESULTS_FOLDER'], file_hash, 'coverage_per_frame.json')
+    result_dir = _result_dir(file_hash)
+    if is_partial(result_dir):
+        return jsonify(load_partial_series(result_dir, 'coverage'))
+    coverage_path = os.path.join(result_dir, 'coverage_per_frame.json')
     if not os.path.exists(coverage_path):
         return jsonify({'error': 'Coverage per frame not found'}), 404
     with open(coverage_path, 'r') as f:
@@ -277,13 +534,40 @@ def get_coverage_per_frame(file_hash):
 @app.route('/api/prominence_per_frame/<file_hash>')
 def get_prominence_per_frame(file_hash):
     """API endpoint to get per-frame prominence scores per logo if available"""
-    prom_path = os.path.join(app.config['RESULTS_FOLDER'], file_hash, 'prominence_per_frame.json')
+    result_dir = _result_dir(file_hash)
+    if is_partial(result_dir):
+        return jsonify(load_partial_series(result_dir, 'prominence'))
+    prom_path = os.path.join(result_dir, 'prominence_per_frame.json')
     if not os.path.exists(prom_path):
         return jsonify({'error': 'Prominence per frame not found'}), 404
     with open(prom_path, 'r') as f:
         prom = f.read()
     return prom, 200, {'Content-Type': 'application/json'}
 
+@app.route('/api/frame_detections/<file_hash>')
+def get_frame_detections(file_hash):
+    """API endpoint exporting the stored per-frame detections as JSONL (?start=&end= for a frame range)"""
+    path = detections_path(os.path.join(app.config['RESULTS_FOLDER'], file_hash))
+    if not os.path.exists(path):
+        return jsonify({'error': 'Frame detections not found'}), 404
+    start = request.args.get('start', type=int)
+    end = request.args.get('end', type=int)
+    if os.path.basename(path) == STORE_DIR:
+        records = DetectionStore(path).records(start, end)
+        lines = (json.dumps(record) + "\n" for record in records)
+    else:
+        # Results from before the detection store keep their JSONL
+        def lines():
+            with open(path) as f:
+                for line in f:
+                    if line.strip() and (start is not None or end is not None):
+                        frame = json.loads(line)["frame"]
+                        if (start is not None and frame < start) or (end is not None and frame > end):
+                            continue
+                    yield line
+        lines = lines()
+    return Response(stream_with_context(lines), mimetype='application/x-ndjson')
+
 @app.route('/api/agent_query/<file_hash>', methods=['POST'])
 def agent_query(file_hash):
     """API endpoint to handle agentic queries"""
@@ -302,25 +586,26 @@ def agent_query(file_hash):
     with open(stats_path, 'r') as f:
         stats_data = json.load(f)
     
-    # Load the timeline stats data
-    timeline_stats_path = os.path.join(app.config['RESULTS_FOLDER'], file_hash, 'timeline_stats.json')
-    if not os.path.exists(timeline_stats_path):
-        return jsonify({'error': 'Timeline statistics not found for this file'}), 404
-    
-    with open(timeline_stats_path, 'r') as f:
-        timeline_stats_data = json.load(f)
+    # Load the timeline runs (assembled from partial snapshots while still processing)
+    result_dir = os.path.join(app.config['RESULTS_FOLDER'], file_hash)
+    if is_partial(result_dir):
+        timeline_index = load_partial_intervals(result_dir)
+    else:
+        timeline_index = load_intervals(result_dir)
+        if timeline_index is None:
+            return jsonify({'error': 'Timeline statistics not found for this file'}), 404
         
     # Get the video path for the share node
     video_path = os.path.join(app.config['RESULTS_FOLDER'], file_hash, 'output.mp4')
 
     # Prepare file info for the agent (include video metadata for precise FPS)
     video_metadata = stats_data.get('video_metadata') or stats_data.get('video_meta') or {}
-    frame_detections_path = os.path.join(app.config['RESULTS_FOLDER'], file_hash, 'frame_detections.jsonl')
+    frame_detections_path = detections_path(os.path.join(app.config['RESULTS_FOLDER'], file_hash))
     raw_video_path = os.path.join(app.config['RESULTS_FOLDER'], file_hash, 'raw.mp4')
     coverage_per_frame_path = os.path.join(app.config['RESULTS_FOLDER'], file_hash, 'coverage_per_frame.json')
     file_info = {
         'stats_data': stats_data,
-        'timeline_stats_data': timeline_stats_data,
+        'timeline_intervals': timeline_index.to_payload(),
         'video_path': video_path,
         'video_metadata': video_metadata,
         'frame_detections_path': frame_detections_path,
@@ -353,6 +638,18 @@ def agent_task_status(task_id):
     status = agent_task_manager.get_task_status(task_id)
     return jsonify(status)
 
+@app.route('/api/agent_task_status/<task_id>/stream')
+def stream_agent_task_status(task_id):
+    """Server-Sent Events stream of an agent task's status, ending when it completes"""
+    notifier = agent_task_manager.get_notifier(task_id)
+    if notifier is None:
+        return jsonify({'status': 'not_found', 'message': 'Task not found.'}), 404
+    return event_stream_response(sse_events(
+        notifier, lambda: agent_task_manager.get_task_status(task_id), event='status',
+        is_final=lambda status: status.get('is_complete') or status.get('status') == 'not_found',
+        min_interval=SSE_MIN_INTERVAL
+    ))
+
 
 if __name__ == '__main__':
     app.run(debug=True, host='0.0.0.0', port=5005)
\ No newline at end of file
@@ -0,0 +1,119 @@
+import queue
+import threading
+import time
+from concurrent.futures import Future
+
+
+class BatchInferenceServer:
+    """
+    Shares one model between many concurrent jobs by batching their frames.
+
+    Jobs submit single frames and get a Future back; a worker thread collects
+    pending frames into batches of up to max_batch_size, waiting at most max_wait
+    seconds after the first frame of a batch, runs one model call per batch and
+    resolves each Future with that frame's results (a one-element list, matching
+    what a single-frame model call returns).
+    """
+
+    def __init__(self, model, max_batch_size=8, max_wait=0.02, imgsz=None, conf=None):
+        """Wrap a loaded model; imgsz and the confidence threshold conf are passed to the model when set"""
+        self.model = model
+        self.max_batch_size = max(1, int(max_batch_size))
+        self.max_wait = max(0.0, float(max_wait))
+        self.imgsz = imgsz
+        self.conf = conf
+        self._requests = queue.Queue()
+        self._stop = threading.Event()
+        self._thread = None
+        self._stats_lock = threading.Lock()
+        self.batches = 0
+        self.frames = 0
+
+    def start(self):
+        """Start the batching worker thread"""
+        if self._thread is None:
+            self._thread = threading.Thread(target=self._run)
+            self._thread.daemon = True
+            self._thread.start()
+        return self
+
+    def submit(self, frame):
+        """Queue a frame for inference and return a Future of its results"""
+        future = Future()
+        if self._stop.is_set():
+            future.set_exception(RuntimeError("Batch inference server is stopped"))
+            return future
+        self._requests.put((frame, future))
+        return future
+
+    def predict(self, frame):
+        """Run a frame through the shared model, blocking until its batch completes"""
+        return self.submit(frame).result()
+
+    def get_stats(self):
+        """Batches run, frames inferred and the mean batch size so far"""
+        with self._stats_lock:
+            return {
+                "batches": self.batches,
+                "frames": self.frames,
+                "mean_batch_size": round(self.frames / self.batches, 2) if self.batches else 0.0,
+                "pending": self._requests.qsize()
+            }
+
+    def _collect_batch(self):
+        """Block for the first request, then gather more until the batch is full or the deadline passes"""
+        first = self._requests.get()
+        if first is None:
+            return None
+        batch = [first]
+        deadline = time.monotonic() + self.max_wait
+        while len(batch) < self.max_batch_size:
+            remaining = deadline - time.monotonic()
+            try:
+                item = self._requests.get(timeout=remaining) if remaining > 0 else self._requests.get_nowait()
+            except queue.Empty:
+                break
+            if item is None:
+                # Stop after this batch
+                self._stop.set()
+                break
+            batch.append(item)
+        return batch
+
+    def _run(self):
+        while not self._stop.is_set():
+            batch = self._collect_batch()
+            if batch is None:
+                break
+            frames = [frame for frame, _ in batch]
+            kwargs = {}
+            if self.imgsz:
+                kwargs['imgsz'] = self.imgsz
+            if self.conf:
+                kwargs['conf'] = self.conf
+            try:
+                results = self.model(frames, **kwargs)
+            except Exception as e:
+                for _, future in batch:
+                    future.set_exception(e)
+                continue
+            for (_, future), result in zip(batch, results):
+                future.set_result([result])
+            with self._stats_lock:
+                self.batches += 1
+                self.frames += len(batch)
+        # Fail anything still queued so no job waits forever
+        while True:
+            try:
+                item = self._requests.get_nowait()
+            except queue.Empty:
+                break
+            if item is not None:
+                item[1].set_exception(RuntimeError("Batch inference server is stopped"))
+
+    def close(self):
+        """Stop the worker after the batch in progress"""
+        self._stop.set()
+        self._requests.put(None)
+        if self._thread is not None:
+            self._thread.join(timeout=10)
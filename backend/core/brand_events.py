@@ -0,0 +1,228 @@
+import json
+import queue
+import threading
+import time
+
+import requests
+
+
+class BrandEventDetector:
+    """
+    Turns per-frame brand presence into debounced brand_enter / brand_exit events.
+
+    A brand enters once it has been on screen for min_seconds and exits once it has
+    been absent for more than gap_seconds; shorter blips and gaps are ignored. Events
+    carry stream timestamps plus the peak coverage and prominence of the appearance.
+    """
+
+    def __init__(self, fps, emit, min_seconds=0.5, gap_seconds=1.0, job_id=None):
+        """emit(event) is called for every event, from the processing thread"""
+        self.frame_time = 1 / fps if fps > 0 else 0
+        self.emit = emit
+        self.min_seconds = min_seconds
+        self.gap_seconds = gap_seconds
+        self.job_id = job_id
+        # Open appearances per brand
+        self.active = {}
+
+    def _event(self, kind, brand, state):
+        start_frame, end_frame = state["start_frame"], state["last_frame"]
+        return {
+            "event": kind,
+            "brand": brand,
+            "job_id": self.job_id,
+            "start_frame": start_frame,
+            "end_frame": end_frame,
+            "start_time": round((start_frame - 1) * self.frame_time, 3),
+            "end_time": round(end_frame * self.frame_time, 3),
+            "duration": round((end_frame - start_frame + 1) * self.frame_time, 3),
+            "peak_coverage": round(state["peak_coverage"] * 100.0, 3),
+            "peak_prominence": round(state["peak_prominence"] * 100.0, 2),
+            "emitted_at": time.time()
+        }
+
+    def add_frame(self, frame_number, summary, weight=1):
+        """
+        Update with one inferred frame. frame_number is the last source frame it covers,
+        summary the per-brand frame summary from ExposureStatsAccumulator.add_frame.
+        """
+        first_frame = frame_number - weight + 1
+        for brand, values in summary.items():
+            state = self.active.get(brand)
+            if state is None:
+                state = self.active[brand] = {
+                    "start_frame": first_frame,
+                    "last_frame": frame_number,
+                    "confirmed": False,
+                    "peak_coverage": 0.0,
+                    "peak_prominence": 0.0
+                }
+            state["last_frame"] = frame_number
+            state["peak_coverage"] = max(state["peak_coverage"], values.get("coverage", 0.0))
+            state["peak_prominence"] = max(state["peak_prominence"], values.get("prominence", 0.0))
+            if not state["confirmed"] and \
+                    (frame_number - state["start_frame"] + 1) * self.frame_time >= self.min_seconds:
+                state["confirmed"] = True
+                self.emit(self._event("brand_enter", brand, state))
+
+        for brand in [b for b in self.active if b not in summary]:
+            state = self.active[brand]
+            if (frame_number - state["last_frame"]) * self.frame_time > self.gap_seconds:
+                del self.active[brand]
+                if state["confirmed"]:
+                    self.emit(self._event("brand_exit", brand, state))
+
+    def finish(self):
+        """Close all open appearances at the end of the video or stream"""
+        for brand, state in list(self.active.items()):
+            if state["confirmed"]:
+                self.emit(self._event("brand_exit", brand, state))
+        self.active = {}
+
+
+class JsonlEventSink:
+    """Writes events to a JSONL file, one per line"""
+
+    def __init__(self, path):
+        self.path = path
+        self._file = open(path, 'w')
+
+    def send(self, event):
+        self._file.write(json.dumps(event) + "\n")
+        self._file.flush()
+
+    def close(self):
+        self._file.close()
+
+
+class WebhookEventSink:
+    """POSTs each event as JSON to an HTTP endpoint"""
+
+    def __init__(self, url, timeout=5):
+        self.url = url
+        self.timeout = timeout
+        self._session = requests.Session()
+
+    def send(self, event):
+        response = self._session.post(self.url, json=event, timeout=self.timeout)
+        response.raise_for_status()
+
+    def close(self):
+        self._session.close()
+
+
+class QueueEventSink:
+    """Puts events on an in-process queue.Queue for other threads to consume"""
+
+    def __init__(self, event_queue):
+        self.queue = event_queue
+
+    def send(self, event):
+        self.queue.put(event)
+
+    def close(self):
+        pass
+
+
+class _SinkWorker:
+    """Queue and delivery thread of one sink, dropping the oldest events when full"""
+
+    def __init__(self, sink, max_pending):
+        self.sink = sink
+        self.dropped = 0
+        self.delivered = 0
+        self._queue = queue.Queue(maxsize=max(1, int(max_pending)))
+        self._thread = threading.Thread(target=self._run)
+        self._thread.daemon = True
+        self._thread.start()
+
+    def put(self, event):
+        """Queue an event without blocking, dropping the oldest one when full"""
+        while True:
+            try:
+                self._queue.put_nowait(event)
+                return
+            except queue.Full:
+                try:
+                    self._queue.get_nowait()
+                    self.dropped += 1
+                except queue.Empty:
+                    pass
+
+    def pending(self):
+        return self._queue.qsize()
+
+    def _run(self):
+        while True:
+            event = self._queue.get()
+            if event is None:
+                break
+            try:
+                self.sink.send(event)
+            except Exception as e:
+                print(f"Event sink {type(self.sink).__name__} failed: {e}")
+            self.delivered += 1
+        try:
+            self.sink.close()
+        except Exception:
+            pass
+
+    def finish(self, deadline):
+        """Queue the end marker, waiting for room until deadline (None: indefinitely)"""
+        try:
+            self._queue.put(None, timeout=_remaining(deadline))
+        except queue.Full:
+            # Sink too slow to make room in time: drop the oldest event for the end marker
+            self.put(None)
+
+    def join(self, deadline):
+        self._thread.join(timeout=_remaining(deadline))
+
+
+def _remaining(deadline):
+    """Seconds left until a time.monotonic() deadline, or None without one"""
+    return max(0.0, deadline - time.monotonic()) if deadline is not None else None
+
+
+class EventDispatcher:
+    """
+    Delivers events to sinks from background threads so slow sinks never block
+    the frame loop. Each sink has its own queue and thread, so a slow sink (e.g. an
+    unreachable webhook) does not delay the others. When more than max_pending events
+    are waiting for a sink, its oldest are dropped and counted.
+    """
+
+    def __init__(self, sinks, max_pending=1000):
+        self.sinks = list(sinks)
+        self._workers = [_SinkWorker(sink, max_pending) for sink in self.sinks]
+
+    @property
+    def dropped(self):
+        """Events dropped, summed over the sinks"""
+        return sum(worker.dropped for worker in self._workers)
+
+    @property
+    def delivered(self):
+        """Events delivered, summed over the sinks"""
+        return sum(worker.delivered for worker in self._workers)
+
+    def emit(self, event):
+        """Queue an event for delivery to every sink without blocking"""
+        for worker in self._workers:
+            worker.put(event)
+
+    def pending(self):
+        """Number of events waiting for delivery to the slowest sink"""
+        return max((worker.pending() for worker in self._workers), default=0)
+
+    def close(self, timeout=None):
+        """
+        Deliver the pending events, then close the sinks. Waits at most `timeout` seconds
+        in total across the sinks; anything still pending after that is delivered in the
+        background.
+        """
+        deadline = time.monotonic() + timeout if timeout is not None else None
+        for worker in self._workers:
+            worker.finish(deadline)
+        for worker in self._workers:
+            worker.join(deadline)
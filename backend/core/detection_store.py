@@ -0,0 +1,229 @@
+import os
+import json
+
+import numpy as np
+
+from backend.utils.atomic_file import atomic_write
+
+# Store directory in a job's result directory, and the JSONL it replaces (still readable and exportable)
+STORE_DIR = 'detections'
+JSONL_FILE = 'frame_detections.jsonl'
+FORMAT_VERSION = 1
+# Per-detection columns: name -> (dtype, shape of one entry)
+DETECTION_COLUMNS = {
+    'frame': (np.int32, ()),
+    'class_id': (np.int16, ()),
+    'confidence': (np.float16, ()),
+    # Polygon corners in source pixels; NaN when the detection has none
+    'polygon': (np.float32, (4, 2)),
+}
+# Frame index, one entry per stored frame: its number and the position of its first detection
+INDEX_COLUMNS = {
+    'index_frame': (np.int32, ()),
+    'index_offset': (np.int64, ()),
+}
+# Stored frames decoded per block when iterating
+READ_BLOCK = 4096
+
+
+def stored_confidence(confidence):
+    """
+    A confidence or threshold rounded to the float16 precision confidences are stored at.
+    Detections and thresholds are compared at this precision, live and from the store alike.
+    """
+    return float(np.float16(confidence))
+
+
+def detections_path(result_dir):
+    """Stored detections of a job: its detection store, or the JSONL of older results"""
+    store_path = os.path.join(result_dir, STORE_DIR)
+    if os.path.exists(os.path.join(store_path, 'store.json')):
+        return store_path
+    return os.path.join(result_dir, JSONL_FILE)
+
+
+class DetectionStoreWriter:
+    """
+    Appends the detections of a job's inferred frames to a columnar binary store.
+
+    Each column is a raw little-endian array in its own file, so readers can memory-map
+    it. store.json is written last and marks the store complete.
+    """
+
+    def __init__(self, path, fps):
+        self.path = path
+        self.fps = fps
+        os.makedirs(path, exist_ok=True)
+        # The columns of an earlier store are truncated below; it must not read as complete meanwhile
+        if os.path.exists(os.path.join(path, 'store.json')):
+            os.remove(os.path.join(path, 'store.json'))
+        self.files = {name: open(os.path.join(path, name + '.bin'), 'wb')
+                      for name in list(DETECTION_COLUMNS) + list(INDEX_COLUMNS)}
+        # (brand, raw class) -> class id in this store
+        self.class_ids = {}
+        self.frames = 0
+        self.detections = 0
+
+    def _class_id(self, det):
+        key = (det["class"], det["raw_class"])
+        class_id = self.class_ids.get(key)
+        if class_id is None:
+            class_id = self.class_ids[key] = len(self.class_ids)
+        return class_id
+
+    def add_frame(self, frame, detections):
+        """Append an inferred frame's detections; it covers the frames since the previously added one"""
+        count = len(detections)
+        self.files['index_frame'].write(np.int32(frame).tobytes())
+        self.files['index_offset'].write(np.int64(self.detections).tobytes())
+        if count:
+            polygons = np.full((count, 4, 2), np.nan, dtype=np.float32)
+            for i, det in enumerate(detections):
+                if det["points"] is not None:
+                    polygons[i] = det["points"]
+            self.files['frame'].write(np.full(count, frame, dtype=np.int32).tobytes())
+            self.files['class_id'].write(np.array([self._class_id(det) for det in detections], dtype=np.int16).tobytes())
+            self.files['confidence'].write(np.array([det["confidence"] for det in detections], dtype=np.float16).tobytes())
+            self.files['polygon'].write(polygons.tobytes())
+        self.frames += 1
+        self.detections += count
+
+    def close(self):
+        """Flush the columns and write the class table and store.json"""
+        for f in self.files.values():
+            f.close()
+        classes = sorted(self.class_ids.items(), key=lambda item: item[1])
+        with atomic_write(os.path.join(self.path, 'store.json')) as f:
+            json.dump({
+                "version": FORMAT_VERSION,
+                "fps": self.fps,
+                "frames": self.frames,
+                "detections": self.detections,
+                "classes": [{"class": brand, "raw_class": raw_class} for (brand, raw_class), _ in classes]
+            }, f)
+
+
+class DetectionStore:
+    """
+    Read access to a detection store. Columns are memory-mapped, so a frame or time range
+    is read by slicing through the frame index without touching the rest of the file.
+    """
+
+    def __init__(self, path):
+        self.path = path
+        with open(os.path.join(path, 'store.json')) as f:
+            meta = json.load(f)
+        if meta.get("version") != FORMAT_VERSION:
+            raise ValueError(f"Unsupported detection store version: {meta.get('version')}")
+        self.fps = float(meta["fps"])
+        self.frame_time = 1 / self.fps if self.fps > 0 else 0
+        self.classes = [(c["class"], c["raw_class"]) for c in meta["classes"]]
+        self.detection_count = int(meta["detections"])
+        self.columns = {}
+        for name, (dtype, shape) in DETECTION_COLUMNS.items():
+            self.columns[name] = self._map(name, dtype, shape, self.detection_count)
+        for name, (dtype, shape) in INDEX_COLUMNS.items():
+            self.columns[name] = self._map(name, dtype, shape, int(meta["frames"]))
+        self.index_frame = self.columns['index_frame']
+        self.index_offset = self.columns['index_offset']
+
+    def _map(self, name, dtype, shape, count):
+        if count == 0:
+            return np.empty((0,) + shape, dtype=dtype)
+        return np.memmap(os.path.join(self.path, name + '.bin'), dtype=dtype, mode='r', shape=(count,) + shape)
+
+    def __len__(self):
+        return len(self.index_frame)
+
+    def record_range(self, start_frame=None, end_frame=None):
+        """Positions [first, last) of the stored frames numbered start_frame..end_frame (inclusive)"""
+        first = 0 if start_frame is None else int(np.searchsorted(self.index_frame, start_frame, 'left'))
+        last = len(self) if end_frame is None else int(np.searchsorted(self.index_frame, end_frame, 'right'))
+        return first, max(first, last)
+
+    def _offset(self, position):
+        return int(self.index_offset[position]) if position < len(self) else self.detection_count
+
+    def frame_range(self, start_frame=None, end_frame=None):
+        """Column slices (frame, class_id, confidence, polygon) of the detections in a frame range"""
+        first, last = self.record_range(start_frame, end_frame)
+        start, end = self._offset(first), self._offset(last)
+        return {name: self.columns[name][start:end] for name in DETECTION_COLUMNS}
+
+    def time_range(self, start_seconds, end_seconds):
+        """Column slices of the detections of the frames timed start_seconds..end_seconds"""
+        start_frame = int(np.ceil(start_seconds * self.fps - 1e-6))
+        end_frame = int(np.floor(end_seconds * self.fps + 1e-6))
+        return self.frame_range(start_frame, end_frame)
+
+    def iter_frames(self, start_frame=None, end_frame=None, logo_groups=None, min_confidence=0.0):
+        """
+        (frame, detections) of the stored frames in a range, with detection dicts as
+        InferenceManager._extract_detections returns them. Columns are decoded a block of
+        frames at a time; logo_groups optionally maps raw class names to other brands.
+        """
+        classes = [(logo_groups.get(raw, raw) if logo_groups is not None else brand, raw)
+                   for brand, raw in self.classes]
+        first, last = self.record_range(start_frame, end_frame)
+        min_confidence = stored_confidence(min_confidence)
+        for block_start in range(first, last, READ_BLOCK):
+            block_end = min(last, block_start + READ_BLOCK)
+            frames = self.index_frame[block_start:block_end].tolist()
+            base = self._offset(block_start)
+            offsets = [int(o) - base for o in self.index_offset[block_start:block_end]]
+            offsets.append(self._offset(block_end) - base)
+            class_ids = self.columns['class_id'][base:base + offsets[-1]].tolist()
+            confidences = self.columns['confidence'][base:base + offsets[-1]].astype(np.float32).tolist()
+            polygons = np.array(self.columns['polygon'][base:base + offsets[-1]])
+            has_polygon = (~np.isnan(polygons[:, 0, 0])).tolist()
+            for i, frame in enumerate(frames):
+                detections = []
+                for j in range(offsets[i], offsets[i + 1]):
+                    if confidences[j] < min_confidence:
+                        continue
+                    brand, raw_class = classes[class_ids[j]]
+                    detections.append({
+                        "class": brand,
+                        "raw_class": raw_class,
+                        "confidence": confidences[j],
+                        "points": polygons[j] if has_polygon[j] else None
+                    })
+                yield frame, detections
+
+    def records(self, start_frame=None, end_frame=None):
+        """JSONL-style records ({frame, time, detections[, weight]}) of the stored frames in a range"""
+        first, _ = self.record_range(start_frame, end_frame)
+        previous = int(self.index_frame[first - 1]) if first > 0 else 0
+        for frame, detections in self.iter_frames(start_frame, end_frame):
+            record = {
+                "frame": frame,
+                "time": round(frame * self.frame_time, 3),
+                "detections": [detection_record(det) for det in detections]
+            }
+            if frame - previous != 1:
+                record["weight"] = frame - previous
+            previous = frame
+            yield record
+
+
+def detection_record(det):
+    """Serializable record of a detection (brand, raw class, confidence, polygon/bbox in source pixels)"""
+    polygon = bbox = None
+    if det["points"] is not None:
+        polygon = det["points"].tolist()
+        xs = [p[0] for p in polygon]
+        ys = [p[1] for p in polygon]
+        bbox = [float(min(xs)), float(min(ys)), float(max(xs)), float(max(ys))]
+    return {
+        "class": det["class"],
+        "raw_class": det["raw_class"],
+        "confidence": round(det["confidence"], 4),
+        "polygon": polygon,
+        "bbox": bbox
+    }
+
+
+def export_jsonl(store, f, start_frame=None, end_frame=None):
+    """Write the stored frames of a range to f in the frame_detections.jsonl format"""
+    for record in store.records(start_frame, end_frame):
+        f.write(json.dumps(record) + "\n")
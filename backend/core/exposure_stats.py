@@ -0,0 +1,362 @@
+import os
+import json
+import math
+import tempfile
+from collections import defaultdict
+
+import cv2
+
+from backend.core.interval_index import IntervalIndex, TIMELINE_FILE, runs_from_frames, write_intervals
+from backend.core.series_store import SparseSeriesStore
+from backend.utils.atomic_file import atomic_write
+
+# Brands with fewer detections are left out of stats.json as likely false positives
+MIN_DETECTIONS = 50
+# Prominence = center weight * center proximity + size weight * sqrt(area share)
+PROMINENCE_WEIGHTS = (0.6, 0.4)
+# Prominence score from which a frame counts towards high-prominence time
+PROMINENCE_HIGH_THRESHOLD = 0.6
+
+
+def _new_brand_stats():
+    """Per-brand accumulators for a video"""
+    # sum_coverage_present accumulates per-frame coverage only for frames where the logo is present
+    # max_coverage tracks the maximum single-frame coverage observed
+    return {
+        "frames": 0,
+        "time": 0.0,
+        "detections": 0,
+        "sum_coverage_present": 0.0,
+        "max_coverage": 0.0,
+        "sum_area_present_px": 0.0,
+        # Prominence accumulators (MVP)
+        "sum_prominence_present": 0.0,
+        "max_prominence": 0.0,
+        "high_prominence_time": 0.0,
+        # Share of Voice accumulators
+        "sum_share_of_voice_present": 0.0,
+        "solo_time": 0.0
+    }
+
+
+def detection_prominence(points, area_px, width, height, weights=PROMINENCE_WEIGHTS):
+    """MVP prominence score of a detection polygon in a width x height frame (center proximity + size)"""
+    W = float(width)
+    H = float(height)
+    center = points.mean(axis=0)
+    cx = float(center[0])
+    cy = float(center[1])
+    area_ratio = max(0.0, min(1.0, area_px / (W * H) if (W > 0 and H > 0) else 0.0))
+    sigma_x = 0.3 * W
+    sigma_y = 0.3 * H
+    if sigma_x <= 0 or sigma_y <= 0:
+        p_center = 0.0
+    else:
+        p_center = math.exp(-(((cx - (W / 2.0)) ** 2) / (2.0 * (sigma_x ** 2)) + ((cy - (H / 2.0)) ** 2) / (2.0 * (sigma_y ** 2))))
+    p_size = math.sqrt(area_ratio)
+    center_weight, size_weight = weights
+    return center_weight * p_center + size_weight * p_size
+
+
+def brand_metrics(stats, total_frames, total_video_time):
+    """stats.json metrics of one brand from its accumulators"""
+    time_value = round(stats["time"], 2)
+    frames_present = stats["frames"]
+    sum_cov_present = stats.get("sum_coverage_present", 0.0)
+    max_cov = stats.get("max_coverage", 0.0)
+    sum_prom_present = stats.get("sum_prominence_present", 0.0)
+    max_prom = stats.get("max_prominence", 0.0)
+    high_prom_time = stats.get("high_prominence_time", 0.0)
+    sum_sov_present = stats.get("sum_share_of_voice_present", 0.0)
+    solo_time = stats.get("solo_time", 0.0)
+    percentage_time = (time_value / total_video_time * 100) if total_video_time > 0 else 0
+    avg_cov_present = (sum_cov_present / frames_present * 100) if frames_present > 0 else 0.0
+    avg_cov_overall = (sum_cov_present / total_frames * 100) if total_frames > 0 else 0.0
+    avg_prom_present = (sum_prom_present / frames_present * 100) if frames_present > 0 else 0.0
+    avg_sov_present = (sum_sov_present / frames_present * 100) if frames_present > 0 else 0.0
+    solo_percentage = (solo_time / time_value * 100) if time_value > 0 else 0.0
+    return {
+        "frames": frames_present,
+        "time": min(time_value, total_video_time),
+        "detections": stats["detections"],
+        "percentage": round(percentage_time, 2),
+        "coverage_avg_present": round(avg_cov_present, 2),
+        "coverage_avg_overall": round(avg_cov_overall, 2),
+        "coverage_max": round(max_cov * 100, 2),
+        "prominence_avg_present": round(avg_prom_present, 2),
+        "prominence_max": round(max_prom * 100, 2),
+        "prominence_high_time": round(high_prom_time, 2),
+        "share_of_voice_avg_present": round(avg_sov_present, 2),
+        "share_of_voice_solo_time": round(solo_time, 2),
+        "share_of_voice_solo_percentage": round(solo_percentage, 2)
+    }
+
+
+def build_video_metadata(width, height, fps, total_frames, total_video_time, extra_metadata=None):
+    """video_metadata block of stats.json"""
+    metadata = {
+        "duration": round(total_video_time, 2),
+        "fps": round(fps, 2),
+        "total_frames": total_frames,
+        "width": width,
+        "height": height
+    }
+    if extra_metadata:
+        metadata.update(extra_metadata)
+    return metadata
+
+
+class ExposureStatsAccumulator:
+    """
+    Accumulates per-brand exposure statistics and per-frame series for a video.
+    Detections are expected in source-resolution pixel coordinates, so the results
+    do not depend on the resolution frames were decoded or inferred at.
+    """
+
+    def __init__(self, width, height, fps, spill_dir=None, chunk_size=4096, min_detections=MIN_DETECTIONS,
+                 prominence_weights=PROMINENCE_WEIGHTS, prominence_high_threshold=PROMINENCE_HIGH_THRESHOLD,
+                 timeline_max_gap=0):
+        """
+        Initialize accumulators for a video of the given source resolution and frame rate.
+        Per-frame series are spilled to disk under spill_dir (a temporary directory if None)
+        in chunks of chunk_size entries per brand. min_detections, prominence_weights
+        (center, size) and prominence_high_threshold tune the post-processing;
+        timeline_max_gap is the gap in frames merged over in the timeline runs.
+        """
+        self.width = width
+        self.height = height
+        self.fps = fps
+        self.frame_time = 1 / fps if fps > 0 else 0
+        self.frame_area = float(width * height)
+        self.frame_count = 0
+        self.min_detections = min_detections
+        self.prominence_weights = tuple(prominence_weights)
+        self.prominence_high_threshold = prominence_high_threshold
+        self.timeline_max_gap = timeline_max_gap
+
+        self.aggregated_stats = defaultdict(_new_brand_stats)
+        self.spill_dir = spill_dir or tempfile.mkdtemp(prefix='series_')
+        # Frames in which each logo was detected
+        self.frame_by_frame_detections = SparseSeriesStore(
+            os.path.join(self.spill_dir, 'timeline'), chunk_size, with_values=False)
+        # Per-frame coverage series: percentage per frame for each logo (0 when absent)
+        self.coverage_per_frame = SparseSeriesStore(os.path.join(self.spill_dir, 'coverage'), chunk_size)
+        # Per-frame prominence series: 0-100 score per frame (0 when absent)
+        self.prominence_per_frame = SparseSeriesStore(os.path.join(self.spill_dir, 'prominence'), chunk_size)
+
+    def _prominence(self, points, area_px):
+        """MVP prominence score for a detection (center proximity + size)"""
+        return detection_prominence(points, area_px, self.width, self.height, self.prominence_weights)
+
+    def add_frame(self, detections, weight=1):
+        """
+        Accumulate the detections of the next frame.
+
+        Each detection is a dict with the main brand under "class" and an optional
+        (4, 2) float32 "points" polygon. `weight` is the number of source frames this
+        inferred frame stands for when frames are skipped (it covers the skipped frames
+        preceding it). Returns a per-brand summary of the frame (area_px, coverage,
+        prominence, share_of_voice) for brands present in it.
+        """
+        self.frame_count += weight
+        frame_count = self.frame_count
+        first_frame = frame_count - weight + 1
+        frame_time = self.frame_time * weight
+        aggregated_stats = self.aggregated_stats
+
+        main_logos_in_frame = set()
+        # Accumulate pixel area for each main logo detected in this frame
+        logo_area_pixels_in_frame = defaultdict(float)
+        # Per-frame per-brand prominence (max over detections of that brand)
+        per_brand_prominence_frame = defaultdict(float)
+
+        for det in detections:
+            main_logo = det["class"]
+            aggregated_stats[main_logo]["detections"] += weight
+            main_logos_in_frame.add(main_logo)
+
+            points = det.get("points")
+            if points is None:
+                continue
+            area_px = float(cv2.contourArea(points)) if points.shape == (4, 2) else 0.0
+            if area_px > 0:
+                logo_area_pixels_in_frame[main_logo] += area_px
+                try:
+                    prominence_score = self._prominence(points, area_px)
+                    if prominence_score > per_brand_prominence_frame[main_logo]:
+                        per_brand_prominence_frame[main_logo] = prominence_score
+                except Exception:
+                    pass
+
+        # Update frame/time counts and coverage-based metrics for logos present in this frame
+        frame_area = self.frame_area
+        summary = {}
+        for main_logo in main_logos_in_frame:
+            brand_stats = aggregated_stats[main_logo]
+            brand_stats["frames"] += weight
+            brand_stats["time"] += frame_time
+            self.frame_by_frame_detections.append_range(main_logo, first_frame, frame_count)
+            brand_summary = {"area_px": 0.0, "coverage": 0.0, "prominence": 0.0, "share_of_voice": 0.0}
+
+            # Compute coverage ratio for this main logo in the frame (sum of all instances, capped at 1.0)
+            if frame_area > 0:
+                logo_area = logo_area_pixels_in_frame.get(main_logo, 0.0)
+                coverage_ratio = min(1.0, logo_area / frame_area)
+                brand_stats["sum_coverage_present"] += coverage_ratio * weight
+                brand_stats["sum_area_present_px"] += logo_area * weight
+                if coverage_ratio > brand_stats["max_coverage"]:
+                    brand_stats["max_coverage"] = coverage_ratio
+                self.coverage_per_frame.append_range(
+                    main_logo, first_frame, frame_count, round(coverage_ratio * 100.0, 4))
+                brand_summary["area_px"] = logo_area
+                brand_summary["coverage"] = coverage_ratio
+
+            # Accumulate prominence for this brand in this frame if computed
+            if main_logo in per_brand_prominence_frame:
+                s = float(per_brand_prominence_frame.get(main_logo, 0.0))
+                brand_stats["sum_prominence_present"] += s * weight
+                if s > brand_stats["max_prominence"]:
+                    brand_stats["max_prominence"] = s
+                if s >= self.prominence_high_threshold:
+                    brand_stats["high_prominence_time"] += frame_time
+                self.prominence_per_frame.append_range(main_logo, first_frame, frame_count, round(s * 100.0, 2))
+                brand_summary["prominence"] = s
+
+            # Share of Voice = 1 / (1 + number_of_competitors in this frame)
+            other_brands_count = len(main_logos_in_frame) - 1
+            share_of_voice = 1.0 / (1.0 + other_brands_count)
+            brand_stats["sum_share_of_voice_present"] += share_of_voice * weight
+            # Track solo time (when brand appears alone)
+            if other_brands_count == 0:
+                brand_stats["solo_time"] += frame_time
+            brand_summary["share_of_voice"] = share_of_voice
+            summary[main_logo] = brand_summary
+
+        # Series are sparse: frames without an entry read back as 0
+        return summary
+
+    def _series_stores(self):
+        return (self.frame_by_frame_detections, self.coverage_per_frame, self.prominence_per_frame)
+
+    def series_entries(self):
+        """Entries recorded in the per-frame series (on disk and buffered)"""
+        return sum(store.entries() for store in self._series_stores())
+
+    def buffer_bytes(self):
+        """Bytes held in memory by the per-frame series buffers"""
+        return sum(store.buffer_bytes() for store in self._series_stores())
+
+    def spill(self, chunk_size):
+        """Write the buffered per-frame series to disk and keep smaller buffers from now on"""
+        for store in self._series_stores():
+            store.set_chunk_size(chunk_size)
+
+    def build_stats(self, total_frames, total_video_time, extra_metadata=None):
+        """Build the stats.json payload (video metadata + filtered per-brand metrics)"""
+        # Filter out brands with too few detections to reduce false positives
+        final_stats = {logo: brand_metrics(stats, total_frames, total_video_time)
+                       for logo, stats in self.aggregated_stats.items()
+                       if stats["detections"] >= self.min_detections}
+        return {
+            "video_metadata": build_video_metadata(self.width, self.height, self.fps, total_frames, total_video_time,
+                                                   extra_metadata),
+            "logo_stats": final_stats
+        }
+
+    def write_outputs(self, result_dir, total_frames, total_video_time, extra_metadata=None):
+        """Write stats.json, timeline_intervals.json and the coverage/prominence artifacts"""
+        output_data = self.build_stats(total_frames, total_video_time, extra_metadata)
+
+        # Save aggregated statistics
+        with atomic_write(os.path.join(result_dir, 'stats.json')) as f:
+            json.dump(output_data, f, indent=4)
+
+        # Save the per-brand runs of frames present; frame lists of an earlier run are dropped
+        write_intervals(result_dir, self.timeline_index())
+        if os.path.exists(os.path.join(result_dir, TIMELINE_FILE)):
+            os.remove(os.path.join(result_dir, TIMELINE_FILE))
+
+        # Save coverage debug information for validation
+        try:
+            coverage_debug = {
+                "resolution": {
+                    "width": self.width,
+                    "height": self.height,
+                    "frame_area": self.width * self.height
+                },
+                "frames_total": total_frames,
+                "per_logo": {}
+            }
+            frame_area_dbg = float(self.width * self.height)
+            for logo, stats in self.aggregated_stats.items():
+                frames_present = stats["frames"]
+                sum_area_px = stats.get("sum_area_present_px", 0.0)
+                sum_cov = stats.get("sum_coverage_present", 0.0)
+                max_cov = stats.get("max_coverage", 0.0)
+                coverage_debug["per_logo"][logo] = {
+                    "frames_present": frames_present,
+                    "sum_area_present_px": round(float(sum_area_px), 2),
+                    "avg_area_present_px": round(float(sum_area_px / frames_present), 2) if frames_present > 0 else 0.0,
+                    "avg_coverage_present_pct": round(float((sum_cov / frames_present) * 100.0), 3) if frames_present > 0 else 0.0,
+                    "avg_coverage_overall_pct": round(float((sum_cov / total_frames) * 100.0), 3) if total_frames > 0 else 0.0,
+                    "max_coverage_pct": round(float(max_cov * 100.0), 3),
+                    "frame_area_px": int(frame_area_dbg)
+                }
+            with atomic_write(os.path.join(result_dir, 'coverage_debug.json')) as f:
+                json.dump(coverage_debug, f, indent=2)
+
+            # Save per-frame coverage series (percentages per frame, 0 when absent)
+            with atomic_write(os.path.join(result_dir, 'coverage_per_frame.json')) as f:
+                self._write_dense_series_json(f, self.coverage_per_frame, total_frames, 4)
+
+            # Save per-frame prominence series (0-100 per frame, 0 when absent)
+            with atomic_write(os.path.join(result_dir, 'prominence_per_frame.json')) as f:
+                self._write_dense_series_json(f, self.prominence_per_frame, total_frames, 2)
+        except Exception as e:
+            print(f"Failed to write coverage debug artifacts: {e}")
+
+        return output_data
+
+    def timeline_index(self):
+        """Interval index of the frames each logo was detected in, built from the spilled timeline"""
+        store = self.frame_by_frame_detections
+        intervals = {}
+        for logo in store.keys:
+            runs = []
+            for frames, _ in store.iter_chunks(logo):
+                runs_from_frames(frames, self.timeline_max_gap, runs)
+            intervals[logo] = runs
+        return IntervalIndex(intervals, self.timeline_max_gap)
+
+    def _write_dense_series_json(self, f, store, total_frames, ndigits):
+        """
+        Stream {"frames_total", "per_logo": {logo: [one value per frame]}} from a spilled
+        series, one block at a time (same layout as json.dump with indent=2)
+        """
+        f.write('{\n  "frames_total": %d,\n  "per_logo": ' % total_frames)
+        if not len(store):
+            f.write('{}\n}')
+            return
+        f.write('{')
+        for i, logo in enumerate(store.keys):
+            f.write((',' if i else '') + '\n    ' + json.dumps(logo) + ': ')
+            if total_frames <= 0:
+                f.write('[]')
+                continue
+            f.write('[')
+            first = True
+            for block in store.iter_dense(logo, total_frames):
+                lines = ['0.0' if v == 0 else repr(round(v, ndigits)) for v in block.tolist()]
+                f.write(('' if first else ',') + '\n      ' + ',\n      '.join(lines))
+                first = False
+            f.write('\n    ]')
+        f.write('\n  }\n}')
+
+    def close(self):
+        """Delete the spilled per-frame series"""
+        for store in (self.frame_by_frame_detections, self.coverage_per_frame, self.prominence_per_frame):
+            store.close()
+        try:
+            os.rmdir(self.spill_dir)
+        except OSError:
+            pass
@@ -0,0 +1,129 @@
+import queue
+import threading
+
+import numpy as np
+
+
+def read_exact_into(stream, buffer):
+    """
+    Fill a writable buffer from a binary stream, looping over short reads.
+    Returns False when the stream ends before the buffer is full.
+    """
+    view = memoryview(buffer).cast('B')
+    total = len(view)
+    filled = 0
+    while filled < total:
+        n = stream.readinto(view[filled:])
+        if not n:
+            return False
+        filled += n
+    return True
+
+
+class FrameRingBuffer:
+    """
+    A fixed pool of preallocated frame buffers filled by a background reader thread.
+
+    Frames are handed to the consumer by slot index and must be given back with
+    release() once every writer is done with them, so steady-state processing
+    performs no per-frame allocations.
+    """
+
+    def __init__(self, shape, slots=4, dtype=np.uint8, drop_oldest=False):
+        """
+        Preallocate `slots` frame buffers of the given shape.
+        With drop_oldest the reader never waits for the consumer: when no slot is
+        free it overwrites the oldest frame still waiting to be consumed.
+        """
+        self.frames = [np.empty(shape, dtype=dtype) for _ in range(max(2, int(slots)))]
+        self.drop_oldest = drop_oldest
+        # 1-based number of the source frame held by each slot
+        self.sequence = [0] * len(self.frames)
+        self.frames_read = 0
+        self.dropped = 0
+        self._free = queue.Queue()
+        self._ready = queue.Queue()
+        for index in range(len(self.frames)):
+            self._free.put(index)
+        self._stop = threading.Event()
+        self._thread = None
+
+    def start(self, fill):
+        """
+        Start the reader thread. fill(buffer) writes the next frame into buffer
+        and returns False at the end of the stream.
+        """
+        def _run():
+            try:
+                while not self._stop.is_set():
+                    index = self._next_free_slot()
+                    if index is None or self._stop.is_set():
+                        break
+                    if not fill(self.frames[index]):
+                        break
+                    self.frames_read += 1
+                    self.sequence[index] = self.frames_read
+                    self._ready.put(index)
+            except Exception as e:
+                print(f"Frame reader stopped: {e}")
+            finally:
+                self._ready.put(None)
+
+        self._thread = threading.Thread(target=_run)
+        self._thread.daemon = True
+        self._thread.start()
+        return self
+
+    def _next_free_slot(self):
+        """Slot for the reader to fill next, reclaiming the oldest unread frame in drop_oldest mode"""
+        if self.drop_oldest:
+            try:
+                return self._free.get_nowait()
+            except queue.Empty:
+                pass
+            try:
+                index = self._ready.get_nowait()
+                self.dropped += 1
+                return index
+            except queue.Empty:
+                pass
+        return self._free.get()
+
+    def get(self, timeout=None):
+        """Return the slot index of the next filled frame, or None at the end of the stream"""
+        return self._ready.get(timeout=timeout)
+
+    def get_latest(self, timeout=None):
+        """
+        Return the slot index of the most recent filled frame, releasing (and counting
+        as dropped) any older frames still queued. None at the end of the stream.
+        """
+        index = self._ready.get(timeout=timeout)
+        while index is not None:
+            try:
+                newer = self._ready.get_nowait()
+            except queue.Empty:
+                break
+            if newer is None:
+                # Keep the end-of-stream marker for the next call
+                self._ready.put(None)
+                break
+            self.release(index)
+            self.dropped += 1
+            index = newer
+        return index
+
+    def pending(self):
+        """Number of filled frames waiting for the consumer"""
+        return self._ready.qsize()
+
+    def release(self, index):
+        """Return a slot to the pool once all consumers are done with its frame"""
+        self._free.put(index)
+
+    def close(self):
+        """Stop the reader thread"""
+        self._stop.set()
+        self._free.put(None)
+        if self._thread is not None:
+            self._thread.join(timeout=5)
@@ -1,19 +1,38 @@
 import os
+import gc
 import sys
 import threading
 import cv2
 import torch
 import numpy as np
 import json
-import subprocess
 import requests
-import math
 from urllib.parse import urljoin
 from collections import defaultdict, Counter
 import time
 from ultralytics import YOLO
 
 from backend.utils.progress_manager import ProgressManager, ProgressStage
+from backend.utils.stage_timer import StageTimer
+from backend.utils.metrics import MODEL_LATENCY, jobs as running_jobs
+from backend.utils.job_profiler import JobProfiler
+from backend.utils.memory_monitor import JobMemoryMonitor
+from backend.utils.cost_estimator import CostEstimator, JobEta, engine_key
+from backend.core.exposure_stats import ExposureStatsAccumulator
+from backend.core.brand_events import (
+    BrandEventDetector, EventDispatcher, JsonlEventSink, QueueEventSink, WebhookEventSink
+)
+from backend.core.rolling_stats import RollingExposureWindow
+from backend.core.partial_results import PartialSnapshotWriter
+from backend.core.reaggregation import write_detections_meta
+from backend.core.detection_store import DetectionStoreWriter, JSONL_FILE, STORE_DIR, stored_confidence
+from backend.core.threshold_sweep import ThresholdSweepAccumulator
+from backend.core.frame_ring import FrameRingBuffer
+from backend.core.shm_decoder import SharedMemoryFrameSource
+from backend.core.video_decoder import open_decoder, probe_video, probe_video_opencv
+
+# Ultralytics' default prediction confidence threshold
+DEFAULT_CONFIDENCE = 0.25
 
 class InferenceManager:
     """
@@ -53,6 +72,85 @@ class InferenceManager:
             (23, 190, 207)
         ]
         
+        # Processing settings (overridable via environment variables)
+        # imgsz: model input size override; 0/unset uses the size the model was trained with
+        self.imgsz = int(os.environ.get('SPONSORSPOTLIGHT_IMGSZ', '0') or 0) or None
+        # HLS variant policy for inference: 'inference' (lowest rendition covering the model
+        # input size), 'highest' or 'lowest'
+        self.hls_variant_policy = os.environ.get('SPONSORSPOTLIGHT_HLS_VARIANT_POLICY', 'inference')
+        # HLS rendition used for raw/annotated output: 'inference' reuses the inference frames,
+        # 'highest' pulls a separate highest-resolution rendition for the written videos
+        self.hls_output_policy = os.environ.get('SPONSORSPOTLIGHT_HLS_OUTPUT_POLICY', 'inference')
+        # Decode stream frames at the model input size instead of the source resolution
+        self.decode_downscale = os.environ.get('SPONSORSPOTLIGHT_DECODE_DOWNSCALE', '1') != '0'
+        # Number of preallocated frame buffers between the ffmpeg reader and the inference loop
+        self.frame_ring_slots = int(os.environ.get('SPONSORSPOTLIGHT_FRAME_RING_SLOTS', '4'))
+        # Decoder backend ('opencv' or 'ffmpeg'); unset uses opencv for files and ffmpeg for streams
+        self.decoder_backend = os.environ.get('SPONSORSPOTLIGHT_DECODER_BACKEND', '').strip().lower()
+        # Codec decoding threads (0 lets the decoder decide)
+        self.decoder_threads = int(os.environ.get('SPONSORSPOTLIGHT_DECODER_THREADS', '0') or 0)
+        # Optional decoder subprocess handing frames over shared memory, named by its
+        # decoder backend: '' (off), 'opencv'/'cv2' or 'ffmpeg'
+        self.decoder_process = os.environ.get('SPONSORSPOTLIGHT_DECODER_PROCESS', '').strip().lower()
+        # Real-time mode for live streams: stay at the live edge by skipping frames when
+        # inference falls more than latency_budget seconds behind it
+        self.realtime = os.environ.get('SPONSORSPOTLIGHT_REALTIME', '0') != '0'
+        self.latency_budget = float(os.environ.get('SPONSORSPOTLIGHT_LATENCY_BUDGET', '5.0'))
+        # Cross-stream batching when monitoring several streams on one model: largest batch
+        # and how long (ms) the first frame of a batch may wait for others
+        self.batch_size = int(os.environ.get('SPONSORSPOTLIGHT_BATCH_SIZE', '8'))
+        self.batch_wait_ms = float(os.environ.get('SPONSORSPOTLIGHT_BATCH_WAIT_MS', '20'))
+        # Shared BatchInferenceServer; when set, frames go through it instead of the model directly
+        self.batch_server = None
+        # Set to stop an open-ended stream job after the current frame
+        self.stop_event = threading.Event()
+        # Brand enter/exit events: optional webhook URL, minimum on-screen time before a
+        # brand enters and the gap after which it exits (seconds)
+        self.event_webhook_url = os.environ.get('SPONSORSPOTLIGHT_EVENT_WEBHOOK', '').strip()
+        self.event_min_seconds = float(os.environ.get('SPONSORSPOTLIGHT_EVENT_MIN_SECONDS', '0.5'))
+        self.event_gap_seconds = float(os.environ.get('SPONSORSPOTLIGHT_EVENT_GAP_SECONDS', '1.0'))
+        # Optional queue.Queue receiving brand events in-process
+        self.event_queue = None
+        # Publish partial results every N seconds of processed video (0 disables)
+        self.snapshot_seconds = float(os.environ.get('SPONSORSPOTLIGHT_SNAPSHOT_SECONDS', '30'))
+        # Entries per brand buffered in RAM before per-frame series are appended to disk
+        self.series_chunk_size = int(os.environ.get('SPONSORSPOTLIGHT_SERIES_CHUNK', '4096'))
+        # Missing frames merged over in the per-brand timeline runs (0 keeps them exact)
+        self.timeline_max_gap = int(os.environ.get('SPONSORSPOTLIGHT_TIMELINE_MAX_GAP', '0'))
+        # Rolling live stats windows (seconds) kept while a stream is processed
+        self.live_windows = [int(w) for w in os.environ.get('SPONSORSPOTLIGHT_LIVE_WINDOWS', '60,300,900').split(',') if w.strip()]
+        # Job being processed, its rolling live stats (streams only) and its /metrics figures
+        self.current_job = None
+        self.live_stats = None
+        self.job_metrics = None
+        # On-demand profiler attached to the running job: longest allowed window and
+        # stack sampling interval (ms)
+        self.profiler = None
+        self.job_thread_id = None
+        self.profile_max_seconds = float(os.environ.get('SPONSORSPOTLIGHT_PROFILE_MAX_SECONDS', '300'))
+        self.profile_interval_ms = float(os.environ.get('SPONSORSPOTLIGHT_PROFILE_INTERVAL_MS', '5'))
+        # Per-job memory accounting: sampling interval (s) and an optional soft RSS limit (MB, 0 off).
+        # Over the limit, series buffers are spilled to chunks of memory_spill_chunk entries, then
+        # file jobs infer every 2nd/4th... frame up to memory_max_stride instead of running out of memory
+        self.memory_sample_seconds = float(os.environ.get('SPONSORSPOTLIGHT_MEMORY_SAMPLE_SECONDS', '2'))
+        self.memory_soft_limit_mb = float(os.environ.get('SPONSORSPOTLIGHT_MEMORY_SOFT_LIMIT_MB', '0') or 0)
+        self.memory_spill_chunk = int(os.environ.get('SPONSORSPOTLIGHT_MEMORY_SPILL_CHUNK', '256'))
+        self.memory_max_stride = int(os.environ.get('SPONSORSPOTLIGHT_MEMORY_MAX_STRIDE', '4'))
+        # Throughput profile for job cost estimates and ETAs (benchmarks/e2e.py --save-profile writes
+        # it, finished jobs refine it); model_kind names the detector in its engine configurations
+        self.throughput_profile = os.environ.get('SPONSORSPOTLIGHT_THROUGHPUT_PROFILE',
+                                                 os.path.join(self.base_dir, 'throughput_profile.json'))
+        self.cost_estimator = CostEstimator(self.throughput_profile)
+        self.model_kind = 'yolo'
+        # Confidence threshold of the detections in a job's outputs (0/unset: the model's default)
+        self.confidence = float(os.environ.get('SPONSORSPOTLIGHT_CONFIDENCE', '0') or 0)
+        # Threshold sweep: confidence thresholds and min-detection filters for which threshold_sweep.json
+        # reports per-brand stats from the same pass. The model then runs at confidence_floor (0/unset:
+        # the lowest threshold) and stores detections down to it; the outputs keep the job's threshold
+        self.sweep_thresholds = [float(t) for t in os.environ.get('SPONSORSPOTLIGHT_SWEEP_THRESHOLDS', '').split(',') if t.strip()]
+        self.sweep_min_detections = [int(m) for m in os.environ.get('SPONSORSPOTLIGHT_SWEEP_MIN_DETECTIONS', '50').split(',') if m.strip()]
+        self.confidence_floor = float(os.environ.get('SPONSORSPOTLIGHT_CONFIDENCE_FLOOR', '0') or 0)
+        
         # Setup output directories
         os.makedirs(self.output_dir, exist_ok=True)
     
@@ -91,7 +189,7 @@ class InferenceManager:
             device = self._get_device()
             
             # Load the model
-            self.model = YOLO(self.model_path).to(device)
+            self.model = self._create_model(device)
             
             self.progress.update_progress(
                 ProgressStage.MODEL_READY,
@@ -106,6 +204,10 @@ class InferenceManager:
             )
             return False
     
+    def _create_model(self, device=None):
+        """A new YOLO model instance from model_path; a model object is only ever called from one thread"""
+        return YOLO(self.model_path).to(device or self._get_device())
+
     def _get_device(self):
         """Determine the best available device for inference"""
         if torch.cuda.is_available():
@@ -115,20 +217,95 @@ class InferenceManager:
         else:
             return 'cpu'
     
+    def _get_inference_size(self):
+        """Return the effective model input size (longest side in pixels)"""
+        if self.imgsz:
+            return int(self.imgsz)
+        imgsz = None
+        if self.model is not None:
+            imgsz = (getattr(self.model, 'overrides', None) or {}).get('imgsz')
+        if isinstance(imgsz, (list, tuple)):
+            imgsz = max(imgsz) if imgsz else None
+        return int(imgsz or 640)
+    
+    def _model_confidence(self):
+        """Confidence threshold the model runs at, or None for its default"""
+        if self.sweep_thresholds:
+            return self.confidence_floor or min(min(self.sweep_thresholds), self.confidence or DEFAULT_CONFIDENCE)
+        return self.confidence or None
+
+    def _output_confidence(self):
+        """
+        Confidence below which detections are stored but left out of the job's outputs,
+        when the model runs below the job's threshold for a sweep (0 otherwise)
+        """
+        if not self.sweep_thresholds:
+            return 0.0
+        output_confidence = self.confidence or DEFAULT_CONFIDENCE
+        return output_confidence if self._model_confidence() < output_confidence else 0.0
+
+    def _predict(self, frame):
+        """Run the model on a single frame"""
+        if self.batch_server is not None:
+            with MODEL_LATENCY.time(path='batched'):
+                return self.batch_server.predict(frame)
+        kwargs = {}
+        if self.imgsz:
+            kwargs['imgsz'] = self.imgsz
+        conf = self._model_confidence()
+        if conf:
+            kwargs['conf'] = conf
+        with MODEL_LATENCY.time(path='direct'):
+            return self.model(frame, **kwargs)
+    
     def start_inference(self, mode, input_path, file_hash):
         """Start the inference process in a separate thread"""
+        self.stop_event.clear()
         thread = threading.Thread(
             target=self._run_inference,
             args=(mode, input_path, file_hash)
         )
         thread.daemon = True
         thread.start()
+        return thread
+    
+    def stop(self):
+        """Ask a running stream job to finish after the current frame and write its results"""
+        self.stop_event.set()
+    
+    def attach_profiler(self, modes=('sample',), seconds=None, frames=None):
+        """
+        Profile the running job for `seconds` and/or `frames` (see JobProfiler), writing the
+        dumps into its result directory. Raises RuntimeError if no job is running or a
+        profile is already active.
+        """
+        if self.current_job is None or self.job_metrics is None or self.job_thread_id is None:
+            raise RuntimeError("No job is running")
+        if self.profiler is not None and self.profiler.active:
+            raise RuntimeError("A profile is already running for this job")
+        if not seconds and not frames:
+            seconds = 30
+        if seconds:
+            seconds = min(float(seconds), self.profile_max_seconds)
+        profiler = JobProfiler(
+            os.path.join(self.output_dir, self.current_job), self.job_thread_id, modes=modes,
+            seconds=seconds, frames=int(frames) if frames else None, interval=self.profile_interval_ms / 1000.0
+        )
+        self.profiler = profiler.start()
+        print(f"Profiling job {self.current_job} ({', '.join(profiler.modes)})")
+        return profiler
     
     def _run_inference(self, mode, input_path, file_hash):
         """Run the inference process"""
+        kind = 'stream' if mode == 'video' and self._is_url(input_path) else mode
+        self.job_metrics = running_jobs.start(file_hash, kind)
+        self.job_thread_id = threading.get_ident()
+        self.profiler = None
         try:
             # Reset progress for the new task
             self.progress.reset()
+            self.current_job = file_hash
+            self.live_stats = None
             
             # Start progress update
             self.progress.update_progress(
@@ -159,57 +336,167 @@ class InferenceManager:
                 ProgressStage.ERROR,
                 f"Inference failed: {str(e)}"
             )
+        finally:
+            if self.profiler is not None:
+                self.profiler.close()
+            self.job_thread_id = None
+            status = 'error' if self.progress.get_progress()['stage'] == ProgressStage.ERROR.name else 'complete'
+            running_jobs.finish(self.job_metrics, status)
     
-    def _annotate_frame(self, frame, results):
-        """Annotate a frame with detection results"""
+    def _get_decode_size(self, width, height):
+        """Frame size to decode at for inference: source size capped to the model input size"""
+        target = self._get_inference_size()
+        longest = max(width, height)
+        if not self.decode_downscale or longest <= target or longest <= 0:
+            return width, height
+        ratio = target / float(longest)
+        # Keep dimensions even for the scaler and the video writers
+        decode_width = max(2, int(round(width * ratio / 2.0)) * 2)
+        decode_height = max(2, int(round(height * ratio / 2.0)) * 2)
+        return decode_width, decode_height
+    
+    def _open_frame_source(self, source, backend, output_size=None, probe=None, drop_oldest=False, timer=None):
+        """
+        Start decoding ahead of inference. Returns (frame_source, decoder): frames are handed
+        out by slot index, either from a decoder subprocess over shared memory or from a reader
+        thread filling a FrameRingBuffer (decoder is None in the subprocess case).
+        drop_oldest keeps the decoder running at source rate and always uses the reader thread.
+        With a StageTimer, reads in the reader thread are timed as 'decode'.
+        """
+        shape = (output_size[1], output_size[0], 3)
+        if self.decoder_process and not drop_oldest:
+            frame_source = SharedMemoryFrameSource(
+                source, shape, slots=self.frame_ring_slots, backend=self.decoder_process,
+                threads=self.decoder_threads
+            )
+            return frame_source.start(), None
+        decoder = open_decoder(source, backend, threads=self.decoder_threads, output_size=output_size, probe=probe)
+        frame_source = FrameRingBuffer(shape, slots=self.frame_ring_slots, drop_oldest=drop_oldest)
+        read_into = timer.wrap('decode', decoder.read_into) if timer is not None else decoder.read_into
+        frame_source.start(read_into)
+        return frame_source, decoder
+    
+    def _start_brand_events(self, result_dir, fps, job_id):
+        """
+        Set up brand enter/exit events for a job. Events always go to brand_events.jsonl,
+        and to the webhook and in-process queue when configured. Returns (detector, dispatcher).
+        """
+        sinks = [JsonlEventSink(os.path.join(result_dir, 'brand_events.jsonl'))]
+        if self.event_webhook_url:
+            sinks.append(WebhookEventSink(self.event_webhook_url))
+        if self.event_queue is not None:
+            sinks.append(QueueEventSink(self.event_queue))
+        dispatcher = EventDispatcher(sinks)
+        detector = BrandEventDetector(
+            fps, dispatcher.emit, min_seconds=self.event_min_seconds,
+            gap_seconds=self.event_gap_seconds, job_id=job_id
+        )
+        return detector, dispatcher
+    
+    def _start_threshold_sweep(self, width, height, fps):
+        """Threshold sweep accumulator for a job, or None when no sweep thresholds are set"""
+        if not self.sweep_thresholds:
+            return None
+        return ThresholdSweepAccumulator(width, height, fps, self.sweep_thresholds, self.sweep_min_detections)
+
+    def _extract_detections(self, results, width, height, scale=None):
+        """
+        Convert model results into detection dicts in source pixel coordinates.
+        
+        width/height: source frame size, used for normalized coordinates and clamping.
+        scale: optional (sx, sy) factors mapping inference-frame pixels to source pixels.
+        """
+        detections = []
         if results is None:
-            return frame
+            return detections
         
         for result in results:
             obb = result.obb
             if obb is None:
                 continue
             
-            frame = frame.copy()
             for i in range(len(obb.conf)):
-                conf = float(obb.conf[i])
                 cls = int(obb.cls[i])
                 class_name = self.class_names[cls]
-                label = f'{class_name}: {conf:.2f}'
+                points = None
                 
                 if hasattr(obb, 'xyxyxyxy'):
                     polygon = obb.xyxyxyxy[i]
                     if hasattr(polygon, 'cpu'):
                         polygon = polygon.cpu().numpy()
+                    points = polygon.reshape(4, 2).astype(np.float32)
                     
-                    points = polygon.reshape(4, 2)
+                    # Scale normalized coordinates to pixel coordinates if needed
                     is_normalized = np.all(points <= 1.0)
-                    
                     if is_normalized:
-                        points[:, 0] *= frame.shape[1]
-                        points[:, 1] *= frame.shape[0]
-                    else:
-                        if np.max(points) > max(frame.shape):
-                            scale_factor = min(frame.shape[1] / np.max(points[:, 0]), 
-                                              frame.shape[0] / np.max(points[:, 1]))
-                            points = points * scale_factor
-                    
-                    points = points.astype(np.int32)
-                    x_center = int(points[:, 0].mean())
-                    y_center = int(points[:, 1].mean())
-                    color = self.color_palette[cls % len(self.color_palette)]
+                        points[:, 0] *= width
+                        points[:, 1] *= height
+                    elif scale is not None:
+                        points[:, 0] *= scale[0]
+                        points[:, 1] *= scale[1]
                     
-                    cv2.drawContours(frame, [points], 0, color, 2)
-                    
-                    (text_width, text_height), baseline = cv2.getTextSize(label, cv2.FONT_HERSHEY_SIMPLEX, 0.5, 2)
-                    text_x = max(0, x_center - text_width // 2)
-                    text_y = max(0, y_center - text_height - baseline - 5)
-                    
-                    overlay = frame.copy()
-                    cv2.rectangle(overlay, (text_x, text_y), (text_x + text_width, text_y + text_height + baseline), color, thickness=cv2.FILLED)
-                    alpha = 0.6
-                    cv2.addWeighted(overlay, alpha, frame, 1 - alpha, 0, frame)
-                    cv2.putText(frame, label, (text_x, text_y + text_height), cv2.FONT_HERSHEY_SIMPLEX, 0.5, (255, 255, 255), 2)
+                    # Clamp to frame bounds just in case
+                    points[:, 0] = np.clip(points[:, 0], 0, width)
+                    points[:, 1] = np.clip(points[:, 1], 0, height)
+                
+                detections.append({
+                    "class": self.logo_groups.get(class_name, class_name),
+                    "raw_class": class_name,
+                    "class_id": cls,
+                    # At the precision of the detection store, so live and stored detections filter alike
+                    "confidence": stored_confidence(obb.conf[i]),
+                    "points": points
+                })
+        
+        return detections
+    
+    def _open_detection_store(self, result_dir, fps):
+        """
+        Detection store of a job: all stored detections of its inferred frames for
+        overlays, clips and re-aggregation. Replaces the JSONL of an earlier run.
+        """
+        stale_jsonl = os.path.join(result_dir, JSONL_FILE)
+        if os.path.exists(stale_jsonl):
+            os.remove(stale_jsonl)
+        return DetectionStoreWriter(os.path.join(result_dir, STORE_DIR), fps)
+    
+    def _annotate_frame(self, frame, detections, scale=None):
+        """
+        Annotate a frame with detections.
+        
+        scale: optional (sx, sy) factors mapping source coordinates onto this frame, used when
+        the frame was decoded at a different resolution than the source.
+        """
+        if not detections:
+            return frame
+        
+        frame = frame.copy()
+        for det in detections:
+            if det["points"] is None:
+                continue
+            cls = det["class_id"]
+            label = f'{det["raw_class"]}: {det["confidence"]:.2f}'
+            
+            points = det["points"]
+            if scale is not None:
+                points = points * np.array(scale, dtype=np.float32)
+            
+            points = points.astype(np.int32)
+            x_center = int(points[:, 0].mean())
+            y_center = int(points[:, 1].mean())
+            color = self.color_palette[cls % len(self.color_palette)]
+            
+            cv2.drawContours(frame, [points], 0, color, 2)
+            
+            (text_width, text_height), baseline = cv2.getTextSize(label, cv2.FONT_HERSHEY_SIMPLEX, 0.5, 2)
+            text_x = max(0, x_center - text_width // 2)
+            text_y = max(0, y_center - text_height - baseline - 5)
+            
+            overlay = frame.copy()
+            cv2.rectangle(overlay, (text_x, text_y), (text_x + text_width, text_y + text_height + baseline), color, thickness=cv2.FILLED)
+            alpha = 0.6
+            cv2.addWeighted(overlay, alpha, frame, 1 - alpha, 0, frame)
+            cv2.putText(frame, label, (text_x, text_y + text_height), cv2.FONT_HERSHEY_SIMPLEX, 0.5, (255, 255, 255), 2)
         
         return frame
     
@@ -225,7 +512,11 @@ class InferenceManager:
         
         # Load and process the image
         image = cv2.imread(image_path)
-        results = self.model(image)
+        results = self._predict(image)
+        detections = self._extract_detections(results, image.shape[1], image.shape[0])
+        min_confidence = self._output_confidence()
+        if min_confidence:
+            detections = [det for det in detections if det["confidence"] >= stored_confidence(min_confidence)]
         
         logo_count = Counter()
         
@@ -238,18 +529,11 @@ class InferenceManager:
         )
         
         # Count logo detections
-        for result in results:
-            obb = result.obb
-            if obb is None:
-                continue
-            
-            for i in range(len(obb.conf)):
-                cls = int(obb.cls[i])
-                class_name = self.class_names[cls]
-                logo_count[class_name] += 1
+        for det in detections:
+            logo_count[det["raw_class"]] += 1
         
         # Annotate the image
-        annotated_image = self._annotate_frame(image, results)
+        annotated_image = self._annotate_frame(image, detections)
         cv2.imwrite(output_path, annotated_image)
         
         # Aggregate statistics
@@ -286,254 +570,168 @@ class InferenceManager:
         # Generate output paths within the new directory
         output_path = os.path.join(result_dir, 'output.mp4')
         raw_path = os.path.join(result_dir, 'raw.mp4')
-        stats_file = os.path.join(result_dir, 'stats.json')
-        timeline_stats_file = os.path.join(result_dir, 'timeline_stats.json')
         
         # Open the video
-        cap = cv2.VideoCapture(video_path)
+        decoder = open_decoder(video_path, self.decoder_backend or 'opencv', threads=self.decoder_threads)
         fourcc = cv2.VideoWriter_fourcc(*'avc1')
-        fps = cap.get(cv2.CAP_PROP_FPS)
-        width_cap = int(cap.get(cv2.CAP_PROP_FRAME_WIDTH))
-        height_cap = int(cap.get(cv2.CAP_PROP_FRAME_HEIGHT))
+        fps = decoder.fps
+        width_cap = decoder.width
+        height_cap = decoder.height
         out = cv2.VideoWriter(output_path, fourcc, fps, (width_cap, height_cap))
         raw_out = cv2.VideoWriter(raw_path, fourcc, fps, (width_cap, height_cap))
         
         # Get video properties
         frame_time = 1 / fps if fps > 0 else 0
-        total_frames = int(cap.get(cv2.CAP_PROP_FRAME_COUNT))
+        total_frames = decoder.frame_count
         total_video_time = total_frames / fps if fps > 0 else 0
         frame_count = 0
         
-        # Initialize statistics tracking
-        # sum_coverage_present accumulates per-frame coverage only for frames where the logo is present
-        # max_coverage tracks the maximum single-frame coverage observed
-        aggregated_stats = defaultdict(lambda: {
-            "frames": 0,
-            "time": 0.0,
-            "detections": 0,
-            "sum_coverage_present": 0.0,
-            "max_coverage": 0.0,
-            "sum_area_present_px": 0.0,
-            # Prominence accumulators (MVP)
-            "sum_prominence_present": 0.0,
-            "max_prominence": 0.0,
-            "high_prominence_time": 0.0,
-            # Share of Voice accumulators
-            "sum_share_of_voice_present": 0.0,
-            "solo_time": 0.0
-        })
-        frame_by_frame_detections = defaultdict(list)
-        # Per-frame coverage series: percentage per frame for each logo (0 when absent)
-        coverage_per_frame = defaultdict(list)
-        # Per-frame prominence series: 0-100 score per frame (0 when absent)
-        prominence_per_frame = defaultdict(list)
+        # Initialize statistics tracking (source-resolution coordinates)
+        accumulator = ExposureStatsAccumulator(width_cap, height_cap, fps, spill_dir=os.path.join(result_dir, '.series'),
+                                               chunk_size=self.series_chunk_size,
+                                               timeline_max_gap=self.timeline_max_gap)
+        frame_area = accumulator.frame_area
+        brand_events, event_dispatcher = self._start_brand_events(result_dir, fps, file_hash)
+        snapshots = PartialSnapshotWriter(result_dir, accumulator, int(self.snapshot_seconds * fps))
+        # Stats for several confidence thresholds from the same detections; outputs keep min_confidence
+        sweep = self._start_threshold_sweep(width_cap, height_cap, fps)
+        min_confidence = self._output_confidence()
+        confidence_threshold = stored_confidence(min_confidence)
+        # Per-stage hot-path timings (decode, model, post-processing, writers)
+        timer = StageTimer()
+        # Expected cost from the throughput profile, refined into an ETA from the job's own fps
+        engine = self._engine_key('file')
+        metadata = {"width": width_cap, "height": height_cap, "fps": fps, "frame_count": total_frames,
+                    "codec": (self._video_metadata(video_path) or {}).get('codec')}
+        estimate = self.cost_estimator.estimate(metadata, engine)
+        eta = JobEta(total_frames, estimate["processing_fps"])
+        job_started, cpu_started = time.monotonic(), time.process_time()
         
         self.progress.update_progress(
             ProgressStage.INFERENCE_PROGRESS,
             "Processing video",
             frame=frame_count,
             total_frames=total_frames,
-            progress_percentage=0
+            progress_percentage=0,
+            details={"estimate": estimate}
         )
         
-        # Prepare per-frame detections JSONL writer
-        detections_jsonl_path = os.path.join(result_dir, 'frame_detections.jsonl')
-        detections_writer = open(detections_jsonl_path, 'w')
+        # Prepare the per-frame detection store
+        detection_store = self._open_detection_store(result_dir, fps)
+        
+        # Decode ahead of inference, either in a subprocess over shared memory or in a reader thread
+        if self.decoder_process:
+            # The decoding subprocess opens the video itself
+            decoder.close()
+            decoder = None
+            frame_source, _ = self._open_frame_source(video_path, None, output_size=(width_cap, height_cap))
+        else:
+            frame_source = FrameRingBuffer(decoder.frame_shape, slots=self.frame_ring_slots).start(
+                timer.wrap('decode', decoder.read_into)
+            )
+        self.job_metrics.queues = {'frames': frame_source.pending, 'events': event_dispatcher.pending}
+        memory = self._start_memory_monitor(accumulator, frame_source, event_dispatcher)
+        detections = stored_detections = []
+        skipped_frames = 0
         
         # Process each frame
-        while cap.isOpened():
-            ret, frame = cap.read()
-            if not ret:
+        while True:
+            with timer.stage('frame_wait'):
+                slot = frame_source.get()
+            if slot is None:
                 break
+            frame = frame_source.frames[slot]
             
             frame_count += 1
-            results = self.model(frame)
-            
-            logos_in_frame = Counter()
-            main_logos_in_frame = set()
-            # Accumulate pixel area for each main logo detected in this frame
-            logo_area_pixels_in_frame = defaultdict(float)
-
-            # Count logo detections in the frame and compute coverage areas
-            per_frame_detections = []
-            # Per-frame per-brand prominence (max over detections of that brand)
-            per_brand_prominence_frame = defaultdict(float)
-            # Track unique brands per frame for Share of Voice calculation
-            unique_brands_in_frame = set()
-            
-            for result in results:
-                if result.obb is None:
-                    continue
-                
-                obb = result.obb
-                for i in range(len(obb.conf)):
-                    cls = int(obb.cls[i])
-                    class_name = self.class_names[cls]
-                    logos_in_frame[class_name] += 1
-                    # Track unique brands for Share of Voice
-                    unique_brands_in_frame.add(self.logo_groups.get(class_name, class_name))
-
-                    # Compute oriented bounding box area in pixels
-                    if hasattr(obb, 'xyxyxyxy'):
-                        polygon = obb.xyxyxyxy[i]
-                        if hasattr(polygon, 'cpu'):
-                            polygon = polygon.cpu().numpy()
-                        points = polygon.reshape(4, 2).astype(np.float32)
-
-                        # Scale normalized coordinates to pixel coordinates if needed
-                        is_normalized = np.all(points <= 1.0)
-                        if is_normalized:
-                            points[:, 0] *= frame.shape[1]
-                            points[:, 1] *= frame.shape[0]
-
-                        # Clamp to frame bounds just in case
-                        points[:, 0] = np.clip(points[:, 0], 0, frame.shape[1])
-                        points[:, 1] = np.clip(points[:, 1], 0, frame.shape[0])
-
-                        area_px = float(cv2.contourArea(points)) if points.shape == (4, 2) else 0.0
-                        if area_px > 0:
-                            main_logo_for_area = self.logo_groups.get(class_name, class_name)
-                            logo_area_pixels_in_frame[main_logo_for_area] += area_px
-
-                            # Compute MVP prominence score for this detection (center proximity + size)
-                            try:
-                                W = float(frame.shape[1])
-                                H = float(frame.shape[0])
-                                cx = float(points[:, 0].mean())
-                                cy = float(points[:, 1].mean())
-                                area_ratio = max(0.0, min(1.0, area_px / (W * H) if (W > 0 and H > 0) else 0.0))
-                                sigma_x = 0.3 * W
-                                sigma_y = 0.3 * H
-                                if sigma_x <= 0 or sigma_y <= 0:
-                                    p_center = 0.0
-                                else:
-                                    p_center = math.exp(-(((cx - (W / 2.0)) ** 2) / (2.0 * (sigma_x ** 2)) + ((cy - (H / 2.0)) ** 2) / (2.0 * (sigma_y ** 2))))
-                                p_size = math.sqrt(area_ratio)
-                                prominence_score = 0.6 * p_center + 0.4 * p_size
-                                if prominence_score > per_brand_prominence_frame[main_logo_for_area]:
-                                    per_brand_prominence_frame[main_logo_for_area] = prominence_score
-                            except Exception:
-                                pass
-
-                        # Collect detection polygon/bbox for advanced overlays
-                        polygon_list = points.tolist()
-                        xs = [p[0] for p in polygon_list]
-                        ys = [p[1] for p in polygon_list]
-                        bbox = [float(min(xs)), float(min(ys)), float(max(xs)), float(max(ys))]
-                        per_frame_detections.append({
-                            "class": self.logo_groups.get(class_name, class_name),
-                            "polygon": polygon_list,
-                            "bbox": bbox
-                        })
-
-            # Aggregate stats for the current frame
-            for logo, count in logos_in_frame.items():
-                main_logo = self.logo_groups.get(logo, logo)
-                aggregated_stats[main_logo]["detections"] += count
-                main_logos_in_frame.add(main_logo)
-            
-            # Update frame-based stats for unique main logos in the frame
-            # Update frame/time counts and coverage-based metrics for logos present in this frame
-            frame_area = float(frame.shape[0] * frame.shape[1]) if frame is not None else 0.0
-            # Prepare to record per-frame coverage series
-            present_logos_this_frame = set()
-            prominence_high_threshold = 0.6
-            for main_logo in main_logos_in_frame:
-                aggregated_stats[main_logo]["frames"] += 1
-                aggregated_stats[main_logo]["time"] += frame_time
-                frame_by_frame_detections[main_logo].append(frame_count)
+            # Under memory pressure only every stride-th frame is inferred; the frames in between
+            # keep (and are drawn with) the previous detections, and are counted with them
+            # before the next frame is inferred
+            if memory.stride == 1 or frame_count % memory.stride == 0 or frame_count == total_frames:
+                if skipped_frames:
+                    with timer.stage('postprocess'):
+                        self._add_held_frames(frame_count - 1, skipped_frames, detections, stored_detections,
+                                              accumulator, brand_events, sweep, detection_store)
+                    skipped_frames = 0
+                with timer.stage('model'):
+                    results = self._predict(frame)
+                with timer.stage('postprocess'):
+                    detections = stored_detections = self._extract_detections(results, width_cap, height_cap)
+                    if sweep is not None:
+                        sweep.add_frame(stored_detections)
+                    if min_confidence:
+                        detections = [det for det in stored_detections if det["confidence"] >= confidence_threshold]
+                    frame_summary = accumulator.add_frame(detections)
+                    brand_events.add_frame(frame_count, frame_summary)
+                if snapshots.due(frame_count):
+                    with timer.stage('snapshot'):
+                        snapshots.write(frame_count, expected_total_frames=total_frames)
+                    self.progress.update_progress(ProgressStage.INFERENCE_PROGRESS, details={"partial_frames": frame_count})
 
-                # Compute coverage ratio for this main logo in the frame (sum of all instances, capped at 1.0)
-                if frame_area > 0:
-                    logo_area = logo_area_pixels_in_frame.get(main_logo, 0.0)
-                    coverage_ratio = min(1.0, logo_area / frame_area)
-                    aggregated_stats[main_logo]["sum_coverage_present"] += coverage_ratio
-                    aggregated_stats[main_logo]["sum_area_present_px"] += logo_area
-                    if coverage_ratio > aggregated_stats[main_logo]["max_coverage"]:
-                        aggregated_stats[main_logo]["max_coverage"] = coverage_ratio
-                    # Ensure backfill for new logos
-                    while len(coverage_per_frame[main_logo]) < (frame_count - 1):
-                        coverage_per_frame[main_logo].append(0.0)
-                    coverage_per_frame[main_logo].append(round(coverage_ratio * 100.0, 4))
-                    present_logos_this_frame.add(main_logo)
+                # Periodic debug logging per 25 frames
+                if frame_count % 25 == 0 and frame_area > 0 and any(s["area_px"] > 0 for s in frame_summary.values()):
+                    debug_msg_parts = [f"Frame {frame_count} coverage:"]
+                    for lg, s in frame_summary.items():
+                        area_px = s["area_px"]
+                        if area_px <= 0:
+                            continue
+                        cov_pct = (area_px / frame_area) * 100.0
+                        debug_msg_parts.append(f"{lg}={cov_pct:.3f}% ({int(area_px)}px of {int(frame_area)}px)")
+                    print(" | ".join(debug_msg_parts))
 
-                # Accumulate prominence for this brand in this frame if computed
-                if main_logo in per_brand_prominence_frame:
-                    s = float(per_brand_prominence_frame.get(main_logo, 0.0))
-                    aggregated_stats[main_logo]["sum_prominence_present"] += s
-                    if s > aggregated_stats[main_logo]["max_prominence"]:
-                        aggregated_stats[main_logo]["max_prominence"] = s
-                    if s >= prominence_high_threshold:
-                        aggregated_stats[main_logo]["high_prominence_time"] += frame_time
-                    # Ensure backfill for new logos
-                    while len(prominence_per_frame[main_logo]) < (frame_count - 1):
-                        prominence_per_frame[main_logo].append(0.0)
-                    prominence_per_frame[main_logo].append(round(s * 100.0, 2))
-
-                # Calculate Share of Voice for this brand in this frame
-                if main_logo in unique_brands_in_frame:
-                    # Count other unique brands in this frame (excluding current brand)
-                    other_brands_count = len(unique_brands_in_frame - {main_logo})
-                    # Share of Voice = 1 / (1 + number_of_competitors)
-                    share_of_voice = 1.0 / (1.0 + other_brands_count)
-                    aggregated_stats[main_logo]["sum_share_of_voice_present"] += share_of_voice
-                    
-                    # Track solo time (when brand appears alone)
-                    if other_brands_count == 0:
-                        aggregated_stats[main_logo]["solo_time"] += frame_time
-
-            # For logos not present in this frame, append 0 to keep series aligned
-            for lg in list(coverage_per_frame.keys()):
-                if lg not in present_logos_this_frame:
-                    while len(coverage_per_frame[lg]) < (frame_count - 1):
-                        coverage_per_frame[lg].append(0.0)
-                    coverage_per_frame[lg].append(0.0)
-
-            for lg in list(prominence_per_frame.keys()):
-                if lg not in per_brand_prominence_frame:
-                    while len(prominence_per_frame[lg]) < (frame_count - 1):
-                        prominence_per_frame[lg].append(0.0)
-                    prominence_per_frame[lg].append(0.0)
-
-            # Periodic debug logging per 25 frames
-            if frame_count % 25 == 0 and frame_area > 0 and logo_area_pixels_in_frame:
-                debug_msg_parts = [f"Frame {frame_count} coverage:"]
-                for lg, area_px in logo_area_pixels_in_frame.items():
-                    cov_pct = (area_px / frame_area) * 100.0
-                    debug_msg_parts.append(f"{lg}={cov_pct:.3f}% ({int(area_px)}px of {int(frame_area)}px)")
-                print(" | ".join(debug_msg_parts))
-
-            # Write per-frame detections line (time in seconds)
-            try:
-                detections_writer.write(json.dumps({
-                    "frame": frame_count,
-                    "time": round(frame_count * frame_time, 3),
-                    "detections": per_frame_detections
-                }) + "\n")
-            except Exception:
-                pass
+                # Store the frame's detections
+                with timer.stage('detection_store'):
+                    try:
+                        detection_store.add_frame(frame_count, stored_detections)
+                    except Exception:
+                        pass
+            else:
+                skipped_frames += 1
 
             # Write raw frame then annotated frame
-            raw_out.write(frame)
-            annotated_frame = self._annotate_frame(frame, results)
-            out.write(annotated_frame)
+            with timer.stage('write_raw'):
+                raw_out.write(frame)
+            with timer.stage('annotate'):
+                annotated_frame = self._annotate_frame(frame, detections)
+            with timer.stage('write_annotated'):
+                out.write(annotated_frame)
+            frame_source.release(slot)
+            self.job_metrics.advance(frame_count)
+            if self.profiler is not None and self.profiler.running:
+                self.profiler.on_frame()
             
-            # Update progress
+            # Update progress, with the stage timings and ETA every 25 frames
             progress_percentage = (frame_count / total_frames) * 100 if total_frames > 0 else 0
+            details = None
+            if frame_count % 25 == 0:
+                details = {
+                    "timings": timer.summary(),
+                    "eta": eta.update(frame_count, self.job_metrics.frames_per_second())
+                }
             self.progress.update_progress(
                 ProgressStage.INFERENCE_PROGRESS,
                 f"Processing frame {frame_count}/{total_frames} ({round(progress_percentage)}%)",
                 frame=frame_count,
                 total_frames=total_frames,
-                progress_percentage=progress_percentage
+                progress_percentage=progress_percentage,
+                details=details
             )
+            if memory.due():
+                self._check_memory(memory, accumulator, allow_stride=True)
+        
+        # Frames skipped after the last inferred one keep its detections
+        if skipped_frames:
+            self._add_held_frames(frame_count, skipped_frames, detections, stored_detections,
+                                  accumulator, brand_events, sweep, detection_store)
         
         # Clean up
-        cap.release()
+        frame = None
+        if decoder is not None:
+            decoder.close()
+        frame_source.close()
         out.release()
         raw_out.release()
         try:
-            detections_writer.close()
+            detection_store.close()
         except Exception:
             pass
         
@@ -543,127 +741,153 @@ class InferenceManager:
             "Aggregating statistics"
         )
         
-        # Calculate percentages and coverage metrics, then round values
-        final_stats = {}
-        for logo, stats in aggregated_stats.items():
-            time_value = round(stats["time"], 2)
-            frames_present = stats["frames"]
-            sum_cov_present = stats.get("sum_coverage_present", 0.0)
-            max_cov = stats.get("max_coverage", 0.0)
-            sum_prom_present = stats.get("sum_prominence_present", 0.0)
-            max_prom = stats.get("max_prominence", 0.0)
-            high_prom_time = stats.get("high_prominence_time", 0.0)
-
-            percentage_time = (time_value / total_video_time * 100) if total_video_time > 0 else 0
-            avg_cov_present = (sum_cov_present / frames_present * 100) if frames_present > 0 else 0.0
-            avg_cov_overall = (sum_cov_present / total_frames * 100) if total_frames > 0 else 0.0
-            avg_prom_present = (sum_prom_present / frames_present * 100) if frames_present > 0 else 0.0
-
-            # Filter out brands with less than 50 detections to reduce false positives
-            if stats["detections"] >= 50:
-                final_stats[logo] = {
-                    "frames": frames_present,
-                    "time": min(time_value, total_video_time),
-                    "detections": stats["detections"],
-                    "percentage": round(percentage_time, 2),
-                    "coverage_avg_present": round(avg_cov_present, 2),
-                    "coverage_avg_overall": round(avg_cov_overall, 2),
-                    "coverage_max": round(max_cov * 100, 2),
-                    "prominence_avg_present": round(avg_prom_present, 2),
-                    "prominence_max": round(max_prom * 100, 2),
-                    "prominence_high_time": round(high_prom_time, 2)
-                }
-
-        # Prepare final JSON output with metadata
-        output_data = {
-            "video_metadata": {
-                "duration": round(total_video_time, 2),
-                "fps": round(fps, 2),
-                "total_frames": total_frames,
-                "width": width_cap,
-                "height": height_cap
-            },
-            "logo_stats": final_stats
-        }
-
-        # Save aggregated statistics
-        with open(stats_file, "w") as f:
-            json.dump(output_data, f, indent=4)
-
-        # Save frame-by-frame statistics
-        with open(timeline_stats_file, "w") as f:
-            json.dump(frame_by_frame_detections, f)
-
-        # Save coverage debug information for validation
-        try:
-            coverage_debug = {
-                "resolution": {
-                    "width": output_data["video_metadata"]["width"],
-                    "height": output_data["video_metadata"]["height"],
-                    "frame_area": output_data["video_metadata"]["width"] * output_data["video_metadata"]["height"]
-                },
-                "frames_total": total_frames,
-                "per_logo": {}
-            }
-            frame_area_dbg = float(coverage_debug["resolution"]["frame_area"]) if coverage_debug["resolution"]["frame_area"] else 0.0
-            for logo, stats in aggregated_stats.items():
-                frames_present = stats["frames"]
-                sum_area_px = stats.get("sum_area_present_px", 0.0)
-                sum_cov = stats.get("sum_coverage_present", 0.0)
-                max_cov = stats.get("max_coverage", 0.0)
-                coverage_debug["per_logo"][logo] = {
-                    "frames_present": frames_present,
-                    "sum_area_present_px": round(float(sum_area_px), 2),
-                    "avg_area_present_px": round(float(sum_area_px / frames_present), 2) if frames_present > 0 else 0.0,
-                    "avg_coverage_present_pct": round(float((sum_cov / frames_present) * 100.0), 3) if frames_present > 0 else 0.0,
-                    "avg_coverage_overall_pct": round(float((sum_cov / total_frames) * 100.0), 3) if total_frames > 0 else 0.0,
-                    "max_coverage_pct": round(float(max_cov * 100.0), 3),
-                    "frame_area_px": int(frame_area_dbg)
-                }
-            coverage_debug_file = os.path.join(result_dir, 'coverage_debug.json')
-            with open(coverage_debug_file, 'w') as f:
-                json.dump(coverage_debug, f, indent=2)
-
-            # Save per-frame coverage series (percentages per frame, 0 when absent)
-            for lg, series in coverage_per_frame.items():
-                # Backfill series to total_frames if needed
-                while len(series) < total_frames:
-                    series.append(0.0)
-            coverage_series = {
-                "frames_total": total_frames,
-                "per_logo": {lg: [round(float(v), 4) for v in series] for lg, series in coverage_per_frame.items()}
-            }
-            coverage_series_file = os.path.join(result_dir, 'coverage_per_frame.json')
-            with open(coverage_series_file, 'w') as f:
-                json.dump(coverage_series, f, indent=2)
-            # Save per-frame prominence series (0-100 per frame, 0 when absent)
-            for lg, series in prominence_per_frame.items():
-                while len(series) < total_frames:
-                    series.append(0.0)
-            prominence_series = {
-                "frames_total": total_frames,
-                "per_logo": {lg: [round(float(v), 2) for v in series] for lg, series in prominence_per_frame.items()}
-            }
-            prominence_series_file = os.path.join(result_dir, 'prominence_per_frame.json')
-            with open(prominence_series_file, 'w') as f:
-                json.dump(prominence_series, f, indent=2)
-        except Exception as e:
-            print(f"Failed to write coverage_debug.json: {e}")
+        # Save aggregated statistics, timeline and per-frame series
+        brand_events.finish()
+        event_dispatcher.close(timeout=5)
+        accumulator.write_outputs(result_dir, total_frames, total_video_time)
+        accumulator.close()
+        if sweep is not None:
+            sweep.write_outputs(result_dir, total_frames, total_video_time,
+                                {"confidence_floor": self._model_confidence()})
+        write_detections_meta(result_dir, width_cap, height_cap, fps, total_frames, total_video_time,
+                              min_confidence, self._model_confidence())
+        snapshots.finish()
+        timings = self._write_timings(timer, result_dir)
+        # Frames skipped under memory pressure would overstate the throughput
+        cost = self._record_cost(engine, metadata, frame_count, job_started, cpu_started, estimate,
+                                 record=memory.stride == 1)
         
         # Update progress
         self.progress.update_progress(
             ProgressStage.COMPLETE,
-            "Processing complete"
+            "Processing complete",
+            details={"timings": timings, "memory": self._memory_report(memory), "cost": cost, "eta": None}
         )
     
+    def _start_memory_monitor(self, accumulator, frame_source, event_dispatcher):
+        """Set up memory accounting for a job's buffers and queues, exported through its metrics"""
+        memory = JobMemoryMonitor(self.memory_soft_limit_mb * 1024 * 1024, self.memory_sample_seconds)
+        memory.add_buffer('frame_ring', lambda: sum(f.nbytes for f in frame_source.frames))
+        memory.add_buffer('series_buffers', accumulator.buffer_bytes)
+        memory.add_count('queued_frames', frame_source.pending)
+        memory.add_count('series_entries', accumulator.series_entries)
+        memory.add_count('brands', lambda: len(accumulator.aggregated_stats))
+        memory.add_count('pending_events', event_dispatcher.pending)
+        self.job_metrics.memory = memory
+        return memory
+    
+    def _memory_report(self, memory):
+        """Take a memory sample and add the degradation state"""
+        report = memory.sample()
+        report["spilled"] = memory.spilled
+        report["stride"] = memory.stride
+        return report
+    
+    def _add_held_frames(self, last_frame, count, detections, stored_detections, accumulator, brand_events,
+                         sweep, detection_store):
+        """
+        Count the `count` skipped frames ending at last_frame with the detections of the
+        inferred frame before them. They are stored as one record at last_frame, so that its
+        weight covers them.
+        """
+        frame_summary = accumulator.add_frame(detections, count)
+        brand_events.add_frame(last_frame, frame_summary, count)
+        if sweep is not None:
+            sweep.add_frame(stored_detections, count)
+        try:
+            detection_store.add_frame(last_frame, stored_detections)
+        except Exception:
+            pass
+
+    def _check_memory(self, memory, accumulator, allow_stride=False):
+        """
+        Sample the job's memory and publish it with the progress. Over the soft limit, the
+        per-frame series buffers are spilled to disk first; if that is not enough, file jobs
+        (allow_stride) infer only every 2nd, then 4th... frame up to memory_max_stride.
+        """
+        report = self._memory_report(memory)
+        if report["over_soft_limit"]:
+            rss_mb = report["rss_bytes"] / (1024 * 1024)
+            if not memory.spilled:
+                accumulator.spill(self.memory_spill_chunk)
+                gc.collect()
+                if torch.cuda.is_available():
+                    torch.cuda.empty_cache()
+                memory.spilled = True
+                print(f"RSS {rss_mb:.0f} MB over the soft limit: spilled per-frame series buffers")
+            elif allow_stride and memory.stride * 2 <= self.memory_max_stride:
+                memory.stride *= 2
+                print(f"RSS {rss_mb:.0f} MB over the soft limit: inferring every {memory.stride} frames")
+            report["spilled"] = memory.spilled
+            report["stride"] = memory.stride
+        self.progress.update_progress(ProgressStage.INFERENCE_PROGRESS, details={"memory": report})
+    
+    def _record_cost(self, engine, metadata, frames, job_started, cpu_started, estimate, record=True):
+        """
+        Wall and CPU-seconds of a finished job next to its estimate; with record, its throughput
+        is added to the profile. CPU time is the process's, so it includes concurrent jobs.
+        """
+        seconds = time.monotonic() - job_started
+        cpu_seconds = time.process_time() - cpu_started
+        if record:
+            self.cost_estimator.record_job(engine, metadata["width"], metadata["height"], metadata.get("codec"),
+                                           frames, seconds, cpu_seconds)
+        return {
+            "seconds": round(seconds, 1),
+            "cpu_seconds": round(cpu_seconds, 1),
+            "estimated_seconds": estimate["seconds"],
+            "estimated_cpu_seconds": estimate["cpu_seconds"]
+        }
+    
+    def _write_timings(self, timer, result_dir):
+        """Write timing_summary.json next to stats.json and return the summary"""
+        try:
+            timings = timer.write_summary(os.path.join(result_dir, 'timing_summary.json'))
+        except Exception as e:
+            print(f"Failed to write timing summary: {e}")
+            timings = timer.summary()
+        stages = timings["stages"]
+        if stages:
+            print("Stage timings: " + ", ".join(
+                f"{name}={s['total_seconds']:.2f}s ({s['share_of_wall_pct']:.0f}%)" for name, s in stages.items()
+            ) + f"; bottleneck: {timings['bottleneck']}")
+        return timings
+    
     def _is_url(self, path):
         """Check if a path is a URL"""
         return path.startswith('http://') or path.startswith('https://')
     
+    def _engine_key(self, mode):
+        """Engine configuration a job of this mode ('file' or 'stream') runs with, as named in the throughput profile"""
+        decoder = self.decoder_backend or ('ffmpeg' if mode == 'stream' else 'opencv')
+        return engine_key(mode, decoder, self.model_kind, self.decoder_process, self.batch_server is not None)
+    
+    def _video_metadata(self, source):
+        """Width, height, fps, frame count, duration and codec of a video file or stream, or None"""
+        metadata = probe_video(source)
+        if metadata is None and not self._is_url(source):
+            metadata = probe_video_opencv(source)
+        return metadata
+    
+    def estimate_job(self, source):
+        """Expected processing time and CPU-seconds of a video file or stream (see CostEstimator), or None"""
+        metadata = self._video_metadata(source)
+        if metadata is None:
+            return None
+        return self.cost_estimator.estimate(metadata, self._engine_key('stream' if self._is_url(source) else 'file'))
+    
     def _process_video_stream(self, url, file_hash):
         """Process a video stream (e.g., m3u8) by piping frames via ffmpeg."""
-        # Resolve to highest-quality variant if this is a master HLS playlist
-        url = self._resolve_hls_highest_variant(url)
+        # Pick the rendition matching the model input size if this is a master HLS playlist
+        variants = self._list_hls_variants(url)
+        stream_url = self._select_hls_variant(variants, self.hls_variant_policy) or url
+        # Optionally pull a separate higher rendition for the raw/annotated output videos
+        output_url = None
+        if variants and self.hls_output_policy == 'highest':
+            candidate = self._select_hls_variant(variants, 'highest')
+            if candidate and candidate != stream_url:
+                output_url = candidate
+        url = stream_url
         # Create a dedicated directory for the results
         result_dir = os.path.join(self.output_dir, file_hash)
         os.makedirs(result_dir, exist_ok=True)
@@ -671,245 +895,198 @@ class InferenceManager:
         # Generate output paths within the new directory
         output_path = os.path.join(result_dir, 'output.mp4')
         raw_path = os.path.join(result_dir, 'raw.mp4')
-        stats_file = os.path.join(result_dir, 'stats.json')
-        timeline_stats_file = os.path.join(result_dir, 'timeline_stats.json')
 
         # Probe stream
-        try:
-            probe = subprocess.run([
-                'ffprobe', '-v', 'error', '-select_streams', 'v:0',
-                '-show_entries', 'stream=width,height,r_frame_rate',
-                '-of', 'json', url
-            ], capture_output=True, text=True, timeout=10)
-            info = json.loads(probe.stdout or '{}')
-            width = int(info.get('streams', [{}])[0].get('width', 1280))
-            height = int(info.get('streams', [{}])[0].get('height', 720))
-            r_frame_rate = info.get('streams', [{}])[0].get('r_frame_rate', '25/1')
-            num, den = (r_frame_rate.split('/') + ['1'])[:2]
-            fps = float(num) / float(den) if float(den) != 0 else 25.0
-        except Exception:
-            width, height, fps = 1280, 720, 25.0
+        probe = self._probe_stream(url)
+        width, height, fps = probe["width"], probe["height"], probe["fps"]
 
         # Try to estimate total duration from media playlist if available (for better progress)
         estimated_total_frames = None
+        # Live playlists (no ENDLIST) have no total; ffmpeg starts them three segments
+        # before the live edge, which is where lag to the edge starts from
+        is_live = False
+        live_edge_offset = 0.0
         try:
             pl = requests.get(url, timeout=10).text
             if '#EXTINF' in pl:
-                total_sec = 0.0
+                durations = []
                 for line in pl.splitlines():
                     line = line.strip()
                     if line.startswith('#EXTINF:'):
                         try:
                             dur = float(line.split(':', 1)[1].split(',')[0])
-                            total_sec += dur
+                            durations.append(dur)
                         except Exception:
                             pass
-                if total_sec > 0 and fps > 0:
+                total_sec = sum(durations)
+                is_live = '#EXT-X-ENDLIST' not in pl
+                if is_live:
+                    live_edge_offset = sum(durations[-3:])
+                elif total_sec > 0 and fps > 0:
                     estimated_total_frames = int(total_sec * fps)
         except Exception:
             pass
+        realtime = self.realtime and is_live
+        if self.realtime and not is_live:
+            print("Real-time mode requested but the stream is not live; processing every frame")
 
-        # Start ffmpeg pipe
-        ffmpeg_cmd = [
-            'ffmpeg', '-i', url, '-f', 'image2pipe', '-pix_fmt', 'bgr24', '-vcodec', 'rawvideo', '-'
-        ]
-        pipe = subprocess.Popen(ffmpeg_cmd, stdout=subprocess.PIPE, stderr=subprocess.DEVNULL, bufsize=10**8)
+        # Start decoding, letting the decoder scale frames down to the model input size
+        decode_width, decode_height = self._get_decode_size(width, height)
+        # Per-stage hot-path timings (decode, model, post-processing, writers)
+        timer = StageTimer()
+        ring, decoder = self._open_frame_source(
+            url, self.decoder_backend or 'ffmpeg', output_size=(decode_width, decode_height), probe=probe,
+            drop_oldest=realtime, timer=timer
+        )
+        # Maps detections on decoded frames back to source coordinates
+        inference_scale = (width / float(decode_width), height / float(decode_height))
+
+        # Output videos come from the decoded frames unless a separate rendition was selected
+        out_width, out_height = decode_width, decode_height
+        output_decoder = None
+        output_ring = None
+        output_ended = False
+        if output_url is not None:
+            output_probe = self._probe_stream(output_url)
+            out_width, out_height = output_probe["width"], output_probe["height"]
+            output_decoder = open_decoder(output_url, 'ffmpeg', threads=self.decoder_threads, probe=output_probe)
+            output_ring = FrameRingBuffer(output_decoder.frame_shape, slots=self.frame_ring_slots,
+                                          drop_oldest=realtime)
+            output_ring.start(output_decoder.read_into)
+        # Maps source coordinates onto the output frames
+        output_scale = None
+        if (out_width, out_height) != (width, height):
+            output_scale = (out_width / float(width), out_height / float(height))
 
         fourcc = cv2.VideoWriter_fourcc(*'avc1')
-        out = cv2.VideoWriter(output_path, fourcc, fps, (width, height))
-        raw_out = cv2.VideoWriter(raw_path, fourcc, fps, (width, height))
+        out = cv2.VideoWriter(output_path, fourcc, fps, (out_width, out_height))
+        raw_out = cv2.VideoWriter(raw_path, fourcc, fps, (out_width, out_height))
 
         frame_time = 1 / fps
         frame_count = 0
+        # Real-time bookkeeping: frames inferred, lag behind the live edge
+        inferred_frames = 0
+        lag_seconds = 0.0
+        max_lag_seconds = 0.0
+        started_at = None
 
-        # Stats with coverage fields (mirror file video processing)
-        aggregated_stats = defaultdict(lambda: {
-            "frames": 0,
-            "time": 0.0,
-            "detections": 0,
-            "sum_coverage_present": 0.0,
-            "max_coverage": 0.0,
-            "sum_area_present_px": 0.0,
-            # Prominence accumulators (MVP)
-            "sum_prominence_present": 0.0,
-            "max_prominence": 0.0,
-            "high_prominence_time": 0.0,
-            # Share of Voice accumulators
-            "sum_share_of_voice_present": 0.0,
-            "solo_time": 0.0
-        })
-        frame_by_frame_detections = defaultdict(list)
-        coverage_per_frame = defaultdict(list)
-        # Per-frame prominence series: 0-100 per frame (0 when absent)
-        prominence_per_frame = defaultdict(list)
+        # Stats with coverage fields (mirror file video processing), in source coordinates
+        accumulator = ExposureStatsAccumulator(width, height, fps, spill_dir=os.path.join(result_dir, '.series'),
+                                               chunk_size=self.series_chunk_size,
+                                               timeline_max_gap=self.timeline_max_gap)
+        # Rolling per-brand stats over the last minutes, queryable while the stream runs
+        self.live_stats = RollingExposureWindow(fps, windows=self.live_windows)
+        brand_events, event_dispatcher = self._start_brand_events(result_dir, fps, file_hash)
+        snapshots = PartialSnapshotWriter(result_dir, accumulator, int(self.snapshot_seconds * fps))
+        sweep = self._start_threshold_sweep(width, height, fps)
+        min_confidence = self._output_confidence()
+        confidence_threshold = stored_confidence(min_confidence)
+        self.job_metrics.queues = {'frames': ring.pending, 'events': event_dispatcher.pending}
+        if output_ring is not None:
+            self.job_metrics.queues['output_frames'] = output_ring.pending
+        memory = self._start_memory_monitor(accumulator, ring, event_dispatcher)
+        memory.add_count('live_stats_buckets', self.live_stats.bucket_count)
+        if output_ring is not None:
+            memory.add_buffer('output_frame_ring', lambda: sum(f.nbytes for f in output_ring.frames))
+        # Expected cost (per video second for live streams) and the ETA of streams with a known length
+        engine = self._engine_key('stream')
+        metadata = {"width": width, "height": height, "fps": fps, "frame_count": estimated_total_frames or 0,
+                    "codec": probe.get("codec")}
+        estimate = self.cost_estimator.estimate(metadata, engine)
+        eta = JobEta(estimated_total_frames, estimate["processing_fps"])
+        job_started, cpu_started = time.monotonic(), time.process_time()
 
         self.progress.update_progress(
             ProgressStage.INFERENCE_PROGRESS,
             "Processing stream",
             frame=frame_count,
             total_frames=estimated_total_frames,
-            progress_percentage=0
+            progress_percentage=0,
+            details={"estimate": estimate}
         )
 
-        # Prepare per-frame detections JSONL
-        detections_jsonl_path = os.path.join(result_dir, 'frame_detections.jsonl')
+        # Prepare the per-frame detection store
         try:
-            detections_writer = open(detections_jsonl_path, 'w')
+            detection_store = self._open_detection_store(result_dir, fps)
         except Exception:
-            detections_writer = None
+            detection_store = None
 
-        while True:
-            raw = pipe.stdout.read(width * height * 3)
-            if not raw:
+        while not self.stop_event.is_set():
+            # Behind the live edge by more than the budget: jump to the newest decoded frame
+            with timer.stage('frame_wait'):
+                if realtime and lag_seconds > self.latency_budget:
+                    slot = ring.get_latest()
+                else:
+                    slot = ring.get()
+            if slot is None:
                 break
-            frame = np.frombuffer(raw, dtype='uint8').reshape((height, width, 3))
-            frame_count += 1
-
-            results = self.model(frame)
-
-            logos_in_frame = Counter()
-            main_logos_in_frame = set()
-            logo_area_pixels_in_frame = defaultdict(float)
-            per_frame_detections = []
-            # Per-frame per-brand prominence (max over detections of that brand)
-            per_brand_prominence_frame = defaultdict(float)
-            # Track unique brands per frame for Share of Voice calculation
-            unique_brands_in_frame = set()
+            frame = ring.frames[slot]
+            # Frames skipped since the previous inferred one are covered by this frame
+            weight = max(1, ring.sequence[slot] - frame_count) if realtime else 1
+            frame_count += weight
+            inferred_frames += 1
+            if realtime:
+                now = time.monotonic()
+                if started_at is None:
+                    started_at = now
+                lag_seconds = max(0.0, live_edge_offset + (now - started_at) - (frame_count - 1) * frame_time)
+                max_lag_seconds = max(max_lag_seconds, lag_seconds)
 
-            for result in results:
-                if result.obb is None:
-                    continue
-                obb = result.obb
-                for i in range(len(obb.conf)):
-                    cls = int(obb.cls[i])
-                    class_name = self.class_names[cls]
-                    logos_in_frame[class_name] += 1
-                    # Track unique brands for Share of Voice
-                    unique_brands_in_frame.add(self.logo_groups.get(class_name, class_name))
-                    if hasattr(obb, 'xyxyxyxy'):
-                        polygon = obb.xyxyxyxy[i]
-                        if hasattr(polygon, 'cpu'):
-                            polygon = polygon.cpu().numpy()
-                        points = polygon.reshape(4, 2).astype(np.float32)
-                        is_normalized = np.all(points <= 1.0)
-                        if is_normalized:
-                            points[:, 0] *= frame.shape[1]
-                            points[:, 1] *= frame.shape[0]
-                        points[:, 0] = np.clip(points[:, 0], 0, frame.shape[1])
-                        points[:, 1] = np.clip(points[:, 1], 0, frame.shape[0])
-                        area_px = float(cv2.contourArea(points)) if points.shape == (4, 2) else 0.0
-                        if area_px > 0:
-                            main_logo_for_area = self.logo_groups.get(class_name, class_name)
-                            logo_area_pixels_in_frame[main_logo_for_area] += area_px
-                            # Compute MVP prominence score for this detection
-                            try:
-                                W = float(frame.shape[1])
-                                H = float(frame.shape[0])
-                                cx = float(points[:, 0].mean())
-                                cy = float(points[:, 1].mean())
-                                area_ratio = max(0.0, min(1.0, area_px / (W * H) if (W > 0 and H > 0) else 0.0))
-                                sigma_x = 0.3 * W
-                                sigma_y = 0.3 * H
-                                if sigma_x <= 0 or sigma_y <= 0:
-                                    p_center = 0.0
-                                else:
-                                    p_center = math.exp(-(((cx - (W / 2.0)) ** 2) / (2.0 * (sigma_x ** 2)) + ((cy - (H / 2.0)) ** 2) / (2.0 * (sigma_y ** 2))))
-                                p_size = math.sqrt(area_ratio)
-                                prominence_score = 0.6 * p_center + 0.4 * p_size
-                                if prominence_score > per_brand_prominence_frame[main_logo_for_area]:
-                                    per_brand_prominence_frame[main_logo_for_area] = prominence_score
-                            except Exception:
-                                pass
-                        # Collect polygon/bbox for overlays
-                        try:
-                            poly_list = points.tolist()
-                            xs = [p[0] for p in poly_list]
-                            ys = [p[1] for p in poly_list]
-                            bbox = [float(min(xs)), float(min(ys)), float(max(xs)), float(max(ys))]
-                            per_frame_detections.append({
-                                "class": self.logo_groups.get(class_name, class_name),
-                                "polygon": poly_list,
-                                "bbox": bbox
-                            })
-                        except Exception:
-                            pass
+            with timer.stage('model'):
+                results = self._predict(frame)
+            with timer.stage('postprocess'):
+                detections = stored_detections = self._extract_detections(results, width, height, scale=inference_scale)
+                if sweep is not None:
+                    sweep.add_frame(stored_detections, weight)
+                if min_confidence:
+                    detections = [det for det in stored_detections if det["confidence"] >= confidence_threshold]
+                frame_summary = accumulator.add_frame(detections, weight)
+                self.live_stats.add_frame(frame_summary, weight)
+                brand_events.add_frame(frame_count, frame_summary, weight)
+            if snapshots.due(frame_count):
+                with timer.stage('snapshot'):
+                    snapshots.write(frame_count, expected_total_frames=estimated_total_frames)
+                self.progress.update_progress(ProgressStage.INFERENCE_PROGRESS, details={"partial_frames": frame_count})
 
-            for logo, count in logos_in_frame.items():
-                main_logo = self.logo_groups.get(logo, logo)
-                aggregated_stats[main_logo]["detections"] += count
-                main_logos_in_frame.add(main_logo)
-
-            frame_area = float(frame.shape[0] * frame.shape[1]) if frame is not None else 0.0
-            present_logos_this_frame = set()
-            prominence_high_threshold = 0.6
-            for main_logo in main_logos_in_frame:
-                aggregated_stats[main_logo]["frames"] += 1
-                aggregated_stats[main_logo]["time"] += frame_time
-                frame_by_frame_detections[main_logo].append(frame_count)
-                if frame_area > 0:
-                    logo_area = logo_area_pixels_in_frame.get(main_logo, 0.0)
-                    coverage_ratio = min(1.0, logo_area / frame_area)
-                    aggregated_stats[main_logo]["sum_coverage_present"] += coverage_ratio
-                    aggregated_stats[main_logo]["sum_area_present_px"] += logo_area
-                    if coverage_ratio > aggregated_stats[main_logo]["max_coverage"]:
-                        aggregated_stats[main_logo]["max_coverage"] = coverage_ratio
-                    while len(coverage_per_frame[main_logo]) < (frame_count - 1):
-                        coverage_per_frame[main_logo].append(0.0)
-                    coverage_per_frame[main_logo].append(round(coverage_ratio * 100.0, 4))
-                    present_logos_this_frame.add(main_logo)
-
-                # Accumulate prominence per frame for this brand if available
-                if main_logo in per_brand_prominence_frame:
-                    s = float(per_brand_prominence_frame.get(main_logo, 0.0))
-                    aggregated_stats[main_logo]["sum_prominence_present"] += s
-                    if s > aggregated_stats[main_logo]["max_prominence"]:
-                        aggregated_stats[main_logo]["max_prominence"] = s
-                    if s >= prominence_high_threshold:
-                        aggregated_stats[main_logo]["high_prominence_time"] += frame_time
-                    # Ensure backfill for new logos
-                    while len(prominence_per_frame[main_logo]) < (frame_count - 1):
-                        prominence_per_frame[main_logo].append(0.0)
-                    prominence_per_frame[main_logo].append(round(s * 100.0, 2))
-
-                # Calculate Share of Voice for this brand in this frame
-                if main_logo in unique_brands_in_frame:
-                    # Count other unique brands in this frame (excluding current brand)
-                    other_brands_count = len(unique_brands_in_frame - {main_logo})
-                    # Share of Voice = 1 / (1 + number_of_competitors)
-                    share_of_voice = 1.0 / (1.0 + other_brands_count)
-                    aggregated_stats[main_logo]["sum_share_of_voice_present"] += share_of_voice
-                    
-                    # Track solo time (when brand appears alone)
-                    if other_brands_count == 0:
-                        aggregated_stats[main_logo]["solo_time"] += frame_time
-
-            for lg in list(coverage_per_frame.keys()):
-                if lg not in present_logos_this_frame:
-                    while len(coverage_per_frame[lg]) < (frame_count - 1):
-                        coverage_per_frame[lg].append(0.0)
-                    coverage_per_frame[lg].append(0.0)
+            # Pick the frame for the output videos (separate rendition if one is being pulled)
+            output_frame = frame
+            output_slot = None
+            if output_ring is not None and not output_ended:
+                output_slot = output_ring.get_latest() if realtime else output_ring.get()
+                if output_slot is not None:
+                    output_frame = output_ring.frames[output_slot]
+                else:
+                    # Output rendition ended first; upscale the inference frames from here on
+                    output_ended = True
+            if output_frame is frame and (out_width, out_height) != (decode_width, decode_height):
+                output_frame = cv2.resize(frame, (out_width, out_height))
 
-            for lg in list(prominence_per_frame.keys()):
-                if lg not in per_brand_prominence_frame:
-                    while len(prominence_per_frame[lg]) < (frame_count - 1):
-                        prominence_per_frame[lg].append(0.0)
-                    prominence_per_frame[lg].append(0.0)
+            # Write raw frame and annotated frame; skipped frames are held so the videos
+            # stay aligned with source frame numbers
+            with timer.stage('write_raw'):
+                for _ in range(weight):
+                    raw_out.write(output_frame)
+            # Store the frame's detections
+            if detection_store is not None:
+                with timer.stage('detection_store'):
+                    try:
+                        detection_store.add_frame(frame_count, stored_detections)
+                    except Exception:
+                        pass
 
-            # Write raw frame and annotated frame
-            raw_out.write(frame)
-            # Write per-frame detections JSONL
-            if detections_writer is not None:
-                try:
-                    detections_writer.write(json.dumps({
-                        "frame": frame_count,
-                        "time": round(frame_count * frame_time, 3),
-                        "detections": per_frame_detections
-                    }) + "\n")
-                except Exception:
-                    pass
+            with timer.stage('annotate'):
+                annotated_frame = self._annotate_frame(output_frame, detections, scale=output_scale)
+            with timer.stage('write_annotated'):
+                for _ in range(weight):
+                    out.write(annotated_frame)
 
-            annotated_frame = self._annotate_frame(frame, results)
-            out.write(annotated_frame)
+            # Writers are done with the buffers; recycle them for the readers
+            ring.release(slot)
+            if output_slot is not None:
+                output_ring.release(output_slot)
+            self.job_metrics.advance(frame_count)
+            if self.profiler is not None and self.profiler.running:
+                self.profiler.on_frame()
 
             # Update progress percentage if we know estimated_total_frames
             progress_pct = (frame_count / estimated_total_frames * 100) if estimated_total_frames else 0
@@ -919,21 +1096,42 @@ class InferenceManager:
             elif progress_pct > 100:
                 progress_pct = 100
             msg_suffix = f" (~{round(progress_pct)}%)" if estimated_total_frames else ""
+            details = None
+            if realtime:
+                msg_suffix = f" ({lag_seconds:.1f}s behind live)"
+                details = {
+                    "live": True,
+                    "lag_seconds": round(lag_seconds, 2),
+                    "dropped_frames": frame_count - inferred_frames,
+                    "inferred_frames": inferred_frames
+                }
+            if inferred_frames % 25 == 0:
+                details = dict(details or {}, timings=timer.summary())
+                if estimated_total_frames:
+                    details["eta"] = eta.update(frame_count, self.job_metrics.frames_per_second())
             self.progress.update_progress(
                 ProgressStage.INFERENCE_PROGRESS,
                 f"Processing frame {frame_count}{msg_suffix}",
                 frame=frame_count,
                 total_frames=estimated_total_frames,
-                progress_percentage=progress_pct
+                progress_percentage=progress_pct,
+                details=details
             )
+            if memory.due():
+                self._check_memory(memory, accumulator)
 
-        pipe.stdout.close()
-        pipe.wait()
+        frame = output_frame = None
+        if decoder is not None:
+            decoder.close()
+        ring.close()
+        if output_decoder is not None:
+            output_decoder.close()
+            output_ring.close()
         out.release()
         raw_out.release()
         try:
-            if detections_writer is not None:
-                detections_writer.close()
+            if detection_store is not None:
+                detection_store.close()
         except Exception:
             pass
 
@@ -945,111 +1143,53 @@ class InferenceManager:
             "Aggregating statistics"
         )
 
-        final_stats = {}
-        for logo, stats in aggregated_stats.items():
-            time_value = round(stats["time"], 2)
-            frames_present = stats["frames"]
-            sum_cov_present = stats.get("sum_coverage_present", 0.0)
-            max_cov = stats.get("max_coverage", 0.0)
-            sum_prom_present = stats.get("sum_prominence_present", 0.0)
-            max_prom = stats.get("max_prominence", 0.0)
-            high_prom_time = stats.get("high_prominence_time", 0.0)
-            sum_sov_present = stats.get("sum_share_of_voice_present", 0.0)
-            solo_time = stats.get("solo_time", 0.0)
-            percentage_time = (time_value / total_video_time * 100) if total_video_time > 0 else 0
-            avg_cov_present = (sum_cov_present / frames_present * 100) if frames_present > 0 else 0.0
-            avg_cov_overall = (sum_cov_present / total_frames * 100) if total_frames > 0 else 0.0
-            avg_prom_present = (sum_prom_present / frames_present * 100) if frames_present > 0 else 0.0
-            avg_sov_present = (sum_sov_present / frames_present * 100) if frames_present > 0 else 0.0
-            solo_percentage = (solo_time / time_value * 100) if time_value > 0 else 0.0
-
-            # Filter out brands with less than 50 detections to reduce false positives
-            if stats["detections"] >= 50:
-                final_stats[logo] = {
-                    "frames": frames_present,
-                    "time": min(time_value, total_video_time),
-                    "detections": stats["detections"],
-                    "percentage": round(percentage_time, 2),
-                    "coverage_avg_present": round(avg_cov_present, 2),
-                    "coverage_avg_overall": round(avg_cov_overall, 2),
-                    "coverage_max": round(max_cov * 100, 2),
-                    "prominence_avg_present": round(avg_prom_present, 2),
-                    "prominence_max": round(max_prom * 100, 2),
-                    "prominence_high_time": round(high_prom_time, 2),
-                    "share_of_voice_avg_present": round(avg_sov_present, 2),
-                    "share_of_voice_solo_time": round(solo_time, 2),
-                    "share_of_voice_solo_percentage": round(solo_percentage, 2)
+        extra_metadata = None
+        if realtime:
+            extra_metadata = {
+                "realtime": {
+                    "latency_budget": self.latency_budget,
+                    "inferred_frames": inferred_frames,
+                    "dropped_frames": total_frames - inferred_frames,
+                    "max_lag_seconds": round(max_lag_seconds, 2)
                 }
-
-        output_data = {
-            "video_metadata": {
-                "duration": round(total_video_time, 2),
-                "fps": round(fps, 2),
-                "total_frames": total_frames,
-                "width": width,
-                "height": height
-            },
-            "logo_stats": final_stats
-        }
-
-        with open(stats_file, "w") as f:
-            json.dump(output_data, f, indent=4)
-
-        with open(timeline_stats_file, "w") as f:
-            json.dump(frame_by_frame_detections, f)
-
-        # Write coverage debug artifacts
-        try:
-            coverage_debug = {"resolution": {"width": width, "height": height, "frame_area": width * height}, "frames_total": total_frames, "per_logo": {}}
-            frame_area_dbg = float(width * height)
-            for logo, stats in aggregated_stats.items():
-                frames_present = stats["frames"]
-                sum_area_px = stats.get("sum_area_present_px", 0.0)
-                sum_cov = stats.get("sum_coverage_present", 0.0)
-                max_cov = stats.get("max_coverage", 0.0)
-                coverage_debug["per_logo"][logo] = {
-                    "frames_present": frames_present,
-                    "sum_area_present_px": round(float(sum_area_px), 2),
-                    "avg_area_present_px": round(float(sum_area_px / frames_present), 2) if frames_present > 0 else 0.0,
-                    "avg_coverage_present_pct": round(float((sum_cov / frames_present) * 100.0), 3) if frames_present > 0 else 0.0,
-                    "avg_coverage_overall_pct": round(float((sum_cov / total_frames) * 100.0), 3) if total_frames > 0 else 0.0,
-                    "max_coverage_pct": round(float(max_cov * 100.0), 3),
-                    "frame_area_px": int(frame_area_dbg)
-                }
-            with open(os.path.join(result_dir, 'coverage_debug.json'), 'w') as f:
-                json.dump(coverage_debug, f, indent=2)
-            for lg, series in coverage_per_frame.items():
-                while len(series) < total_frames:
-                    series.append(0.0)
-            coverage_series = {"frames_total": total_frames, "per_logo": {lg: [round(float(v), 4) for v in series] for lg, series in coverage_per_frame.items()}}
-            with open(os.path.join(result_dir, 'coverage_per_frame.json'), 'w') as f:
-                json.dump(coverage_series, f, indent=2)
-            # Write prominence series
-            for lg, series in prominence_per_frame.items():
-                while len(series) < total_frames:
-                    series.append(0.0)
-            prominence_series = {"frames_total": total_frames, "per_logo": {lg: [round(float(v), 2) for v in series] for lg, series in prominence_per_frame.items()}}
-            with open(os.path.join(result_dir, 'prominence_per_frame.json'), 'w') as f:
-                json.dump(prominence_series, f, indent=2)
-        except Exception as e:
-            print(f"Failed to write coverage debug (stream): {e}")
+            }
+        brand_events.finish()
+        event_dispatcher.close(timeout=5)
+        accumulator.write_outputs(result_dir, total_frames, total_video_time, extra_metadata)
+        accumulator.close()
+        if sweep is not None:
+            sweep.write_outputs(result_dir, total_frames, total_video_time,
+                                dict(extra_metadata or {}, confidence_floor=self._model_confidence()))
+        write_detections_meta(result_dir, width, height, fps, total_frames, total_video_time,
+                              min_confidence, self._model_confidence())
+        snapshots.finish()
+        timings = self._write_timings(timer, result_dir)
+        # Live streams are paced by the source, so only VOD throughput goes into the profile
+        cost = self._record_cost(engine, metadata, frame_count, job_started, cpu_started, estimate,
+                                 record=not is_live and frame_count == inferred_frames)
 
         self.progress.update_progress(
             ProgressStage.COMPLETE,
-            "Processing complete"
+            "Processing complete",
+            details={"timings": timings, "memory": self._memory_report(memory), "cost": cost, "eta": None}
         )
 
-    def _resolve_hls_highest_variant(self, url: str) -> str:
-        """If URL is a master m3u8, select the highest-resolution (or bandwidth) variant."""
+    def _probe_stream(self, url):
+        """Probe the first video stream, falling back to 1280x720 @ 25 fps when probing fails."""
+        probe = probe_video(url)
+        if probe is None:
+            probe = {"width": 1280, "height": 720, "fps": 25.0, "frame_count": 0, "duration": 0.0, "codec": None}
+        return probe
+
+    def _list_hls_variants(self, url: str) -> list:
+        """If URL is a master m3u8, return its variants as dicts (uri, width, height, bandwidth)."""
         try:
             resp = requests.get(url, timeout=10)
             text = resp.text
             if '#EXT-X-STREAM-INF' not in text:
-                return url  # likely already a media playlist
+                return []  # likely already a media playlist
 
-            best_uri = None
-            best_pixels = -1
-            best_bw = -1
+            variants = []
             lines = text.splitlines()
             for i, line in enumerate(lines):
                 if line.startswith('#EXT-X-STREAM-INF'):
@@ -1075,20 +1215,40 @@ class InferenceManager:
                         j += 1
                     if j < len(lines):
                         uri = lines[j].strip()
-                        candidate = urljoin(url, uri)
-                        pixels = (width * height) if width > 0 and height > 0 else -1
-                        better = False
-                        if pixels > best_pixels:
-                            better = True
-                        elif pixels == -1 and best_pixels == -1 and bandwidth > best_bw:
-                            better = True
-                        if better:
-                            best_pixels = pixels
-                            best_bw = bandwidth
-                            best_uri = candidate
-            return best_uri or url
+                        variants.append({
+                            "uri": urljoin(url, uri),
+                            "width": width,
+                            "height": height,
+                            "bandwidth": bandwidth
+                        })
+            return variants
         except Exception:
-            return url
+            return []
+
+    def _select_hls_variant(self, variants, policy='inference'):
+        """Select a variant URI according to the quality policy.
+
+        'highest' picks the largest resolution (or bandwidth when resolutions are unknown),
+        'lowest' the smallest, and 'inference' the lowest rendition whose longest side still
+        covers the model input size, falling back to the highest when none is large enough.
+        """
+        if not variants:
+            return None
+
+        def pixels(v):
+            return v["width"] * v["height"] if v["width"] > 0 and v["height"] > 0 else -1
+
+        def quality(v):
+            return (pixels(v), v["bandwidth"])
+
+        if policy == 'lowest':
+            return min(variants, key=quality)["uri"]
+        if policy == 'inference':
+            target = self._get_inference_size()
+            adequate = [v for v in variants if pixels(v) > 0 and max(v["width"], v["height"]) >= target]
+            if adequate:
+                return min(adequate, key=quality)["uri"]
+        return max(variants, key=quality)["uri"]
     
     def _aggregate_stats(self, logo_stats):
         """Aggregate logo statistics"""
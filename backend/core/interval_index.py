@@ -0,0 +1,186 @@
+import os
+import json
+import math
+from bisect import bisect_left, bisect_right
+
+import numpy as np
+
+from backend.utils.atomic_file import atomic_write
+
+# Per-brand (start_frame, end_frame) runs of a job, replacing the frame lists of timeline_stats.json
+INTERVALS_FILE = 'timeline_intervals.json'
+# Results written before the interval index
+TIMELINE_FILE = 'timeline_stats.json'
+
+
+def runs_from_frames(frames, max_gap=0, runs=None):
+    """
+    [[start, end], ...] runs (inclusive) of ascending frame numbers, appended to runs when
+    given. Runs at most max_gap missing frames apart are merged into one.
+    """
+    runs = [] if runs is None else runs
+    frames = np.asarray(frames, dtype=np.int64)
+    if not len(frames):
+        return runs
+    breaks = np.flatnonzero(np.diff(frames) > max_gap + 1)
+    starts = frames[np.concatenate(([0], breaks + 1))].tolist()
+    ends = frames[np.concatenate((breaks, [len(frames) - 1]))].tolist()
+    for start, end in zip(starts, ends):
+        if runs and start - runs[-1][1] <= max_gap + 1:
+            runs[-1][1] = max(runs[-1][1], end)
+        else:
+            runs.append([start, end])
+    return runs
+
+
+def merge_runs(runs, max_gap=0):
+    """Ascending runs with those at most max_gap missing frames apart merged"""
+    merged = []
+    for start, end in runs:
+        if merged and start - merged[-1][1] <= max_gap + 1:
+            merged[-1][1] = max(merged[-1][1], end)
+        else:
+            merged.append([start, end])
+    return merged
+
+
+def expand_runs(runs):
+    """The frame numbers covered by runs"""
+    frames = []
+    for start, end in runs:
+        frames.extend(range(start, end + 1))
+    return frames
+
+
+class IntervalIndex:
+    """
+    Run-length index of the frames each brand is present in. Runs are ascending and
+    disjoint; max_gap is the number of missing frames merged over when they were built
+    (0: the runs hold exactly the frames the brand was detected in).
+    """
+
+    def __init__(self, intervals, max_gap=0):
+        self.intervals = {brand: [[int(start), int(end)] for start, end in runs] for brand, runs in intervals.items()}
+        self.max_gap = int(max_gap)
+        self._starts = {}
+        self._cumulative = {}
+
+    @classmethod
+    def from_timeline(cls, timeline, max_gap=0):
+        """Index of a {brand: [frames]} timeline"""
+        return cls({brand: runs_from_frames(sorted(frames), max_gap) for brand, frames in timeline.items()}, max_gap)
+
+    @classmethod
+    def from_payload(cls, payload):
+        """Index of a timeline_intervals.json payload"""
+        payload = payload or {}
+        return cls(payload.get("intervals") or {}, payload.get("max_gap", 0))
+
+    def to_payload(self):
+        """The timeline_intervals.json payload"""
+        return {"max_gap": self.max_gap, "intervals": self.intervals}
+
+    def to_timeline(self):
+        """{brand: [frames]} as timeline_stats.json stored it"""
+        return {brand: expand_runs(runs) for brand, runs in self.intervals.items()}
+
+    def brands(self):
+        return list(self.intervals)
+
+    def runs(self, brand):
+        return self.intervals.get(brand, [])
+
+    def _index(self, brand):
+        """Run starts and cumulative run lengths of a brand, for bisecting"""
+        if brand not in self._starts:
+            runs = self.runs(brand)
+            cumulative = [0]
+            for start, end in runs:
+                cumulative.append(cumulative[-1] + end - start + 1)
+            self._starts[brand] = [start for start, _ in runs]
+            self._cumulative[brand] = cumulative
+        return self._starts[brand], self._cumulative[brand]
+
+    def frame_count(self, brand):
+        """Frames the brand is present in"""
+        return self._index(brand)[1][-1]
+
+    def is_present(self, brand, frame):
+        starts, _ = self._index(brand)
+        i = bisect_right(starts, frame) - 1
+        return i >= 0 and frame <= self.runs(brand)[i][1]
+
+    def frames_present(self, brand, first, last):
+        """Number of frames in first..last (inclusive) the brand is present in"""
+        if last < first:
+            return 0
+        starts, cumulative = self._index(brand)
+        runs = self.runs(brand)
+        # Runs starting up to last, minus what lies before first
+        count_runs = bisect_right(starts, last)
+        if not count_runs:
+            return 0
+        total = cumulative[count_runs]
+        start, end = runs[count_runs - 1]
+        if end > last:
+            total -= end - last
+        before = bisect_right(starts, first - 1)
+        if before:
+            total -= cumulative[before - 1]
+            start, end = runs[before - 1]
+            total -= min(end, first - 1) - start + 1
+        return total
+
+    def runs_between(self, brand, first, last):
+        """Runs of the brand clipped to first..last (inclusive)"""
+        starts, _ = self._index(brand)
+        runs = self.runs(brand)
+        clipped = []
+        for start, end in runs[max(0, bisect_left(starts, first) - 1):bisect_right(starts, last)]:
+            if end >= first:
+                clipped.append([max(start, first), min(end, last)])
+        return clipped
+
+    def longest_runs(self, brand=None, count=5, max_gap=0):
+        """
+        (brand, start, end) of the longest runs, of one brand or all of them, longest
+        first. Runs at most max_gap frames apart are merged first.
+        """
+        found = []
+        for name in ([brand] if brand is not None else self.brands()):
+            for start, end in merge_runs(self.runs(name), max_gap):
+                found.append((name, start, end))
+        found.sort(key=lambda run: (-(run[2] - run[1]), run[1]))
+        return found[:count]
+
+    def best_window(self, brand, length):
+        """
+        (start frame, frames present) of the window of `length` frames starting at a
+        frame the brand is present in that holds the most present frames (earliest on ties)
+        """
+        best_start, best_count = None, 0
+        # Within a run, moving the start later cannot gain frames, so run starts suffice
+        for start, _ in self.runs(brand):
+            count = self.frames_present(brand, start, math.ceil(start + length) - 1)
+            if count > best_count:
+                best_start, best_count = start, count
+        return best_start, best_count
+
+
+def write_intervals(result_dir, index):
+    """Write timeline_intervals.json"""
+    with atomic_write(os.path.join(result_dir, INTERVALS_FILE)) as f:
+        json.dump(index.to_payload(), f)
+
+
+def load_intervals(result_dir):
+    """The interval index of a finished job, built from timeline_stats.json for older results; None if missing"""
+    path = os.path.join(result_dir, INTERVALS_FILE)
+    if os.path.exists(path):
+        with open(path) as f:
+            return IntervalIndex.from_payload(json.load(f))
+    legacy_path = os.path.join(result_dir, TIMELINE_FILE)
+    if os.path.exists(legacy_path):
+        with open(legacy_path) as f:
+            return IntervalIndex.from_timeline(json.load(f))
+    return None
@@ -0,0 +1,139 @@
+import os
+import json
+import shutil
+
+from backend.core.interval_index import IntervalIndex, merge_runs, runs_from_frames
+from backend.utils.atomic_file import atomic_write
+
+# Present in a result directory while partial snapshots are being written
+PARTIAL_MARKER = '.partial'
+# Incremental per-frame series parts, one file per snapshot and series
+PARTS_DIR = '.partial_series'
+SERIES_DIGITS = {'coverage': 4, 'prominence': 2}
+
+
+def is_partial(result_dir):
+    """True while the job writing result_dir has only published partial snapshots"""
+    return os.path.exists(os.path.join(result_dir, PARTIAL_MARKER))
+
+
+def _part_files(result_dir, kind):
+    parts_dir = os.path.join(result_dir, PARTS_DIR)
+    if not os.path.isdir(parts_dir):
+        return []
+    names = sorted(n for n in os.listdir(parts_dir) if n.startswith(kind + '_') and n.endswith('.json'))
+    return [os.path.join(parts_dir, n) for n in names]
+
+
+def load_partial_intervals(result_dir):
+    """Assemble the interval index of the timeline parts written so far"""
+    intervals = {}
+    max_gap = 0
+    for path in _part_files(result_dir, 'timeline'):
+        with open(path) as f:
+            part = json.load(f)
+        max_gap = part.get("max_gap", 0)
+        for logo, runs in part["runs"].items():
+            intervals.setdefault(logo, []).extend(runs)
+    # Runs continuing across two snapshots are joined
+    return IntervalIndex({logo: merge_runs(runs, max_gap) for logo, runs in intervals.items()}, max_gap)
+
+
+def load_partial_series(result_dir, kind):
+    """
+    Assemble a coverage/prominence per-frame payload (same layout as the final
+    coverage_per_frame.json / prominence_per_frame.json) from the parts written so far
+    """
+    per_logo = {}
+    frames_total = 0
+    for path in _part_files(result_dir, kind):
+        with open(path) as f:
+            part = json.load(f)
+        start, end = part["start_frame"], part["end_frame"]
+        length = end - start + 1
+        for logo in part["per_logo"]:
+            if logo not in per_logo:
+                per_logo[logo] = [0.0] * (start - 1)
+        for logo, series in per_logo.items():
+            series.extend(part["per_logo"].get(logo) or [0.0] * length)
+        frames_total = end
+    return {"frames_total": frames_total, "per_logo": per_logo, "partial": True}
+
+
+class PartialSnapshotWriter:
+    """
+    Periodically publishes partial results of a running job.
+
+    Every interval_frames processed frames, stats.json is rewritten (flagged
+    "partial") and the per-frame series of the frames since the previous snapshot
+    are written as new part files, so each snapshot costs time proportional to the
+    new frames only. All files are replaced atomically.
+    """
+
+    def __init__(self, result_dir, accumulator, interval_frames):
+        self.result_dir = result_dir
+        self.accumulator = accumulator
+        self.interval_frames = int(interval_frames)
+        self.parts_dir = os.path.join(result_dir, PARTS_DIR)
+        self.last_frame = 0
+        self.snapshots = 0
+
+    def due(self, frame_count):
+        """Whether a snapshot should be written after frame_count frames"""
+        return self.interval_frames > 0 and frame_count - self.last_frame >= self.interval_frames
+
+    def write(self, frame_count, expected_total_frames=None, extra_metadata=None):
+        """Publish a snapshot covering frames 1..frame_count"""
+        try:
+            if self.snapshots == 0:
+                shutil.rmtree(self.parts_dir, ignore_errors=True)
+                os.makedirs(self.parts_dir, exist_ok=True)
+                open(os.path.join(self.result_dir, PARTIAL_MARKER), 'w').close()
+            start = self.last_frame + 1
+            self.snapshots += 1
+            self._write_parts(start, frame_count)
+
+            metadata = {"processed_frames": frame_count}
+            if expected_total_frames:
+                metadata["expected_total_frames"] = expected_total_frames
+            if extra_metadata:
+                metadata.update(extra_metadata)
+            stats = self.accumulator.build_stats(frame_count, frame_count * self.accumulator.frame_time, metadata)
+            stats["partial"] = True
+            with atomic_write(os.path.join(self.result_dir, 'stats.json')) as f:
+                json.dump(stats, f, indent=4)
+            self.last_frame = frame_count
+        except Exception as e:
+            print(f"Failed to write partial snapshot: {e}")
+
+    def _write_parts(self, start, end):
+        name = f"{self.snapshots:06d}.json"
+        acc = self.accumulator
+        timeline = {}
+        for logo in acc.frame_by_frame_detections.keys:
+            frames = [f for f in acc.frame_by_frame_detections.iter_frames(logo, start) if f <= end]
+            if frames:
+                timeline[logo] = runs_from_frames(frames, acc.timeline_max_gap)
+        with atomic_write(os.path.join(self.parts_dir, 'timeline_' + name)) as f:
+            json.dump({"start_frame": start, "end_frame": end, "max_gap": acc.timeline_max_gap, "runs": timeline}, f)
+
+        for kind, store in (('coverage', acc.coverage_per_frame), ('prominence', acc.prominence_per_frame)):
+            digits = SERIES_DIGITS[kind]
+            per_logo = {}
+            for logo in store.keys:
+                if not any(True for _ in store.iter_chunks(logo, start_frame=start)):
+                    continue
+                values = []
+                for block in store.iter_dense(logo, end, start_frame=start):
+                    values.extend(round(v, digits) for v in block.tolist())
+                per_logo[logo] = values
+            with atomic_write(os.path.join(self.parts_dir, f'{kind}_' + name)) as f:
+                json.dump({"start_frame": start, "end_frame": end, "per_logo": per_logo}, f)
+
+    def finish(self):
+        """Drop the partial marker and parts once the final results have been written"""
+        try:
+            os.remove(os.path.join(self.result_dir, PARTIAL_MARKER))
+        except FileNotFoundError:
+            pass
+        shutil.rmtree(self.parts_dir, ignore_errors=True)
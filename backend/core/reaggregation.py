@@ -0,0 +1,199 @@
+import os
+import json
+import hashlib
+
+import numpy as np
+
+from backend.core.detection_store import DetectionStore, STORE_DIR, detections_path, stored_confidence
+from backend.core.exposure_stats import (
+    ExposureStatsAccumulator, MIN_DETECTIONS, PROMINENCE_HIGH_THRESHOLD, PROMINENCE_WEIGHTS
+)
+from backend.core.interval_index import INTERVALS_FILE
+from backend.core.partial_results import is_partial
+from backend.utils.atomic_file import atomic_write
+
+# Re-aggregated outputs of a job live in result_dir/reaggregated/<variant>/
+REAGGREGATED_DIR = 'reaggregated'
+# Source properties of the stored detections that stats.json only keeps rounded
+DETECTIONS_META = 'frame_detections_meta.json'
+
+# Post-processing parameters a job's stats can be rebuilt with; the defaults reproduce the job's outputs
+DEFAULT_PARAMS = {
+    "min_detections": MIN_DETECTIONS,
+    # Detections below this confidence are dropped (None: the threshold of the job's own outputs;
+    # lower ones only see the detections stored down to the model's confidence floor)
+    "min_confidence": None,
+    # (center, size) weights of the prominence score
+    "prominence_weights": list(PROMINENCE_WEIGHTS),
+    "prominence_high_threshold": PROMINENCE_HIGH_THRESHOLD,
+    # Optional {raw class: brand} mapping replacing the brand grouping used at inference
+    "logo_groups": None
+}
+
+
+def normalize_params(params):
+    """Validated post-processing parameters with defaults filled in; raises ValueError"""
+    params = dict(params or {})
+    unknown = set(params) - set(DEFAULT_PARAMS)
+    if unknown:
+        raise ValueError(f"Unknown parameters: {', '.join(sorted(unknown))}")
+    result = dict(DEFAULT_PARAMS, **{k: v for k, v in params.items() if v is not None})
+    try:
+        result["min_detections"] = int(result["min_detections"])
+        if result["min_confidence"] is not None:
+            result["min_confidence"] = float(result["min_confidence"])
+        result["prominence_high_threshold"] = float(result["prominence_high_threshold"])
+        result["prominence_weights"] = [float(w) for w in result["prominence_weights"]]
+    except (TypeError, ValueError):
+        raise ValueError("Parameters must be numbers")
+    if result["min_detections"] < 0:
+        raise ValueError("min_detections must be 0 or more")
+    if result["min_confidence"] is not None and not 0.0 <= result["min_confidence"] <= 1.0:
+        raise ValueError("min_confidence must be between 0 and 1")
+    if not 0.0 <= result["prominence_high_threshold"] <= 1.0:
+        raise ValueError("prominence_high_threshold must be between 0 and 1")
+    weights = result["prominence_weights"]
+    if len(weights) != 2 or min(weights) < 0:
+        raise ValueError("prominence_weights must be two non-negative numbers (center, size)")
+    groups = result["logo_groups"]
+    if groups is not None and not (isinstance(groups, dict) and
+                                   all(isinstance(k, str) and isinstance(v, str) for k, v in groups.items())):
+        raise ValueError("logo_groups must map class names to brand names")
+    return result
+
+
+def variant_id(params):
+    """Short stable name of a parameter set, used as its output directory"""
+    payload = json.dumps(normalize_params(params), sort_keys=True)
+    return hashlib.sha1(payload.encode('utf-8')).hexdigest()[:12]
+
+
+def write_detections_meta(result_dir, width, height, fps, total_frames, duration, min_confidence=0.0,
+                          confidence_floor=None):
+    """
+    Record the exact video properties the stored detections were aggregated with, the
+    confidence below which stored detections were left out of the job's outputs and the
+    confidence the model ran at (None: its default)
+    """
+    with atomic_write(os.path.join(result_dir, DETECTIONS_META)) as f:
+        json.dump({"width": width, "height": height, "fps": fps, "total_frames": total_frames,
+                   "duration": duration, "min_confidence": min_confidence,
+                   "confidence_floor": confidence_floor}, f)
+
+
+def load_detections(record, logo_groups=None, min_confidence=0.0):
+    """
+    Detection dicts (as InferenceManager._extract_detections returns them) of a
+    frame_detections.jsonl record (results written before the detection store). Records written before confidences and raw class
+    names were stored count as confidence 1.0 under their brand.
+    """
+    detections = []
+    min_confidence = stored_confidence(min_confidence)
+    for det in record.get("detections") or []:
+        confidence = stored_confidence(det.get("confidence", 1.0))
+        if confidence < min_confidence:
+            continue
+        raw_class = det.get("raw_class", det["class"])
+        polygon = det.get("polygon")
+        detections.append({
+            "class": logo_groups.get(raw_class, raw_class) if logo_groups is not None else det["class"],
+            "raw_class": raw_class,
+            "confidence": confidence,
+            "points": np.array(polygon, dtype=np.float32) if polygon else None
+        })
+    return detections
+
+
+def read_source(result_dir):
+    """
+    Properties the stored detections of a finished job were aggregated with: width,
+    height, fps, total_frames, duration, min_confidence (of the job's own outputs) and
+    the rest of its stats.json video_metadata
+    """
+    if is_partial(result_dir):
+        raise RuntimeError("The job is still processing")
+    stats_path = os.path.join(result_dir, 'stats.json')
+    if not os.path.exists(detections_path(result_dir)) or not os.path.exists(stats_path):
+        raise FileNotFoundError(f"No stored detections in {result_dir}")
+    with open(stats_path) as f:
+        video_metadata = dict(json.load(f)["video_metadata"])
+    source = {key: video_metadata.pop(key) for key in ("width", "height", "fps", "total_frames", "duration")}
+    source["min_confidence"] = 0.0
+    # stats.json rounds the frame rate and duration; the exact ones reproduce the job's times
+    meta_path = os.path.join(result_dir, DETECTIONS_META)
+    if os.path.exists(meta_path):
+        with open(meta_path) as f:
+            source.update(json.load(f))
+    video_metadata.pop("aggregation", None)
+    source["video_metadata"] = video_metadata
+    # Gap the job's timeline runs were merged over
+    source["timeline_max_gap"] = 0
+    intervals_path = os.path.join(result_dir, INTERVALS_FILE)
+    if os.path.exists(intervals_path):
+        with open(intervals_path) as f:
+            source["timeline_max_gap"] = json.load(f).get("max_gap", 0)
+    return source
+
+
+def iter_records(result_dir):
+    """(weight, record) of each frame_detections.jsonl record of a job"""
+    frame_count = 0
+    with open(detections_path(result_dir)) as f:
+        for line in f:
+            if not line.strip():
+                continue
+            record = json.loads(line)
+            # A record covers the frames since the previous one (skipped frames carry its detections)
+            weight = int(record["frame"]) - frame_count
+            if weight <= 0:
+                continue
+            frame_count += weight
+            yield weight, record
+
+
+def iter_detections(result_dir, logo_groups=None, min_confidence=0.0):
+    """
+    (weight, detections) of each stored frame of a job, from its detection store or the
+    frame_detections.jsonl of older results
+    """
+    path = detections_path(result_dir)
+    if os.path.basename(path) != STORE_DIR:
+        for weight, record in iter_records(result_dir):
+            yield weight, load_detections(record, logo_groups, min_confidence)
+        return
+    frame_count = 0
+    for frame, detections in DetectionStore(path).iter_frames(logo_groups=logo_groups, min_confidence=min_confidence):
+        weight = frame - frame_count
+        if weight <= 0:
+            continue
+        frame_count += weight
+        yield weight, detections
+
+
+def reaggregate(result_dir, params=None, output_dir=None, chunk_size=4096):
+    """
+    Rebuild stats.json, timeline_intervals.json and the per-frame coverage/prominence series
+    of a finished video job from its stored detections, without re-running the model.
+    Outputs go to output_dir (result_dir/reaggregated/<variant> by default; pass result_dir
+    to replace the job's own outputs). Returns the stats.json payload.
+    """
+    params = normalize_params(params)
+    source = read_source(result_dir)
+    if output_dir is None:
+        output_dir = os.path.join(result_dir, REAGGREGATED_DIR, variant_id(params))
+    os.makedirs(output_dir, exist_ok=True)
+    if params["min_confidence"] is None:
+        params["min_confidence"] = source["min_confidence"]
+    video_metadata = dict(source["video_metadata"], aggregation={k: v for k, v in params.items() if v is not None})
+
+    accumulator = ExposureStatsAccumulator(
+        source["width"], source["height"], source["fps"], spill_dir=os.path.join(output_dir, '.series'), chunk_size=chunk_size,
+        min_detections=params["min_detections"], prominence_weights=params["prominence_weights"],
+        prominence_high_threshold=params["prominence_high_threshold"], timeline_max_gap=source["timeline_max_gap"]
+    )
+    try:
+        for weight, detections in iter_detections(result_dir, params["logo_groups"], params["min_confidence"]):
+            accumulator.add_frame(detections, weight)
+        return accumulator.write_outputs(output_dir, source["total_frames"], source["duration"], video_metadata)
+    finally:
+        accumulator.close()
@@ -0,0 +1,128 @@
+import threading
+from collections import defaultdict
+
+# Per-brand sums kept in each bucket and window total
+_TIME, _FRAMES, _COVERAGE, _PROMINENCE, _SHARE_OF_VOICE = range(5)
+
+
+def _new_sums():
+    return [0.0, 0, 0.0, 0.0, 0.0]
+
+
+class RollingExposureWindow:
+    """
+    Rolling per-brand exposure over the last N seconds of an open-ended stream.
+
+    Frames are summed into fixed-length time buckets (stream time, not wall clock).
+    Each window keeps running totals: a frame is added to every window once, and a
+    bucket is subtracted from a window when it slides out of it, so updates cost
+    O(brands in the frame) and memory is bounded by the longest window.
+    """
+
+    def __init__(self, fps, windows=(60, 300, 900), bucket_seconds=1.0):
+        """Track windows of the given lengths in seconds for a stream at `fps`"""
+        self.frame_time = 1 / fps if fps > 0 else 0
+        self.bucket_seconds = float(bucket_seconds)
+        self.windows = sorted(int(w) for w in windows)
+        self.elapsed = 0.0
+        self._buckets = {}
+        self._current = -1
+        # Per window: frames, per-brand sums, and the last bucket index already subtracted
+        self._frames = {w: 0 for w in self.windows}
+        self._totals = {w: defaultdict(_new_sums) for w in self.windows}
+        self._expired = {w: -1 for w in self.windows}
+        self._lock = threading.Lock()
+
+    def _window_buckets(self, window):
+        return max(1, int(round(window / self.bucket_seconds)))
+
+    def _advance(self, bucket_index):
+        """Move to a new bucket, sliding old buckets out of each window"""
+        self._current = bucket_index
+        for window in self.windows:
+            last_expired = bucket_index - self._window_buckets(window)
+            totals = self._totals[window]
+            for index in range(self._expired[window] + 1, last_expired + 1):
+                bucket = self._buckets.get(index)
+                if bucket is None:
+                    continue
+                frames, brands = bucket
+                self._frames[window] -= frames
+                for brand, sums in brands.items():
+                    brand_totals = totals[brand]
+                    for k in range(5):
+                        brand_totals[k] -= sums[k]
+                    if brand_totals[_FRAMES] <= 0:
+                        del totals[brand]
+            self._expired[window] = max(self._expired[window], last_expired)
+        # Drop buckets that have left the longest window
+        oldest_kept = bucket_index - self._window_buckets(self.windows[-1])
+        for index in [i for i in self._buckets if i <= oldest_kept]:
+            del self._buckets[index]
+
+    def add_frame(self, summary, weight=1):
+        """
+        Add one inferred frame. `summary` is the per-brand frame summary returned by
+        ExposureStatsAccumulator.add_frame; weight is the number of source frames it covers.
+        """
+        with self._lock:
+            bucket_index = int(self.elapsed // self.bucket_seconds) if self.bucket_seconds > 0 else 0
+            if bucket_index != self._current:
+                self._advance(bucket_index)
+            self.elapsed += self.frame_time * weight
+
+            bucket = self._buckets.get(bucket_index)
+            if bucket is None:
+                bucket = self._buckets[bucket_index] = [0, defaultdict(_new_sums)]
+            bucket[0] += weight
+            increments = {}
+            for brand, values in summary.items():
+                increments[brand] = (
+                    self.frame_time * weight,
+                    weight,
+                    values.get("coverage", 0.0) * weight,
+                    values.get("prominence", 0.0) * weight,
+                    values.get("share_of_voice", 0.0) * weight
+                )
+            for brand, inc in increments.items():
+                sums = bucket[1][brand]
+                for k in range(5):
+                    sums[k] += inc[k]
+            for window in self.windows:
+                self._frames[window] += weight
+                totals = self._totals[window]
+                for brand, inc in increments.items():
+                    sums = totals[brand]
+                    for k in range(5):
+                        sums[k] += inc[k]
+
+    def bucket_count(self):
+        """Number of time buckets currently kept"""
+        return len(self._buckets)
+
+    def snapshot(self):
+        """Per-window, per-brand exposure time, share of window, and mean coverage/prominence/SoV"""
+        with self._lock:
+            result = {"stream_time": round(self.elapsed, 2), "windows": {}}
+            for window in self.windows:
+                covered = min(float(window), self.elapsed)
+                brands = {}
+                for brand, sums in self._totals[window].items():
+                    frames = sums[_FRAMES]
+                    if frames <= 0:
+                        continue
+                    brands[brand] = {
+                        "exposure_time": round(sums[_TIME], 2),
+                        "exposure_percentage": round(sums[_TIME] / covered * 100.0, 2) if covered > 0 else 0.0,
+                        "frames": frames,
+                        "avg_coverage_present": round(sums[_COVERAGE] / frames * 100.0, 2),
+                        "avg_prominence_present": round(sums[_PROMINENCE] / frames * 100.0, 2),
+                        "avg_share_of_voice_present": round(sums[_SHARE_OF_VOICE] / frames * 100.0, 2)
+                    }
+                result["windows"][str(window)] = {
+                    "window_seconds": window,
+                    "covered_seconds": round(covered, 2),
+                    "frames": self._frames[window],
+                    "brands": brands
+                }
+            return result
@@ -0,0 +1,166 @@
+import os
+import json
+import shutil
+
+import numpy as np
+
+
+class SparseSeriesStore:
+    """
+    Per-key sparse per-frame series kept on disk.
+
+    Each key (brand) records (frame, value) entries only for frames where it has
+    a value. Entries are buffered in a fixed-size chunk per key and appended to raw
+    files (<n>.frames as int64, <n>.values as float32) when the chunk fills, so RAM
+    use is bounded by keys x chunk_size no matter how long the video runs. The files
+    can be opened with np.memmap; manifest.json maps keys to file numbers.
+    """
+
+    def __init__(self, directory, chunk_size=4096, with_values=True):
+        """Store series under `directory`; with_values=False records frame numbers only"""
+        self.directory = directory
+        self.chunk_size = max(1, int(chunk_size))
+        self.with_values = with_values
+        os.makedirs(directory, exist_ok=True)
+        # Keys in first-seen order, mapped to their file number
+        self.keys = {}
+        self._counts = {}
+        self._frames = {}
+        self._values = {}
+        self._filled = {}
+
+    def __contains__(self, key):
+        return key in self.keys
+
+    def __len__(self):
+        return len(self.keys)
+
+    def _path(self, key, kind):
+        return os.path.join(self.directory, f"{self.keys[key]}.{kind}")
+
+    def _add_key(self, key):
+        self.keys[key] = len(self.keys)
+        self._counts[key] = 0
+        self._frames[key] = np.empty(self.chunk_size, dtype=np.int64)
+        if self.with_values:
+            self._values[key] = np.empty(self.chunk_size, dtype=np.float32)
+        self._filled[key] = 0
+
+    def append(self, key, frame, value=0.0):
+        """Record `value` for `key` at `frame` (frames must be appended in increasing order)"""
+        if key not in self.keys:
+            self._add_key(key)
+        filled = self._filled[key]
+        self._frames[key][filled] = frame
+        if self.with_values:
+            self._values[key][filled] = value
+        self._filled[key] = filled + 1
+        self._counts[key] += 1
+        if filled + 1 == self.chunk_size:
+            self._flush_key(key)
+
+    def append_range(self, key, first_frame, last_frame, value=0.0):
+        """Record the same value for frames first_frame..last_frame (inclusive)"""
+        for frame in range(first_frame, last_frame + 1):
+            self.append(key, frame, value)
+
+    def count(self, key):
+        """Number of entries recorded for key"""
+        return self._counts.get(key, 0)
+
+    def entries(self):
+        """Number of entries recorded for all keys"""
+        return sum(self._counts.values())
+
+    def buffer_bytes(self):
+        """Bytes held by the in-memory chunk buffers"""
+        return sum(a.nbytes for a in self._frames.values()) + sum(a.nbytes for a in self._values.values())
+
+    def set_chunk_size(self, chunk_size):
+        """Write all buffered entries to disk and continue with chunks of chunk_size entries"""
+        self.chunk_size = max(1, int(chunk_size))
+        for key in self.keys:
+            self._flush_key(key)
+            self._frames[key] = np.empty(self.chunk_size, dtype=np.int64)
+            if self.with_values:
+                self._values[key] = np.empty(self.chunk_size, dtype=np.float32)
+
+    def _flush_key(self, key):
+        filled = self._filled[key]
+        if filled == 0:
+            return
+        with open(self._path(key, 'frames'), 'ab') as f:
+            f.write(self._frames[key][:filled].tobytes())
+        if self.with_values:
+            with open(self._path(key, 'values'), 'ab') as f:
+                f.write(self._values[key][:filled].tobytes())
+        self._filled[key] = 0
+
+    def flush(self):
+        """Write all buffered entries and the manifest to disk"""
+        for key in self.keys:
+            self._flush_key(key)
+        with open(os.path.join(self.directory, 'manifest.json'), 'w') as f:
+            json.dump({"keys": self.keys, "with_values": self.with_values}, f)
+
+    def _disk_array(self, key, kind, dtype):
+        path = self._path(key, kind)
+        if not os.path.exists(path) or os.path.getsize(path) == 0:
+            return np.empty(0, dtype=dtype)
+        return np.memmap(path, dtype=dtype, mode='r')
+
+    def iter_chunks(self, key, block=65536, start_frame=1):
+        """
+        Yield (frames, values) array pairs for key in frame order, from start_frame on;
+        values is None without values
+        """
+        if key not in self.keys:
+            return
+        frames = self._disk_array(key, 'frames', np.int64)
+        values = self._disk_array(key, 'values', np.float32) if self.with_values else None
+        first = int(np.searchsorted(frames, start_frame)) if start_frame > 1 and len(frames) else 0
+        for start in range(first, len(frames), block):
+            yield (np.asarray(frames[start:start + block]),
+                   np.asarray(values[start:start + block]) if values is not None else None)
+        del frames, values
+        filled = self._filled[key]
+        if filled:
+            buffered = self._frames[key][:filled]
+            keep = buffered >= start_frame
+            if keep.any():
+                yield (buffered[keep].copy(), self._values[key][:filled][keep].copy() if self.with_values else None)
+
+    def iter_frames(self, key, start_frame=1):
+        """Yield the recorded frame numbers of key from start_frame on"""
+        for frames, _ in self.iter_chunks(key, start_frame=start_frame):
+            for frame in frames.tolist():
+                yield frame
+
+    def iter_dense(self, key, total_frames, block=65536, start_frame=1):
+        """
+        Yield the values of frames start_frame..total_frames in blocks, 0.0 where
+        nothing was recorded
+        """
+        dense = np.zeros(block, dtype=np.float32)
+        block_start = start_frame
+        for frames, values in self.iter_chunks(key, block, start_frame):
+            for frame, value in zip(frames.tolist(), values.tolist()):
+                if frame > total_frames:
+                    break
+                while frame >= block_start + block:
+                    yield dense
+                    dense = np.zeros(block, dtype=np.float32)
+                    block_start += block
+                dense[frame - block_start] = value
+        while block_start <= total_frames:
+            yield dense[:min(block, total_frames - block_start + 1)]
+            dense = np.zeros(block, dtype=np.float32)
+            block_start += block
+
+    def close(self, remove=True):
+        """Drop buffers and, by default, delete the spilled files"""
+        self._frames = {}
+        self._values = {}
+        self._filled = {key: 0 for key in self.keys}
+        if remove:
+            shutil.rmtree(self.directory, ignore_errors=True)
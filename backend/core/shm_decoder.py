@@ -0,0 +1,119 @@
+import multiprocessing
+from multiprocessing import shared_memory
+
+import numpy as np
+
+from backend.core.video_decoder import open_decoder
+
+
+def _attach_shared_memory(name):
+    """Attach to the shared memory block created by the parent process"""
+    try:
+        return shared_memory.SharedMemory(name=name, track=False)
+    except TypeError:
+        # Python < 3.13: spawned children share the parent's resource tracker, which
+        # already owns the block and releases it when the parent unlinks it
+        return shared_memory.SharedMemory(name=name)
+
+
+def _decoder_main(shm_name, shape, slots, source, backend, options, free_queue, ready_queue):
+    """Decoder process entry point: fill free slots with frames and announce them on ready_queue"""
+    shm = _attach_shared_memory(shm_name)
+    frame_bytes = int(np.prod(shape))
+    frames = [np.ndarray(shape, dtype=np.uint8, buffer=shm.buf, offset=i * frame_bytes) for i in range(slots)]
+    decoder = None
+    try:
+        decoder = open_decoder(source, backend, output_size=(shape[1], shape[0]), **options)
+        while True:
+            index = free_queue.get()
+            if index is None:
+                break
+            if not decoder.read_into(frames[index]):
+                break
+            ready_queue.put(index)
+    except Exception as e:
+        print(f"Decoder process failed: {e}")
+    finally:
+        ready_queue.put(None)
+        if decoder is not None:
+            decoder.close()
+        del frames
+        try:
+            shm.close()
+        except Exception:
+            pass
+
+
+class SharedMemoryFrameSource:
+    """
+    Decodes frames in a separate process into multiprocessing.shared_memory slots.
+
+    Slot indices are signalled over a queue, so the inference process reads frames
+    in place without copying or pickling them. Exposes the same get()/release()/
+    frames/close() interface as FrameRingBuffer.
+    """
+
+    def __init__(self, source, shape, slots=4, backend='opencv', **decoder_options):
+        """
+        Allocate `slots` shared frame buffers of the given (height, width, 3) shape.
+        Frames are decoded with the named decoder backend, scaled to that shape.
+        """
+        self.shape = tuple(int(x) for x in shape)
+        self.slots = max(2, int(slots))
+        self.backend = backend
+        frame_bytes = int(np.prod(self.shape))
+        self._shm = shared_memory.SharedMemory(create=True, size=frame_bytes * self.slots)
+        self.frames = [
+            np.ndarray(self.shape, dtype=np.uint8, buffer=self._shm.buf, offset=i * frame_bytes)
+            for i in range(self.slots)
+        ]
+
+        # Spawn keeps the decoder independent from the parent's threads and loaded model
+        ctx = multiprocessing.get_context('spawn')
+        self._free = ctx.Queue()
+        self._ready = ctx.Queue()
+        for index in range(self.slots):
+            self._free.put(index)
+        self._process = ctx.Process(
+            target=_decoder_main,
+            args=(self._shm.name, self.shape, self.slots, source, backend, decoder_options, self._free, self._ready)
+        )
+        self._process.daemon = True
+
+    def start(self):
+        """Start the decoder process"""
+        self._process.start()
+        return self
+
+    def get(self, timeout=None):
+        """Return the slot index of the next decoded frame, or None at the end of the source"""
+        return self._ready.get(timeout=timeout)
+
+    def pending(self):
+        """Number of decoded frames waiting for the consumer (None where the platform cannot tell)"""
+        try:
+            return self._ready.qsize()
+        except NotImplementedError:
+            return None
+
+    def release(self, index):
+        """Hand a slot back to the decoder once all consumers are done with its frame"""
+        self._free.put(index)
+
+    def close(self):
+        """Stop the decoder process and free the shared memory"""
+        self._free.put(None)
+        self._process.join(timeout=5)
+        if self._process.is_alive():
+            self._process.terminate()
+            self._process.join(timeout=5)
+        self.frames = []
+        try:
+            self._shm.close()
+        except BufferError:
+            # A caller still holds a view on a frame; the block is released once it goes away
+            pass
+        try:
+            self._shm.unlink()
+        except FileNotFoundError:
+            pass
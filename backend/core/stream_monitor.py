@@ -0,0 +1,119 @@
+import threading
+import time
+
+from backend.core.batch_inference import BatchInferenceServer
+from backend.core.inference_manager import InferenceManager
+from backend.utils.progress_manager import ProgressTracker
+
+
+class StreamMonitor:
+    """
+    Runs several stream jobs at once on one model.
+
+    Each stream gets its own InferenceManager (decoding, stats, outputs and progress
+    are per job); their frames are batched across streams by a shared
+    BatchInferenceServer. The server runs its own model instance, loaded from the base
+    manager's weights, since the base manager keeps calling its model for other jobs.
+    """
+
+    def __init__(self, inference_manager):
+        self.base = inference_manager
+        self.jobs = {}
+        self.lock = threading.Lock()
+        self.batch_server = None
+        # Model instance only the batch server's worker thread calls
+        self.model = None
+        self._server_lock = threading.Lock()
+
+    def _ensure_batch_server(self):
+        """Load the streams' model and start the batching server on first use"""
+        with self._server_lock:
+            if self.batch_server is None:
+                try:
+                    self.model = self.base._create_model()
+                except Exception as e:
+                    raise RuntimeError(f"Failed to load model: {e}")
+                self.batch_server = BatchInferenceServer(
+                    self.model,
+                    max_batch_size=self.base.batch_size,
+                    max_wait=self.base.batch_wait_ms / 1000.0,
+                    imgsz=self.base.imgsz,
+                    conf=self.base._model_confidence()
+                ).start()
+            return self.batch_server
+
+    def start_stream(self, url, job_id):
+        """Start monitoring a stream under job_id; a job already running for it is kept"""
+        batch_server = self._ensure_batch_server()
+        # Check and start under one lock so concurrent calls cannot start the job twice
+        with self.lock:
+            job = self.jobs.get(job_id)
+            if job is not None and job['thread'].is_alive():
+                return job_id
+            manager = InferenceManager(ProgressTracker())
+            manager.model = self.model
+            manager.class_names = self.base.class_names
+            manager.logo_groups = self.base.logo_groups
+            manager.output_dir = self.base.output_dir
+            manager.batch_server = batch_server
+            thread = manager.start_inference('video', url, job_id)
+            self.jobs[job_id] = {
+                'url': url,
+                'manager': manager,
+                'thread': thread,
+                'started': time.time()
+            }
+        print(f"Monitoring stream {url} as job {job_id}")
+        return job_id
+
+    def stop_stream(self, job_id):
+        """Stop a job after its current frame; its results are written as it finishes"""
+        with self.lock:
+            job = self.jobs.get(job_id)
+        if job is None:
+            return False
+        job['manager'].stop()
+        return True
+
+    def get_status(self, job_id):
+        """Progress of one job, or None if unknown"""
+        with self.lock:
+            job = self.jobs.get(job_id)
+        if job is None:
+            return None
+        return {
+            'job_id': job_id,
+            'url': job['url'],
+            'running': job['thread'].is_alive(),
+            'started': job['started'],
+            'progress': job['manager'].progress.get_progress()
+        }
+
+    def get_manager(self, job_id):
+        """InferenceManager running a job, or None if unknown"""
+        with self.lock:
+            job = self.jobs.get(job_id)
+        return job['manager'] if job is not None else None
+
+    def get_progress_tracker(self, job_id):
+        """Progress tracker of a job, or None if unknown"""
+        with self.lock:
+            job = self.jobs.get(job_id)
+        return job['manager'].progress if job is not None else None
+
+    def get_live_stats(self, job_id):
+        """Rolling window stats of a job, or None if unknown or not started yet"""
+        with self.lock:
+            job = self.jobs.get(job_id)
+        if job is None or job['manager'].live_stats is None:
+            return None
+        return job['manager'].live_stats.snapshot()
+
+    def list_status(self):
+        """Progress of all jobs plus batching statistics"""
+        with self.lock:
+            job_ids = list(self.jobs.keys())
+        return {
+            'jobs': [self.get_status(job_id) for job_id in job_ids],
+            'batching': self.batch_server.get_stats() if self.batch_server is not None else None
+        }
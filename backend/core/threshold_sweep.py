@@ -0,0 +1,184 @@
+import os
+import json
+from bisect import bisect_right
+from collections import defaultdict
+from itertools import accumulate
+
+import cv2
+
+from backend.core.detection_store import stored_confidence
+from backend.core.exposure_stats import (
+    MIN_DETECTIONS, PROMINENCE_HIGH_THRESHOLD, PROMINENCE_WEIGHTS,
+    _new_brand_stats, brand_metrics, build_video_metadata, detection_prominence
+)
+from backend.core.reaggregation import iter_detections, read_source
+from backend.utils.atomic_file import atomic_write
+
+SWEEP_FILE = 'threshold_sweep.json'
+
+
+def threshold_key(threshold):
+    """Key of a confidence threshold in the sweep matrix, e.g. '0.25'"""
+    return f"{threshold:g}"
+
+
+def parse_thresholds(values):
+    """Sorted distinct confidence thresholds from numbers or a comma-separated string; raises ValueError"""
+    if isinstance(values, str):
+        values = [v for v in values.split(',') if v.strip()]
+    try:
+        thresholds = sorted(set(float(v) for v in values or []))
+    except (TypeError, ValueError):
+        raise ValueError("Thresholds must be numbers")
+    if not thresholds:
+        raise ValueError("No thresholds given")
+    if thresholds[0] < 0 or thresholds[-1] > 1:
+        raise ValueError("Thresholds must be between 0 and 1")
+    return thresholds
+
+
+def parse_min_detections(values):
+    """Sorted distinct min-detection filters from numbers or a comma-separated string; raises ValueError"""
+    if isinstance(values, str):
+        values = [v for v in values.split(',') if v.strip()]
+    try:
+        filters = sorted(set(int(v) for v in values or [MIN_DETECTIONS]))
+    except (TypeError, ValueError):
+        raise ValueError("Min-detection filters must be integers")
+    if filters[0] < 0:
+        raise ValueError("Min-detection filters must be 0 or more")
+    return filters
+
+
+class ThresholdSweepAccumulator:
+    """
+    Per-brand exposure stats of a video for several confidence thresholds in one pass.
+
+    Each frame's detections of a brand are sorted by confidence once; a threshold keeps
+    a prefix of that order, so its detection count, logo area and best prominence come
+    from running sums/maxima instead of re-filtering the detections per threshold.
+    The metrics match ExposureStatsAccumulator's for the detections above a threshold.
+    """
+
+    def __init__(self, width, height, fps, thresholds, min_detections=(MIN_DETECTIONS,),
+                 prominence_weights=PROMINENCE_WEIGHTS, prominence_high_threshold=PROMINENCE_HIGH_THRESHOLD):
+        self.width = width
+        self.height = height
+        self.fps = fps
+        self.frame_time = 1 / fps if fps > 0 else 0
+        self.frame_area = float(width * height)
+        self.thresholds = parse_thresholds(thresholds)
+        # Thresholds at the precision detections are compared at, negated for bisecting
+        self._negated_thresholds = [-stored_confidence(t) for t in self.thresholds]
+        self.min_detections = parse_min_detections(min_detections)
+        self.prominence_weights = tuple(prominence_weights)
+        self.prominence_high_threshold = prominence_high_threshold
+        self.frame_count = 0
+        # Per threshold (in self.thresholds order): brand -> accumulators
+        self.aggregated_stats = [defaultdict(_new_brand_stats) for _ in self.thresholds]
+
+    def add_frame(self, detections, weight=1):
+        """Accumulate the next frame's detections (dicts with class, confidence and optional points)"""
+        self.frame_count += weight
+        frame_time = self.frame_time * weight
+        frame_area = self.frame_area
+
+        # brand -> [(confidence, area_px, prominence or -1)]
+        per_brand = defaultdict(list)
+        for det in detections:
+            points = det.get("points")
+            area_px = float(cv2.contourArea(points)) if points is not None and points.shape == (4, 2) else 0.0
+            prominence = -1.0
+            if area_px > 0:
+                try:
+                    prominence = detection_prominence(points, area_px, self.width, self.height,
+                                                      self.prominence_weights)
+                except Exception:
+                    pass
+            per_brand[det["class"]].append((stored_confidence(det.get("confidence", 1.0)), area_px, prominence))
+        if not per_brand:
+            return
+
+        # Confidences descending (negated for bisect), with running area sums and prominence maxima
+        brands = []
+        for brand, entries in per_brand.items():
+            entries.sort(key=lambda entry: -entry[0])
+            brands.append((
+                brand,
+                [-entry[0] for entry in entries],
+                list(accumulate(entry[1] for entry in entries)),
+                list(accumulate((entry[2] for entry in entries), max))
+            ))
+
+        for stats, negated_threshold in zip(self.aggregated_stats, self._negated_thresholds):
+            # Detections kept at this threshold: the prefix with confidence >= threshold
+            present = []
+            for brand, negated, areas, prominences in brands:
+                kept = bisect_right(negated, negated_threshold)
+                if kept:
+                    present.append((brand, kept, areas[kept - 1], prominences[kept - 1]))
+            if not present:
+                continue
+            share_of_voice = 1.0 / len(present)
+            for brand, kept, logo_area, prominence in present:
+                brand_stats = stats[brand]
+                brand_stats["detections"] += kept * weight
+                brand_stats["frames"] += weight
+                brand_stats["time"] += frame_time
+                if frame_area > 0:
+                    coverage_ratio = min(1.0, logo_area / frame_area)
+                    brand_stats["sum_coverage_present"] += coverage_ratio * weight
+                    brand_stats["sum_area_present_px"] += logo_area * weight
+                    if coverage_ratio > brand_stats["max_coverage"]:
+                        brand_stats["max_coverage"] = coverage_ratio
+                if prominence >= 0:
+                    brand_stats["sum_prominence_present"] += prominence * weight
+                    if prominence > brand_stats["max_prominence"]:
+                        brand_stats["max_prominence"] = prominence
+                    if prominence >= self.prominence_high_threshold:
+                        brand_stats["high_prominence_time"] += frame_time
+                brand_stats["sum_share_of_voice_present"] += share_of_voice * weight
+                if len(present) == 1:
+                    brand_stats["solo_time"] += frame_time
+
+    def build_sweep(self, total_frames, total_video_time, extra_metadata=None):
+        """
+        The threshold_sweep.json payload: per threshold and min-detection filter, the
+        logo_stats of stats.json for that confidence threshold
+        """
+        matrix = {}
+        for stats, threshold in zip(self.aggregated_stats, self.thresholds):
+            metrics = {logo: brand_metrics(brand_stats, total_frames, total_video_time)
+                       for logo, brand_stats in stats.items()}
+            matrix[threshold_key(threshold)] = {
+                str(minimum): {logo: m for logo, m in metrics.items() if m["detections"] >= minimum}
+                for minimum in self.min_detections
+            }
+        return {
+            "video_metadata": build_video_metadata(self.width, self.height, self.fps, total_frames,
+                                                   total_video_time, extra_metadata),
+            "thresholds": self.thresholds,
+            "min_detections": self.min_detections,
+            "matrix": matrix
+        }
+
+    def write_outputs(self, result_dir, total_frames, total_video_time, extra_metadata=None):
+        """Write threshold_sweep.json"""
+        sweep = self.build_sweep(total_frames, total_video_time, extra_metadata)
+        with atomic_write(os.path.join(result_dir, SWEEP_FILE)) as f:
+            json.dump(sweep, f, indent=2)
+        return sweep
+
+
+def sweep_detections(result_dir, thresholds, min_detections=(MIN_DETECTIONS,), logo_groups=None):
+    """
+    Sweep the stored detections of a finished job over confidence thresholds and
+    min-detection filters in one pass, writing its threshold_sweep.json. Thresholds below
+    the confidence floor the model ran at see the same detections as the floor.
+    """
+    source = read_source(result_dir)
+    sweep = ThresholdSweepAccumulator(source["width"], source["height"], source["fps"], thresholds, min_detections)
+    for weight, detections in iter_detections(result_dir, logo_groups):
+        sweep.add_frame(detections, weight)
+    extra_metadata = dict(source["video_metadata"], confidence_floor=source.get("confidence_floor"))
+    return sweep.write_outputs(result_dir, source["total_frames"], source["duration"], extra_metadata)
@@ -0,0 +1,300 @@
+import json
+import subprocess
+import time
+
+import cv2
+import numpy as np
+
+from backend.core.frame_ring import read_exact_into
+from backend.utils.metrics import SUBPROCESSES
+
+# Channels per pixel for the supported output pixel formats
+PIXEL_FORMATS = {'bgr24': 3, 'rgb24': 3, 'gray': 1}
+# Seek modes: 'accurate' decodes up to the exact frame, 'keyframe' stops at the preceding keyframe
+SEEK_MODES = ('accurate', 'keyframe')
+
+
+def probe_video(source, timeout=10):
+    """
+    Probe width, height, fps, frame count and codec of the first video stream with ffprobe.
+    Returns a dict, or None if the source could not be probed.
+    """
+    try:
+        SUBPROCESSES.inc(command='ffprobe', purpose='probe')
+        probe = subprocess.run([
+            'ffprobe', '-v', 'error', '-select_streams', 'v:0',
+            '-show_entries', 'stream=width,height,r_frame_rate,nb_frames,codec_name:format=duration',
+            '-of', 'json', source
+        ], capture_output=True, text=True, timeout=timeout)
+        info = json.loads(probe.stdout or '{}')
+        stream = (info.get('streams') or [{}])[0]
+        if not stream.get('width') or not stream.get('height'):
+            return None
+        r_frame_rate = stream.get('r_frame_rate', '25/1')
+        num, den = (r_frame_rate.split('/') + ['1'])[:2]
+        fps = float(num) / float(den) if float(den) != 0 else 25.0
+        duration = float((info.get('format') or {}).get('duration') or 0.0)
+        try:
+            frame_count = int(stream.get('nb_frames') or 0)
+        except ValueError:
+            frame_count = 0
+        if frame_count <= 0 and duration > 0:
+            frame_count = int(round(duration * fps))
+        return {
+            "width": int(stream['width']),
+            "height": int(stream['height']),
+            "fps": fps,
+            "frame_count": frame_count,
+            "duration": duration,
+            "codec": stream.get('codec_name')
+        }
+    except Exception:
+        return None
+
+
+# FourCC codes reported by OpenCV -> codec names as ffprobe reports them
+FOURCC_CODECS = {
+    'avc1': 'h264', 'h264': 'h264', 'x264': 'h264', 'hev1': 'hevc', 'hvc1': 'hevc', 'hevc': 'hevc',
+    'mjpg': 'mjpeg', 'mp4v': 'mpeg4', 'xvid': 'mpeg4', 'divx': 'mpeg4', 'vp80': 'vp8', 'vp09': 'vp9',
+    'av01': 'av1'
+}
+
+
+def probe_video_opencv(source):
+    """probe_video through OpenCV, for when ffprobe is unavailable; None if the source cannot be opened"""
+    cap = cv2.VideoCapture(source)
+    try:
+        if not cap.isOpened():
+            return None
+        fps = float(cap.get(cv2.CAP_PROP_FPS) or 0.0)
+        frame_count = int(cap.get(cv2.CAP_PROP_FRAME_COUNT) or 0)
+        fourcc = int(cap.get(cv2.CAP_PROP_FOURCC) or 0)
+        tag = ''.join(chr((fourcc >> (8 * i)) & 0xFF) for i in range(4)).strip('\x00 ').lower()
+        return {
+            "width": int(cap.get(cv2.CAP_PROP_FRAME_WIDTH)),
+            "height": int(cap.get(cv2.CAP_PROP_FRAME_HEIGHT)),
+            "fps": fps,
+            "frame_count": frame_count,
+            "duration": frame_count / fps if fps > 0 else 0.0,
+            "codec": FOURCC_CODECS.get(tag, tag or None)
+        }
+    finally:
+        cap.release()
+
+
+class VideoDecoder:
+    """
+    Common interface of the video decoder backends.
+
+    Options:
+    - threads: decoder threads (0 lets the backend decide)
+    - pixel_format: output pixel format, one of bgr24, rgb24, gray
+    - output_size: optional (width, height) to scale frames to while decoding
+    - seek_mode: one of SEEK_MODES supported by the backend ('keyframe' is ffmpeg-only)
+    """
+
+    name = None
+    # Seek modes the backend implements
+    seek_modes = SEEK_MODES
+
+    def __init__(self, source, threads=0, pixel_format='bgr24', output_size=None, seek_mode='accurate'):
+        if pixel_format not in PIXEL_FORMATS:
+            raise ValueError(f"Unsupported pixel format: {pixel_format}")
+        if seek_mode not in self.seek_modes:
+            raise ValueError(f"Unsupported seek mode for the {self.name} decoder: {seek_mode}")
+        self.source = source
+        self.threads = int(threads or 0)
+        self.pixel_format = pixel_format
+        self.seek_mode = seek_mode
+        self.output_size = tuple(output_size) if output_size else None
+        # Source properties, filled in by the backends
+        self.source_width = 0
+        self.source_height = 0
+        self.fps = 0.0
+        self.frame_count = 0
+        # Index of the next frame to be returned
+        self.position = 0
+
+    @property
+    def width(self):
+        """Width of the decoded frames"""
+        return self.output_size[0] if self.output_size else self.source_width
+
+    @property
+    def height(self):
+        """Height of the decoded frames"""
+        return self.output_size[1] if self.output_size else self.source_height
+
+    @property
+    def frame_shape(self):
+        """Shape of the decoded frame arrays"""
+        channels = PIXEL_FORMATS[self.pixel_format]
+        return (self.height, self.width, channels) if channels > 1 else (self.height, self.width)
+
+    def read_into(self, buffer):
+        """Decode the next frame into a preallocated buffer of frame_shape. Returns False at the end."""
+        raise NotImplementedError
+
+    def read(self):
+        """Decode the next frame into a new array, or return None at the end"""
+        buffer = np.empty(self.frame_shape, dtype=np.uint8)
+        return buffer if self.read_into(buffer) else None
+
+    def seek(self, frame_index):
+        """Position the decoder so that the next read returns frame `frame_index` (0-based)"""
+        raise NotImplementedError
+
+    def close(self):
+        """Release decoder resources"""
+        pass
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc, tb):
+        self.close()
+
+
+class OpenCVDecoder(VideoDecoder):
+    """Decoder backed by cv2.VideoCapture (FFmpeg backend of OpenCV when available)"""
+
+    name = 'opencv'
+    # CAP_PROP_POS_FRAMES always lands on the exact frame
+    seek_modes = ('accurate',)
+
+    def __init__(self, source, probe=None, **options):
+        # probe is accepted for interface parity; OpenCV reads the stream properties itself
+        super().__init__(source, **options)
+        params = []
+        if self.threads > 0 and hasattr(cv2, 'CAP_PROP_N_THREADS'):
+            params = [cv2.CAP_PROP_N_THREADS, self.threads]
+        try:
+            self.cap = cv2.VideoCapture(source, cv2.CAP_ANY, params) if params else cv2.VideoCapture(source)
+        except cv2.error:
+            self.cap = cv2.VideoCapture(source)
+        self.source_width = int(self.cap.get(cv2.CAP_PROP_FRAME_WIDTH))
+        self.source_height = int(self.cap.get(cv2.CAP_PROP_FRAME_HEIGHT))
+        self.fps = float(self.cap.get(cv2.CAP_PROP_FPS) or 0.0)
+        self.frame_count = int(self.cap.get(cv2.CAP_PROP_FRAME_COUNT) or 0)
+
+    def is_opened(self):
+        return self.cap.isOpened()
+
+    def read_into(self, buffer):
+        if self.pixel_format == 'bgr24' and self.output_size is None:
+            ret, frame = self.cap.read(buffer)
+        else:
+            ret, frame = self.cap.read()
+        if not ret:
+            return False
+        if frame is not buffer:
+            if self.pixel_format == 'rgb24':
+                frame = cv2.cvtColor(frame, cv2.COLOR_BGR2RGB)
+            elif self.pixel_format == 'gray':
+                frame = cv2.cvtColor(frame, cv2.COLOR_BGR2GRAY)
+            if frame.shape[:2] != buffer.shape[:2]:
+                cv2.resize(frame, (buffer.shape[1], buffer.shape[0]), dst=buffer, interpolation=cv2.INTER_AREA)
+            else:
+                np.copyto(buffer, frame)
+        self.position += 1
+        return True
+
+    def seek(self, frame_index):
+        # OpenCV seeks to the preceding keyframe and decodes forward to the exact frame
+        self.cap.set(cv2.CAP_PROP_POS_FRAMES, max(0, int(frame_index)))
+        self.position = max(0, int(frame_index))
+
+    def close(self):
+        self.cap.release()
+
+
+class FFmpegDecoder(VideoDecoder):
+    """Decoder running ffmpeg as a subprocess and reading raw frames from its stdout"""
+
+    name = 'ffmpeg'
+
+    def __init__(self, source, probe=None, **options):
+        super().__init__(source, **options)
+        info = probe or probe_video(source) or {}
+        self.source_width = int(info.get('width') or 0)
+        self.source_height = int(info.get('height') or 0)
+        self.fps = float(info.get('fps') or 0.0)
+        self.frame_count = int(info.get('frame_count') or 0)
+        self.codec = info.get('codec')
+        self.process = None
+        self._start(0)
+
+    def _command(self, start_frame):
+        cmd = ['ffmpeg', '-hide_banner', '-loglevel', 'error', '-threads', str(self.threads)]
+        if start_frame > 0 and self.fps > 0:
+            cmd += ['-ss', f'{start_frame / self.fps:.6f}']
+            if self.seek_mode == 'keyframe':
+                cmd += ['-noaccurate_seek']
+        cmd += ['-i', self.source]
+        if self.output_size:
+            cmd += ['-vf', f'scale={self.output_size[0]}:{self.output_size[1]}:flags=area']
+        cmd += ['-f', 'rawvideo', '-pix_fmt', self.pixel_format, '-']
+        return cmd
+
+    def _start(self, start_frame):
+        self.close()
+        SUBPROCESSES.inc(command='ffmpeg', purpose='decode')
+        self.process = subprocess.Popen(self._command(start_frame), stdout=subprocess.PIPE,
+                                        stderr=subprocess.DEVNULL, bufsize=10**8)
+        self.position = start_frame
+
+    def read_into(self, buffer):
+        if self.process is None or not read_exact_into(self.process.stdout, buffer):
+            return False
+        self.position += 1
+        return True
+
+    def seek(self, frame_index):
+        # Restart ffmpeg at the target timestamp (input seeking)
+        self._start(max(0, int(frame_index)))
+
+    def close(self):
+        if self.process is not None:
+            self.process.kill()
+            self.process.wait()
+            self.process.stdout.close()
+            self.process = None
+
+
+DECODER_BACKENDS = {
+    'opencv': OpenCVDecoder,
+    'cv2': OpenCVDecoder,
+    'ffmpeg': FFmpegDecoder,
+}
+
+
+def open_decoder(source, backend='opencv', **options):
+    """Create a decoder for `source` with the named backend (opencv/cv2 or ffmpeg)"""
+    try:
+        decoder_cls = DECODER_BACKENDS[(backend or 'opencv').lower()]
+    except KeyError:
+        raise ValueError(f"Unknown decoder backend: {backend}")
+    return decoder_cls(source, **options)
+
+
+def benchmark_decoder(source, backend='opencv', max_frames=None, **options):
+    """Decode up to max_frames frames into a reused buffer and report decode throughput"""
+    start = time.perf_counter()
+    with open_decoder(source, backend, **options) as decoder:
+        opened = time.perf_counter()
+        buffer = np.empty(decoder.frame_shape, dtype=np.uint8)
+        frames = 0
+        while (max_frames is None or frames < max_frames) and decoder.read_into(buffer):
+            frames += 1
+        elapsed = time.perf_counter() - opened
+        return {
+            "backend": decoder.name,
+            "threads": decoder.threads,
+            "pixel_format": decoder.pixel_format,
+            "width": decoder.width,
+            "height": decoder.height,
+            "frames": frames,
+            "open_seconds": round(opened - start, 4),
+            "decode_seconds": round(elapsed, 4),
+            "fps": round(frames / elapsed, 2) if elapsed > 0 else 0.0
+        }
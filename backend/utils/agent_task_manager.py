@@ -1,10 +1,14 @@
 import uuid
 from threading import Lock
 
+from backend.utils.change_stream import ChangeNotifier
+
 class AgentTaskManager:
     """Manages the state and progress of asynchronous agent tasks."""
     def __init__(self):
         self.tasks = {}
+        # Per-task change notifiers for status streams
+        self.notifiers = {}
         self.lock = Lock()
 
     def create_task(self):
@@ -18,6 +22,7 @@ class AgentTaskManager:
                 'result': None,
                 'success': None
             }
+            self.notifiers[task_id] = ChangeNotifier()
         return task_id
 
     def update_progress(self, task_id, message, status='in_progress'):
@@ -27,6 +32,7 @@ class AgentTaskManager:
                 self.tasks[task_id]['status'] = status
                 self.tasks[task_id]['message'] = message
                 print(f"TASK [{task_id}]: {message}") # Also log to console
+        self._notify(task_id)
 
     def complete_task(self, task_id, result, success=True):
         """Marks a task as complete and stores the final result."""
@@ -37,6 +43,18 @@ class AgentTaskManager:
                 self.tasks[task_id]['is_complete'] = True
                 self.tasks[task_id]['result'] = result
                 self.tasks[task_id]['success'] = success
+        self._notify(task_id)
+
+    def _notify(self, task_id):
+        with self.lock:
+            notifier = self.notifiers.get(task_id)
+        if notifier is not None:
+            notifier.notify()
+
+    def get_notifier(self, task_id):
+        """Change notifier of a task, or None if the task is unknown"""
+        with self.lock:
+            return self.notifiers.get(task_id)
 
     def get_task_status(self, task_id):
         """Retrieves the current status of a task."""
@@ -48,3 +66,6 @@ class AgentTaskManager:
         with self.lock:
             if task_id in self.tasks:
                 del self.tasks[task_id]
+            notifier = self.notifiers.pop(task_id, None)
+        if notifier is not None:
+            notifier.notify()
@@ -0,0 +1,69 @@
+import json
+import threading
+import time
+
+
+class ChangeNotifier:
+    """
+    Versioned change signal between one publisher and many Server-Sent Events subscribers.
+
+    The publisher calls notify() after changing its state; subscribers block in wait()
+    until the version moves on. The serialized state of each version is cached, so it
+    is built once no matter how many clients are watching.
+    """
+
+    def __init__(self):
+        self._cond = threading.Condition()
+        self.version = 0
+        self._cached_version = -1
+        self._cached = None
+
+    def notify(self):
+        """Signal a state change"""
+        with self._cond:
+            self.version += 1
+            self._cond.notify_all()
+
+    def wait(self, seen_version, timeout=None):
+        """Block until the version differs from seen_version (or timeout); return the current version"""
+        with self._cond:
+            self._cond.wait_for(lambda: self.version != seen_version, timeout)
+            return self.version
+
+    def serialized(self, version, build):
+        """Return (state, json text) for a version, building it with build() only once"""
+        with self._cond:
+            if self._cached_version != version:
+                state = build()
+                self._cached = (state, json.dumps(state))
+                self._cached_version = version
+            return self._cached
+
+
+def sse_events(notifier, build, event='progress', is_final=None, min_interval=0.25, keepalive=15.0):
+    """
+    Generate Server-Sent Events for a ChangeNotifier: the current state first, then the
+    latest state after each change, at most once per min_interval (intermediate versions
+    are coalesced), with keep-alive comments while idle. Stops after sending a state
+    for which is_final(state) is true.
+    """
+    seen = None
+    last_sent = 0.0
+    while True:
+        if seen is None:
+            version = notifier.version
+        else:
+            version = notifier.wait(seen, keepalive)
+            if version == seen:
+                yield ": keep-alive\n\n"
+                continue
+            wait_left = min_interval - (time.monotonic() - last_sent)
+            if wait_left > 0:
+                time.sleep(wait_left)
+                version = notifier.version
+        state, text = notifier.serialized(version, build)
+        yield f"id: {version}\nevent: {event}\ndata: {text}\n\n"
+        seen = version
+        last_sent = time.monotonic()
+        if is_final is not None and is_final(state):
+            break
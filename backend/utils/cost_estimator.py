@@ -0,0 +1,213 @@
+import json
+import os
+import threading
+import time
+
+from backend.utils.atomic_file import atomic_write
+
+# Processing seconds per frame assumed when the profile has nothing for an engine
+DEFAULT_SECONDS_PER_FRAME = 0.125
+# Finished jobs kept per engine configuration
+MAX_OBSERVED_JOBS = 20
+# Jobs shorter than this are too dominated by startup to be recorded
+MIN_OBSERVED_FRAMES = 100
+# Observed jobs within this pixel-count ratio of a video are preferred over the benchmark fit
+NEAR_PIXEL_RATIO = 1.25
+# Frames of a job's own throughput that weigh as much as the prior estimate in its ETA
+PRIOR_FRAMES = 250
+
+# Profiles are shared by the managers of concurrent jobs
+_profile_lock = threading.Lock()
+
+
+def engine_key(mode, decoder, model='yolo', decoder_process='', batched=False):
+    """Name of an engine configuration in the throughput profile, e.g. 'file/opencv/yolo'"""
+    key = f"{mode}/{decoder}"
+    if decoder_process:
+        key += "+process"
+    if batched:
+        key += "+batch"
+    return f"{key}/{model}"
+
+
+def _fit(points, pixels, field):
+    """
+    Per-frame `field` of the measurements at `pixels`: a least-squares line over the
+    resolutions measured, or their mean when only one resolution was measured
+    """
+    xs = [p["width"] * p["height"] / 1e6 for p in points]
+    ys = [p[field] for p in points]
+    x = pixels / 1e6
+    mean_x = sum(xs) / len(xs)
+    mean_y = sum(ys) / len(ys)
+    var_x = sum((xi - mean_x) ** 2 for xi in xs)
+    if var_x <= 0:
+        return mean_y
+    slope = sum((xi - mean_x) * (yi - mean_y) for xi, yi in zip(xs, ys)) / var_x
+    value = mean_y + slope * (x - mean_x)
+    if value <= 0:
+        # Extrapolated below zero: use the closest measurement
+        return min(zip(xs, ys), key=lambda p: abs(p[0] - x))[1]
+    return value
+
+
+class CostEstimator:
+    """
+    Predicts processing time and CPU-seconds of a job from its video metadata.
+
+    The throughput profile (a JSON file) holds, per engine configuration, the seconds
+    and CPU-seconds per frame measured by benchmarks/e2e.py at several resolutions and
+    codecs, plus those of recently finished jobs on this host.
+    """
+
+    def __init__(self, profile_path):
+        self.profile_path = profile_path
+        self.profile = {"engines": {}}
+        self._loaded_mtime = None
+        self._load()
+
+    def _load(self):
+        try:
+            mtime = os.path.getmtime(self.profile_path)
+        except OSError:
+            return
+        if mtime == self._loaded_mtime:
+            return
+        try:
+            with open(self.profile_path) as f:
+                profile = json.load(f)
+            profile.setdefault("engines", {})
+            self.profile = profile
+            self._loaded_mtime = mtime
+        except (OSError, ValueError) as e:
+            print(f"Failed to load throughput profile {self.profile_path}: {e}")
+
+    def _save(self):
+        try:
+            os.makedirs(os.path.dirname(os.path.abspath(self.profile_path)), exist_ok=True)
+            with atomic_write(self.profile_path) as f:
+                json.dump(self.profile, f, indent=2)
+            self._loaded_mtime = os.path.getmtime(self.profile_path)
+        except OSError as e:
+            print(f"Failed to save throughput profile {self.profile_path}: {e}")
+
+    def _engine(self, key):
+        return self.profile["engines"].setdefault(key, {"benchmarks": [], "jobs": []})
+
+    def add_benchmark(self, key, width, height, codec, seconds_per_frame, cpu_seconds_per_frame, frames):
+        """Store a benchmark measurement, replacing an earlier one of the same resolution and codec"""
+        with _profile_lock:
+            self._load()
+            engine = self._engine(key)
+            engine["benchmarks"] = [p for p in engine["benchmarks"]
+                                    if (p["width"], p["height"], p.get("codec")) != (width, height, codec)]
+            engine["benchmarks"].append({
+                "width": width, "height": height, "codec": codec, "frames": frames,
+                "seconds_per_frame": seconds_per_frame, "cpu_seconds_per_frame": cpu_seconds_per_frame,
+                "recorded_at": time.time()
+            })
+            self._save()
+
+    def record_job(self, key, width, height, codec, frames, seconds, cpu_seconds):
+        """Add the throughput of a finished job, refining later estimates for this engine"""
+        if frames < MIN_OBSERVED_FRAMES or seconds <= 0:
+            return
+        with _profile_lock:
+            self._load()
+            engine = self._engine(key)
+            engine["jobs"].append({
+                "width": width, "height": height, "codec": codec, "frames": frames,
+                "seconds_per_frame": seconds / frames, "cpu_seconds_per_frame": cpu_seconds / frames,
+                "recorded_at": time.time()
+            })
+            engine["jobs"] = engine["jobs"][-MAX_OBSERVED_JOBS:]
+            self._save()
+
+    def estimate(self, metadata, key):
+        """
+        Expected processing of a video for an engine configuration. metadata has width,
+        height, fps and frame_count or duration (as from probe_video), and optionally codec.
+        Live streams (no length) get per-video-second figures only.
+        """
+        with _profile_lock:
+            self._load()
+            engine = self.profile["engines"].get(key) or {"benchmarks": [], "jobs": []}
+            benchmarks, jobs = list(engine["benchmarks"]), list(engine["jobs"])
+        width, height = int(metadata.get("width") or 0), int(metadata.get("height") or 0)
+        fps = float(metadata.get("fps") or 0.0)
+        codec = metadata.get("codec")
+        frames = int(metadata.get("frame_count") or 0)
+        duration = float(metadata.get("duration") or 0.0)
+        if frames <= 0 and duration > 0 and fps > 0:
+            frames = int(round(duration * fps))
+        if duration <= 0 and frames > 0 and fps > 0:
+            duration = frames / fps
+        pixels = width * height
+
+        def matching(points):
+            # Prefer measurements of the same codec, since decode cost depends on it
+            same_codec = [p for p in points if codec and p.get("codec") == codec]
+            return same_codec or points
+
+        near_jobs = [p for p in matching(jobs)
+                     if pixels and max(pixels, p["width"] * p["height"]) <=
+                     NEAR_PIXEL_RATIO * min(pixels, p["width"] * p["height"])]
+        if near_jobs:
+            basis, points = 'observed', near_jobs
+        elif benchmarks or jobs:
+            basis, points = 'benchmark' if benchmarks else 'observed', matching(benchmarks + jobs)
+        else:
+            basis, points = 'default', []
+        if points and pixels:
+            seconds_per_frame = _fit(points, pixels, "seconds_per_frame")
+            cpu_per_frame = _fit(points, pixels, "cpu_seconds_per_frame")
+        else:
+            seconds_per_frame = cpu_per_frame = DEFAULT_SECONDS_PER_FRAME
+        return {
+            "engine": key,
+            "basis": basis,
+            "samples": len(points),
+            "width": width,
+            "height": height,
+            "fps": round(fps, 3),
+            "codec": codec,
+            "frames": frames or None,
+            "duration": round(duration, 2) if duration else None,
+            "processing_fps": round(1.0 / seconds_per_frame, 2),
+            # Processing seconds per second of video (below 1 keeps up with real time)
+            "realtime_factor": round(seconds_per_frame * fps, 3) if fps else None,
+            "seconds": round(frames * seconds_per_frame, 1) if frames else None,
+            "cpu_seconds": round(frames * cpu_per_frame, 1) if frames else None
+        }
+
+
+class JobEta:
+    """
+    Remaining time of a running job: starts from the estimate and shifts to the job's
+    own measured frames/sec as more frames are processed.
+    """
+
+    def __init__(self, total_frames, expected_fps=None):
+        self.total_frames = total_frames
+        self.expected_fps = expected_fps
+
+    def update(self, frames_done, observed_fps):
+        """ETA figures after frames_done frames at observed_fps"""
+        if not self.total_frames:
+            return None
+        weight = frames_done / float(frames_done + PRIOR_FRAMES) if self.expected_fps else 1.0
+        seconds_per_frame = 0.0
+        if observed_fps and observed_fps > 0:
+            seconds_per_frame += weight / observed_fps
+        else:
+            weight = 0.0
+        if self.expected_fps:
+            seconds_per_frame += (1.0 - weight) / self.expected_fps
+        if seconds_per_frame <= 0:
+            return None
+        remaining = max(0, self.total_frames - frames_done)
+        return {
+            "seconds": round(remaining * seconds_per_frame, 1),
+            "fps": round(1.0 / seconds_per_frame, 2),
+            "observed_weight": round(weight, 3)
+        }
@@ -0,0 +1,215 @@
+import os
+import io
+import sys
+import json
+import time
+import cProfile
+import pstats
+import threading
+import tracemalloc
+
+PROFILE_MODES = ('sample', 'cprofile', 'tracemalloc')
+# Profiles go into this subdirectory of the job's result directory
+PROFILES_DIR = 'profiles'
+
+
+def _frame_label(code):
+    return f"{code.co_name} ({os.path.basename(code.co_filename)}:{code.co_firstlineno})"
+
+
+class JobProfiler:
+    """
+    Profiles one running job for a number of seconds and/or frames, then switches
+    itself off and writes its dumps into <result_dir>/profiles/.
+
+    Modes:
+    - sample: a background thread samples the job thread's stack every `interval`
+      seconds; written as collapsed stacks (one "root;...;leaf count" line per stack)
+      for flamegraph tools
+    - cprofile: deterministic profile of the job thread; written as a .prof file and
+      the top functions by cumulative time
+    - tracemalloc: top allocation sites (process-wide) at the end of the window
+
+    The job thread must call on_frame() once per frame: cProfile can only be switched
+    on and off from the thread it profiles, and frame limits are counted there.
+    """
+
+    def __init__(self, result_dir, thread_id, modes=('sample',), seconds=None, frames=None, interval=0.005,
+                 top=50):
+        unknown = [m for m in modes if m not in PROFILE_MODES]
+        if unknown:
+            raise ValueError(f"Unknown profile mode(s): {', '.join(unknown)}")
+        if not seconds and not frames:
+            raise ValueError("A profile needs a number of seconds or frames")
+        self.result_dir = result_dir
+        self.thread_id = thread_id
+        self.modes = tuple(modes)
+        self.seconds = seconds
+        self.frames = frames
+        self.interval = interval
+        self.top = top
+        self.active = False
+        self.frames_seen = 0
+        self.samples = 0
+        self.files = []
+        self.started_at = None
+        self.stopped_at = None
+        self._stacks = {}
+        self._profile = None
+        self._cprofile_running = False
+        self._stop = threading.Event()
+        self._lock = threading.Lock()
+        self._thread = None
+        self._stamp = None
+        self._started_tracemalloc = False
+
+    def start(self):
+        """Start profiling; cProfile starts at the job's next frame"""
+        self.started_at = time.time()
+        self._stamp = time.strftime('%Y%m%d-%H%M%S', time.localtime(self.started_at))
+        os.makedirs(os.path.join(self.result_dir, PROFILES_DIR), exist_ok=True)
+        if 'tracemalloc' in self.modes and not tracemalloc.is_tracing():
+            tracemalloc.start(25)
+            self._started_tracemalloc = True
+        self.active = True
+        # Samples the stack (sample mode) and enforces the time limit
+        self._thread = threading.Thread(target=self._run)
+        self._thread.daemon = True
+        self._thread.start()
+        return self
+
+    def _run(self):
+        deadline = time.monotonic() + self.seconds if self.seconds else None
+        sampling = 'sample' in self.modes
+        wait = self.interval if sampling else 0.25
+        while not self._stop.wait(wait):
+            if deadline is not None and time.monotonic() >= deadline:
+                break
+            if sampling:
+                frame = sys._current_frames().get(self.thread_id)
+                if frame is None:
+                    # The job thread has exited
+                    break
+                stack = []
+                while frame is not None:
+                    stack.append(_frame_label(frame.f_code))
+                    frame = frame.f_back
+                key = ';'.join(reversed(stack))
+                self._stacks[key] = self._stacks.get(key, 0) + 1
+                self.samples += 1
+        self.stop()
+
+    @property
+    def running(self):
+        """Whether on_frame() still has work to do (profiling, or cProfile output pending)"""
+        return self.active or self._cprofile_running
+
+    def on_frame(self):
+        """Called by the job thread after each frame; returns whether profiling is still active"""
+        if 'cprofile' in self.modes:
+            if self.active and self._profile is None:
+                self._profile = cProfile.Profile()
+                self._profile.enable()
+                self._cprofile_running = True
+            elif not self.active and self._cprofile_running:
+                self._finish_cprofile()
+                return False
+        self.frames_seen += 1
+        if self.frames and self.frames_seen >= self.frames:
+            self.stop()
+            if self._cprofile_running:
+                self._finish_cprofile()
+        return self.active
+
+    def stop(self):
+        """Switch profiling off and write the dumps (cProfile's once back in the job thread)"""
+        with self._lock:
+            if not self.active:
+                return
+            self.active = False
+            self.stopped_at = time.time()
+        self._stop.set()
+        if self._thread is not None and self._thread is not threading.current_thread():
+            self._thread.join(timeout=5)
+        if 'sample' in self.modes:
+            self._write_stacks()
+        if 'tracemalloc' in self.modes:
+            self._write_allocations()
+        if self._cprofile_running and threading.get_ident() == self.thread_id:
+            self._finish_cprofile()
+        self._write_summary()
+
+    def close(self):
+        """Stop at the end of the job (from the job thread)"""
+        self.stop()
+        if self._cprofile_running:
+            self._finish_cprofile()
+
+    def _path(self, suffix):
+        return os.path.join(self.result_dir, PROFILES_DIR, f"{self._stamp}_{suffix}")
+
+    def _write_stacks(self):
+        path = self._path('stacks.collapsed')
+        try:
+            with open(path, 'w') as f:
+                for stack, count in sorted(self._stacks.items(), key=lambda item: -item[1]):
+                    f.write(f"{stack} {count}\n")
+            self.files.append(path)
+        except Exception as e:
+            print(f"Failed to write sampled stacks: {e}")
+
+    def _write_allocations(self):
+        path = self._path('allocations.txt')
+        try:
+            snapshot = tracemalloc.take_snapshot()
+            stats = snapshot.statistics('lineno')
+            current, peak = tracemalloc.get_traced_memory()
+            with open(path, 'w') as f:
+                f.write(f"Traced memory: current {current / 1e6:.1f} MB, peak {peak / 1e6:.1f} MB\n")
+                f.write(f"Top {self.top} allocation sites by size:\n")
+                for stat in stats[:self.top]:
+                    f.write(f"{stat}\n")
+            self.files.append(path)
+        except Exception as e:
+            print(f"Failed to write allocation profile: {e}")
+        finally:
+            if self._started_tracemalloc:
+                tracemalloc.stop()
+                self._started_tracemalloc = False
+
+    def _finish_cprofile(self):
+        self._profile.disable()
+        self._cprofile_running = False
+        try:
+            prof_path = self._path('cprofile.prof')
+            self._profile.dump_stats(prof_path)
+            text = io.StringIO()
+            pstats.Stats(self._profile, stream=text).sort_stats('cumulative').print_stats(self.top)
+            txt_path = self._path('cprofile.txt')
+            with open(txt_path, 'w') as f:
+                f.write(text.getvalue())
+            self.files.extend([prof_path, txt_path])
+        except Exception as e:
+            print(f"Failed to write cProfile output: {e}")
+        self._write_summary()
+
+    def _write_summary(self):
+        try:
+            with open(self._path('summary.json'), 'w') as f:
+                json.dump(self.status(), f, indent=2)
+        except Exception as e:
+            print(f"Failed to write profile summary: {e}")
+
+    def status(self):
+        """Settings, progress and written files of this profile"""
+        return {
+            "active": self.active,
+            "modes": list(self.modes),
+            "seconds": self.seconds,
+            "frames": self.frames,
+            "started_at": self.started_at,
+            "stopped_at": self.stopped_at,
+            "frames_profiled": self.frames_seen,
+            "samples": self.samples,
+            "files": [os.path.relpath(p, self.result_dir) for p in self.files]
+        }
@@ -0,0 +1,109 @@
+import os
+import sys
+import time
+
+try:
+    import resource
+except ImportError:  # Windows
+    resource = None
+
+
+def current_rss():
+    """Resident set size of this process in bytes, or None where it cannot be read"""
+    try:
+        with open('/proc/self/statm') as f:
+            return int(f.read().split()[1]) * os.sysconf('SC_PAGE_SIZE')
+    except (OSError, ValueError, IndexError, AttributeError):
+        return None
+
+
+def process_peak_rss():
+    """Peak resident set size of this process since it started, in bytes"""
+    if resource is None:
+        return None
+    peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    # Reported in bytes on macOS, kilobytes elsewhere
+    return peak if sys.platform == 'darwin' else peak * 1024
+
+
+def torch_allocated():
+    """Bytes currently allocated by torch on the GPU (None without CUDA)"""
+    try:
+        import torch
+        if torch.cuda.is_available():
+            return int(torch.cuda.memory_allocated())
+    except Exception:
+        pass
+    return None
+
+
+class JobMemoryMonitor:
+    """
+    Periodic memory accounting for one job.
+
+    Every `interval` seconds (checked with due()), sample() records the process RSS,
+    the job's peak RSS, torch GPU allocations and the sizes reported by the job's
+    registered sources: buffer sources return bytes held by the job's NumPy buffers,
+    count sources return item counts (queued frames, series entries, ...).
+    With a soft limit, the returned report flags when RSS went over it.
+    """
+
+    def __init__(self, soft_limit_bytes=0, interval=2.0):
+        self.soft_limit_bytes = int(soft_limit_bytes or 0)
+        self.interval = float(interval)
+        self.buffers = {}
+        self.counts = {}
+        self.peak_rss = 0
+        self.samples = 0
+        self.report = None
+        # Degradation applied by the job under memory pressure
+        self.spilled = False
+        self.stride = 1
+        self._last = time.monotonic()
+
+    def add_buffer(self, name, nbytes):
+        """Register a callable returning bytes held by a buffer of the job"""
+        self.buffers[name] = nbytes
+        return self
+
+    def add_count(self, name, count):
+        """Register a callable returning a number of items held by the job"""
+        self.counts[name] = count
+        return self
+
+    def due(self):
+        """Whether the next sample is due"""
+        return time.monotonic() - self._last >= self.interval
+
+    @staticmethod
+    def _read(sources):
+        values = {}
+        for name, read in list(sources.items()):
+            try:
+                value = read()
+            except Exception:
+                value = None
+            if value is not None:
+                values[name] = int(value)
+        return values
+
+    def sample(self):
+        """Take a sample and return the report"""
+        self._last = time.monotonic()
+        self.samples += 1
+        rss = current_rss()
+        if rss is not None and rss > self.peak_rss:
+            self.peak_rss = rss
+        buffers = self._read(self.buffers)
+        self.report = {
+            "rss_bytes": rss,
+            "peak_rss_bytes": self.peak_rss or None,
+            "process_peak_rss_bytes": process_peak_rss(),
+            "torch_cuda_bytes": torch_allocated(),
+            "buffer_bytes": buffers,
+            "buffer_bytes_total": sum(buffers.values()),
+            "counts": self._read(self.counts),
+            "soft_limit_bytes": self.soft_limit_bytes or None,
+            "over_soft_limit": bool(self.soft_limit_bytes and rss is not None and rss > self.soft_limit_bytes)
+        }
+        return self.report
@@ -0,0 +1,304 @@
+import threading
+import time
+
+from backend.utils.memory_monitor import current_rss
+
+# Default latency buckets in seconds
+LATENCY_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0)
+# Job durations in seconds, from short clips to multi-hour streams
+DURATION_BUCKETS = (1, 5, 15, 30, 60, 120, 300, 600, 1800, 3600, 7200, 14400)
+# Frames/sec of a running job are measured over windows of this many seconds
+RATE_WINDOW = 5.0
+
+
+def _escape(value):
+    return str(value).replace('\\', '\\\\').replace('\n', '\\n').replace('"', '\\"')
+
+
+def _format_labels(labels):
+    if not labels:
+        return ''
+    return '{' + ','.join(f'{name}="{_escape(value)}"' for name, value in labels) + '}'
+
+
+def _format_value(value):
+    if value == float('inf'):
+        return '+Inf'
+    if isinstance(value, float) and value.is_integer():
+        return str(int(value))
+    return repr(value) if isinstance(value, float) else str(value)
+
+
+class _Metric:
+    """Base of the metric types: one value per label combination"""
+
+    kind = 'untyped'
+
+    def __init__(self, name, help_text, labelnames=()):
+        self.name = name
+        self.help = help_text
+        self.labelnames = tuple(labelnames)
+        self._values = {}
+        # Held only for the dict update; metrics never share a lock
+        self._lock = threading.Lock()
+
+    def _key(self, labels):
+        return tuple((name, labels.get(name, '')) for name in self.labelnames)
+
+    def samples(self):
+        """Yield (suffix, labels, value) samples"""
+        with self._lock:
+            items = list(self._values.items())
+        for key, value in items:
+            yield '', key, value
+
+
+class Counter(_Metric):
+    kind = 'counter'
+
+    def inc(self, amount=1, **labels):
+        key = self._key(labels)
+        with self._lock:
+            self._values[key] = self._values.get(key, 0) + amount
+
+
+class Gauge(_Metric):
+    kind = 'gauge'
+
+    def set(self, value, **labels):
+        key = self._key(labels)
+        with self._lock:
+            self._values[key] = value
+
+
+class Histogram(_Metric):
+    kind = 'histogram'
+
+    def __init__(self, name, help_text, labelnames=(), buckets=LATENCY_BUCKETS):
+        super().__init__(name, help_text, labelnames)
+        self.buckets = tuple(sorted(buckets))
+
+    def observe(self, value, **labels):
+        key = self._key(labels)
+        index = len(self.buckets)
+        for i, bound in enumerate(self.buckets):
+            if value <= bound:
+                index = i
+                break
+        with self._lock:
+            entry = self._values.get(key)
+            if entry is None:
+                entry = self._values[key] = [[0] * (len(self.buckets) + 1), 0.0, 0]
+            entry[0][index] += 1
+            entry[1] += value
+            entry[2] += 1
+
+    def time(self, **labels):
+        """Context manager observing the duration of a block"""
+        return _HistogramTimer(self, labels)
+
+    def samples(self):
+        with self._lock:
+            items = [(key, list(counts), total, count) for key, (counts, total, count) in self._values.items()]
+        for key, counts, total, count in items:
+            cumulative = 0
+            for bound, n in zip(self.buckets + (float('inf'),), counts):
+                cumulative += n
+                yield '_bucket', key + (('le', _format_value(float(bound))),), cumulative
+            yield '_sum', key, total
+            yield '_count', key, count
+
+
+class _HistogramTimer:
+    def __init__(self, histogram, labels):
+        self.histogram = histogram
+        self.labels = labels
+        self.start = 0.0
+
+    def __enter__(self):
+        self.start = time.perf_counter()
+        return self
+
+    def __exit__(self, exc_type, exc, tb):
+        labels = dict(self.labels)
+        if 'status' in self.histogram.labelnames and 'status' not in labels:
+            labels['status'] = 'error' if exc_type is not None else 'ok'
+        self.histogram.observe(time.perf_counter() - self.start, **labels)
+
+
+class JobMetrics:
+    """
+    Live figures of one running job. The job thread only assigns attributes
+    (no locking); the collector reads them when /metrics is scraped.
+    """
+
+    def __init__(self, job_id, kind):
+        self.job_id = job_id
+        self.kind = kind
+        self.started = time.monotonic()
+        self.frames = 0
+        self.fps = None
+        # name -> callable returning the number of items waiting in that queue
+        self.queues = {}
+        # JobMemoryMonitor of the job, if it accounts memory
+        self.memory = None
+        self._mark_time = self.started
+        self._mark_frames = 0
+
+    def advance(self, frames):
+        """Record the number of frames processed so far"""
+        self.frames = frames
+        now = time.monotonic()
+        if now - self._mark_time >= RATE_WINDOW:
+            self.fps = (frames - self._mark_frames) / (now - self._mark_time)
+            self._mark_time = now
+            self._mark_frames = frames
+
+    def frames_per_second(self):
+        if self.fps is not None:
+            return self.fps
+        elapsed = time.monotonic() - self.started
+        return self.frames / elapsed if elapsed > 0 else 0.0
+
+    def queue_depths(self):
+        depths = {}
+        for name, pending in list(self.queues.items()):
+            try:
+                depth = pending()
+            except Exception:
+                depth = None
+            if depth is not None:
+                depths[name] = depth
+        return depths
+
+
+class JobTracker:
+    """Running jobs, frames processed and job durations"""
+
+    def __init__(self, registry):
+        self._jobs = {}
+        self._lock = threading.Lock()
+        # Frames of finished jobs per kind; running jobs are added at scrape time
+        self._finished_frames = {}
+        self.durations = registry.histogram(
+            'sponsorspotlight_job_duration_seconds', 'Duration of finished jobs',
+            ('kind', 'status'), buckets=DURATION_BUCKETS
+        )
+        registry.add_collector(self.collect)
+
+    def start(self, job_id, kind):
+        """Register a running job and return its JobMetrics"""
+        job = JobMetrics(job_id, kind)
+        with self._lock:
+            self._jobs[id(job)] = job
+        return job
+
+    def finish(self, job, status):
+        """Unregister a job, recording its duration and frames"""
+        with self._lock:
+            self._jobs.pop(id(job), None)
+            self._finished_frames[job.kind] = self._finished_frames.get(job.kind, 0) + job.frames
+        self.durations.observe(time.monotonic() - job.started, kind=job.kind, status=status)
+
+    def collect(self):
+        with self._lock:
+            jobs = list(self._jobs.values())
+            frames = dict(self._finished_frames)
+        running = dict.fromkeys(frames, 0)
+        for job in jobs:
+            frames[job.kind] = frames.get(job.kind, 0) + job.frames
+            running[job.kind] = running.get(job.kind, 0) + 1
+        yield ('sponsorspotlight_frames_processed_total', 'counter', 'Video frames processed',
+               [((('kind', kind),), n) for kind, n in sorted(frames.items())])
+        yield ('sponsorspotlight_jobs_running', 'gauge', 'Jobs currently processing',
+               [((('kind', kind),), n) for kind, n in sorted(running.items())])
+        yield ('sponsorspotlight_job_frames_per_second', 'gauge', 'Processing rate of each running job',
+               [((('job', job.job_id), ('kind', job.kind)), round(job.frames_per_second(), 3)) for job in jobs])
+        yield ('sponsorspotlight_job_queue_depth', 'gauge', 'Items waiting in the queues of each running job',
+               [((('job', job.job_id), ('queue', name)), depth)
+                for job in jobs for name, depth in sorted(job.queue_depths().items())])
+        sampled = [(job, job.memory) for job in jobs if job.memory is not None and job.memory.report is not None]
+        yield ('sponsorspotlight_job_peak_rss_bytes', 'gauge', 'Peak process RSS sampled while each job runs',
+               [((('job', job.job_id),), memory.peak_rss) for job, memory in sampled])
+        yield ('sponsorspotlight_job_buffer_bytes', 'gauge', 'Bytes held by the buffers of each running job',
+               [((('job', job.job_id), ('buffer', name)), nbytes)
+                for job, memory in sampled for name, nbytes in sorted(memory.report["buffer_bytes"].items())])
+        yield ('sponsorspotlight_job_inference_stride', 'gauge', 'Frames per inferred frame after memory degradation',
+               [((('job', job.job_id),), memory.stride) for job, memory in sampled])
+        rss = current_rss()
+        if rss is not None:
+            yield ('sponsorspotlight_process_resident_memory_bytes', 'gauge', 'Resident memory of the service',
+                   [((), rss)])
+
+
+class MetricsRegistry:
+    """Metrics exported in the Prometheus text format"""
+
+    def __init__(self):
+        self._metrics = []
+        self._collectors = []
+        self._lock = threading.Lock()
+
+    def _register(self, metric):
+        with self._lock:
+            self._metrics.append(metric)
+        return metric
+
+    def counter(self, name, help_text, labelnames=()):
+        return self._register(Counter(name, help_text, labelnames))
+
+    def gauge(self, name, help_text, labelnames=()):
+        return self._register(Gauge(name, help_text, labelnames))
+
+    def histogram(self, name, help_text, labelnames=(), buckets=LATENCY_BUCKETS):
+        return self._register(Histogram(name, help_text, labelnames, buckets))
+
+    def add_collector(self, collect):
+        """
+        Register a callable computing metrics at scrape time. It yields
+        (name, type, help, [(labels, value), ...]) with labels as (name, value) pairs.
+        """
+        with self._lock:
+            self._collectors.append(collect)
+
+    def render(self):
+        """All metrics in the Prometheus text exposition format"""
+        with self._lock:
+            metrics = list(self._metrics)
+            collectors = list(self._collectors)
+        lines = []
+        for metric in metrics:
+            lines.append(f'# HELP {metric.name} {metric.help}')
+            lines.append(f'# TYPE {metric.name} {metric.kind}')
+            for suffix, labels, value in metric.samples():
+                lines.append(f'{metric.name}{suffix}{_format_labels(labels)} {_format_value(value)}')
+        for collect in collectors:
+            try:
+                families = list(collect())
+            except Exception as e:
+                print(f"Metrics collector failed: {e}")
+                continue
+            for name, kind, help_text, samples in families:
+                lines.append(f'# HELP {name} {help_text}')
+                lines.append(f'# TYPE {name} {kind}')
+                for labels, value in samples:
+                    lines.append(f'{name}{_format_labels(labels)} {_format_value(value)}')
+        return '\n'.join(lines) + '\n'
+
+
+# Process-wide registry and the service metrics
+registry = MetricsRegistry()
+jobs = JobTracker(registry)
+MODEL_LATENCY = registry.histogram(
+    'sponsorspotlight_model_latency_seconds', 'Model call latency per frame, including batching waits', ('path',)
+)
+UPLOAD_BYTES = registry.counter('sponsorspotlight_upload_bytes_total', 'Bytes of uploaded files', ('type',))
+UPLOADS = registry.counter('sponsorspotlight_uploads_total', 'Uploaded files', ('type',))
+AGENT_TOOL_LATENCY = registry.histogram(
+    'sponsorspotlight_agent_tool_latency_seconds', 'Agent tool call latency', ('tool', 'status'),
+    buckets=(0.01, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0, 30.0, 60.0, 120.0)
+)
+SUBPROCESSES = registry.counter(
+    'sponsorspotlight_subprocesses_started_total', 'ffmpeg/ffprobe subprocesses started', ('command', 'purpose')
+)
+RESULT_CACHE = registry.counter('sponsorspotlight_result_cache_total', 'Result cache lookups', ('result',))
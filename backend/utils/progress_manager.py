@@ -2,6 +2,8 @@ from enum import Enum
 import threading
 import time
 
+from backend.utils.change_stream import ChangeNotifier
+
 class ProgressStage(Enum):
     IDLE = 0
     UPLOAD_COMPLETE = 1
@@ -13,20 +15,14 @@ class ProgressStage(Enum):
     COMPLETE = 7
     ERROR = 8
 
-class ProgressManager:
+class ProgressTracker:
     """
-    Manages and tracks the progress of file processing operations.
-    Thread-safe singleton to be accessed from multiple parts of the application.
+    Tracks the progress of one processing job in a thread-safe manner.
+    Used directly for concurrent jobs (e.g. monitored streams), each with its own tracker.
     """
-    _instance = None
-    _lock = threading.Lock()
     
-    def __new__(cls):
-        with cls._lock:
-            if cls._instance is None:
-                cls._instance = super(ProgressManager, cls).__new__(cls)
-                cls._instance._initialize()
-            return cls._instance
+    def __init__(self):
+        self._initialize()
     
     def _initialize(self):
         """Initialize the progress manager with default values"""
@@ -37,13 +33,21 @@ class ProgressManager:
         self.progress_percentage = 0
         self.start_time = None
         self.update_time = None
+        # Job-specific extras (e.g. live lag, timings), merged across updates
+        self.details = {}
         self._lock = threading.Lock()
+        # Wakes progress stream subscribers; kept across resets so they stay attached
+        if not hasattr(self, 'changes'):
+            self.changes = ChangeNotifier()
     
-    def update_progress(self, stage, message=None, frame=None, total_frames=None, progress_percentage=None):
-        """Update the progress information in a thread-safe manner"""
+    def update_progress(self, stage, message=None, frame=None, total_frames=None, progress_percentage=None, details=None):
+        """Update the progress information in a thread-safe manner and notify stream subscribers"""
         with self._lock:
             self.stage = stage
             
+            if details:
+                self.details.update(details)
+            
             if message is not None:
                 self.message = message
                 
@@ -61,6 +65,7 @@ class ProgressManager:
                 self.start_time = time.time()
                 
             self.update_time = time.time()
+        self.changes.notify()
     
     def get_progress(self):
         """Get the current progress information"""
@@ -75,10 +80,32 @@ class ProgressManager:
                 'current_frame': self.current_frame,
                 'total_frames': self.total_frames,
                 'progress_percentage': self.progress_percentage,
-                'elapsed_time': elapsed_time
+                'elapsed_time': elapsed_time,
+                'details': dict(self.details)
             }
     
     def reset(self):
         """Reset the progress information"""
         with self._lock:
-            self._initialize()
\ No newline at end of file
+            self._initialize()
+        self.changes.notify()
+
+
+class ProgressManager(ProgressTracker):
+    """
+    Manages and tracks the progress of file processing operations.
+    Thread-safe singleton to be accessed from multiple parts of the application.
+    """
+    _instance = None
+    _lock = threading.Lock()
+    
+    def __new__(cls):
+        with cls._lock:
+            if cls._instance is None:
+                cls._instance = super(ProgressManager, cls).__new__(cls)
+                cls._instance._initialize()
+            return cls._instance
+    
+    def __init__(self):
+        # State is set up once in __new__; repeated ProgressManager() calls return the same instance
+        pass
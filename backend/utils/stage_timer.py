@@ -0,0 +1,129 @@
+import json
+import threading
+import time
+
+# Histogram bucket upper bounds in seconds: 50us doubling up to ~105s
+BUCKET_BOUNDS = [0.00005 * (2 ** k) for k in range(22)]
+
+
+class _StageContext:
+    """Reusable `with` block timing one stage (one thread per stage)"""
+
+    __slots__ = ('timer', 'name', 'start')
+
+    def __init__(self, timer, name):
+        self.timer = timer
+        self.name = name
+        self.start = 0.0
+
+    def __enter__(self):
+        self.start = time.perf_counter()
+        return self
+
+    def __exit__(self, exc_type, exc, tb):
+        self.timer.add(self.name, time.perf_counter() - self.start)
+
+
+class StageTimer:
+    """
+    Per-stage duration histograms for the hot path of a job.
+
+    Durations are counted into fixed log-spaced buckets, so recording is O(log buckets)
+    with no per-sample storage; percentiles are reported as bucket upper bounds.
+    Stages may be recorded from different threads (e.g. decode in the reader thread),
+    so shares of wall time can add up to more than 100%.
+    """
+
+    def __init__(self):
+        self.started = time.perf_counter()
+        self._stages = {}
+        self._contexts = {}
+        self._lock = threading.Lock()
+
+    def add(self, name, seconds):
+        """Record one duration for a stage"""
+        # Binary search for the first bucket bound >= seconds
+        lo, hi = 0, len(BUCKET_BOUNDS)
+        while lo < hi:
+            mid = (lo + hi) // 2
+            if BUCKET_BOUNDS[mid] < seconds:
+                lo = mid + 1
+            else:
+                hi = mid
+        with self._lock:
+            stage = self._stages.get(name)
+            if stage is None:
+                stage = self._stages[name] = {
+                    "count": 0, "total": 0.0, "max": 0.0, "buckets": [0] * (len(BUCKET_BOUNDS) + 1)
+                }
+            stage["count"] += 1
+            stage["total"] += seconds
+            if seconds > stage["max"]:
+                stage["max"] = seconds
+            stage["buckets"][lo] += 1
+
+    def stage(self, name):
+        """Context manager timing a block as `name`"""
+        context = self._contexts.get(name)
+        if context is None:
+            context = self._contexts[name] = _StageContext(self, name)
+        return context
+
+    def wrap(self, name, fn):
+        """Wrap fn so that every call is timed as `name`"""
+        def timed(*args, **kwargs):
+            start = time.perf_counter()
+            try:
+                return fn(*args, **kwargs)
+            finally:
+                self.add(name, time.perf_counter() - start)
+        return timed
+
+    @staticmethod
+    def _percentile(buckets, count, q):
+        target = q * count
+        seen = 0
+        for index, n in enumerate(buckets):
+            seen += n
+            if seen >= target and n:
+                return BUCKET_BOUNDS[index] if index < len(BUCKET_BOUNDS) else float('inf')
+        return 0.0
+
+    def summary(self):
+        """Per-stage count, total, mean, max, p50/p95/p99 and share of wall time, plus the slowest stage"""
+        wall = time.perf_counter() - self.started
+        with self._lock:
+            stages = {name: dict(s, buckets=list(s["buckets"])) for name, s in self._stages.items()}
+        result = {}
+        for name, s in stages.items():
+            count = s["count"]
+            result[name] = {
+                "count": count,
+                "total_seconds": round(s["total"], 4),
+                "mean_ms": round(s["total"] / count * 1000.0, 3) if count else 0.0,
+                "max_ms": round(s["max"] * 1000.0, 3),
+                "p50_ms": round(self._percentile(s["buckets"], count, 0.50) * 1000.0, 3),
+                "p95_ms": round(self._percentile(s["buckets"], count, 0.95) * 1000.0, 3),
+                "p99_ms": round(self._percentile(s["buckets"], count, 0.99) * 1000.0, 3),
+                "share_of_wall_pct": round(s["total"] / wall * 100.0, 2) if wall > 0 else 0.0
+            }
+        bottleneck = max(result, key=lambda n: result[n]["total_seconds"]) if result else None
+        return {
+            "wall_seconds": round(wall, 3),
+            "bottleneck": bottleneck,
+            "stages": result
+        }
+
+    def histograms(self):
+        """Raw bucket counts per stage (last bucket counts durations above the largest bound)"""
+        with self._lock:
+            return {name: list(s["buckets"]) for name, s in self._stages.items()}
+
+    def write_summary(self, path):
+        """Write the summary with the raw histograms as JSON"""
+        summary = self.summary()
+        summary["bucket_bounds_ms"] = [round(b * 1000.0, 3) for b in BUCKET_BOUNDS]
+        summary["histograms"] = self.histograms()
+        with open(path, 'w') as f:
+            json.dump(summary, f, indent=2)
+        return summary
@@ -0,0 +1,253 @@
+#!/usr/bin/env python3
+"""
+End-to-end throughput benchmark of the video pipeline on synthetic videos.
+
+Each case renders a synthetic match-like video (see benchmarks/synthetic.py) and runs
+it through InferenceManager as a file job (_process_video) and, when ffmpeg is
+installed, as an HLS stream job (_process_video_stream), with the deterministic CPU
+stub detector or the real model. Reports frames/sec, per-stage time and peak RSS,
+and compares them with a stored baseline. --save-profile stores the throughput per
+engine configuration for the service's job cost estimates.
+
+Examples:
+    python benchmarks/e2e.py                                  # stub detector, default cases
+    python benchmarks/e2e.py --save-baseline                  # record the baseline
+    python benchmarks/e2e.py --cases hd fullhd --modes file --tolerance 0.1
+    python benchmarks/e2e.py --model real --json
+    python benchmarks/e2e.py --model real --save-profile           # profile for cost estimates
+"""
+import argparse
+import functools
+import json
+import os
+import platform
+import shutil
+import subprocess
+import sys
+import tempfile
+import threading
+import time
+from http.server import ThreadingHTTPServer, SimpleHTTPRequestHandler
+
+# Add the project root to the path so we can import the backend package
+ROOT_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, ROOT_DIR)
+
+from benchmarks.synthetic import CLASS_NAMES, StubDetector, make_synthetic_video
+from backend.core.inference_manager import InferenceManager
+from backend.utils.cost_estimator import CostEstimator
+from backend.utils.progress_manager import ProgressTracker
+
+BENCH_DIR = os.path.dirname(os.path.abspath(__file__))
+CACHE_DIR = os.path.join(BENCH_DIR, '.cache')
+DEFAULT_BASELINE = os.path.join(BENCH_DIR, 'baseline_e2e.json')
+# Throughput profile read by the service's cost estimator
+DEFAULT_PROFILE = os.environ.get('SPONSORSPOTLIGHT_THROUGHPUT_PROFILE', os.path.join(ROOT_DIR, 'throughput_profile.json'))
+
+# name -> (width, height, seconds)
+CASES = {
+    'sd': (640, 360, 20),
+    'hd': (1280, 720, 10),
+    'fullhd': (1920, 1080, 6),
+    'hd_long': (1280, 720, 120),
+}
+DEFAULT_CASES = ['sd', 'hd', 'fullhd']
+
+
+class _QuietHandler(SimpleHTTPRequestHandler):
+    def log_message(self, format, *args):
+        pass
+
+
+def make_hls(video_path, hls_dir):
+    """Segment a video into a VOD HLS playlist with ffmpeg; returns the playlist path"""
+    playlist = os.path.join(hls_dir, 'index.m3u8')
+    if os.path.exists(playlist):
+        return playlist
+    os.makedirs(hls_dir, exist_ok=True)
+    subprocess.run([
+        'ffmpeg', '-v', 'error', '-y', '-i', video_path, '-c:v', 'libx264', '-preset', 'veryfast',
+        '-g', '50', '-f', 'hls', '-hls_time', '2', '-hls_playlist_type', 'vod', playlist
+    ], check=True)
+    return playlist
+
+
+def serve_directory(directory):
+    """Serve a directory over HTTP on a free local port; returns (server, base URL)"""
+    handler = functools.partial(_QuietHandler, directory=directory)
+    server = ThreadingHTTPServer(('127.0.0.1', 0), handler)
+    thread = threading.Thread(target=server.serve_forever)
+    thread.daemon = True
+    thread.start()
+    return server, f"http://127.0.0.1:{server.server_address[1]}"
+
+
+def make_manager(model_kind, output_dir):
+    """InferenceManager with its own progress tracker, writing results to output_dir"""
+    manager = InferenceManager(ProgressTracker())
+    manager.output_dir = output_dir
+    manager.memory_sample_seconds = 0.5
+    # Benchmark runs stay out of the service's throughput profile
+    manager.cost_estimator = CostEstimator(os.path.join(output_dir, 'throughput_profile.json'))
+    if model_kind == 'stub':
+        manager.model = StubDetector()
+        manager.class_names = list(CLASS_NAMES)
+        manager.logo_groups = {}
+        manager.model_kind = 'stub'
+    elif not manager._load_model():
+        raise RuntimeError("Failed to load the model")
+    return manager
+
+
+def run_job(manager, source, job_id, frames):
+    """Run one job synchronously and collect throughput, CPU time, stage times and memory"""
+    codec = (manager._video_metadata(source) or {}).get('codec')
+    started, cpu_started = time.perf_counter(), time.process_time()
+    manager._run_inference('video', source, job_id)
+    wall = time.perf_counter() - started
+    cpu = time.process_time() - cpu_started
+    progress = manager.progress.get_progress()
+    if progress['stage'] != 'COMPLETE':
+        return {"error": progress['message']}
+    details = progress.get('details') or {}
+    timings = details.get('timings') or {}
+    memory = details.get('memory') or {}
+    frames_done = progress.get('current_frame') or frames
+    peak = memory.get('peak_rss_bytes')
+    return {
+        "frames": frames_done,
+        "seconds": round(wall, 3),
+        "cpu_seconds": round(cpu, 3),
+        "fps": round(frames_done / wall, 2) if wall > 0 else 0.0,
+        "engine": manager._engine_key('stream' if manager._is_url(source) else 'file'),
+        "codec": codec,
+        "bottleneck": timings.get('bottleneck'),
+        "stages": {name: {"total_seconds": s["total_seconds"], "mean_ms": s["mean_ms"]}
+                   for name, s in (timings.get('stages') or {}).items()},
+        "peak_rss_mb": round(peak / (1024 * 1024), 1) if peak else None
+    }
+
+
+def run_case(name, mode, model_kind, repeat=1, work_dir=None):
+    """Benchmark one case in one mode; the best of `repeat` runs is kept"""
+    width, height, seconds = CASES[name]
+    video = make_synthetic_video(os.path.join(CACHE_DIR, f"{name}_{width}x{height}_{seconds}s.avi"),
+                                 width, height, seconds)
+    server = None
+    try:
+        if mode == 'stream':
+            if shutil.which('ffmpeg') is None:
+                return {"skipped": "ffmpeg not installed"}
+            make_hls(video['path'], os.path.join(CACHE_DIR, f"{name}_{width}x{height}_{seconds}s_hls"))
+            server, base_url = serve_directory(CACHE_DIR)
+            source = f"{base_url}/{name}_{width}x{height}_{seconds}s_hls/index.m3u8"
+        else:
+            source = video['path']
+        best = None
+        for _ in range(max(1, repeat)):
+            output_dir = tempfile.mkdtemp(prefix='bench_', dir=work_dir)
+            try:
+                result = run_job(make_manager(model_kind, output_dir), source, f"bench_{name}_{mode}",
+                                 video['frames'])
+            finally:
+                shutil.rmtree(output_dir, ignore_errors=True)
+            if 'error' in result:
+                return result
+            if best is None or result['fps'] > best['fps']:
+                best = result
+        best.update({"width": width, "height": height})
+        return best
+    finally:
+        if server is not None:
+            server.shutdown()
+            server.server_close()
+
+
+def compare(results, baseline, tolerance, memory_tolerance):
+    """Regressions against the baseline: fps drops beyond tolerance, peak RSS growth beyond memory_tolerance"""
+    regressions = []
+    for key, result in results.items():
+        reference = (baseline.get('results') or {}).get(key)
+        if not reference or 'fps' not in result or 'fps' not in reference:
+            continue
+        if result['fps'] < reference['fps'] * (1.0 - tolerance):
+            regressions.append(f"{key}: {result['fps']:.1f} fps vs baseline {reference['fps']:.1f} fps "
+                               f"({(result['fps'] / reference['fps'] - 1) * 100:+.1f}%)")
+        if result.get('peak_rss_mb') and reference.get('peak_rss_mb') and \
+                result['peak_rss_mb'] > reference['peak_rss_mb'] * (1.0 + memory_tolerance):
+            regressions.append(f"{key}: peak RSS {result['peak_rss_mb']:.0f} MB vs baseline "
+                               f"{reference['peak_rss_mb']:.0f} MB")
+    return regressions
+
+
+def main():
+    parser = argparse.ArgumentParser(description='End-to-end pipeline throughput benchmark on synthetic videos')
+    parser.add_argument('--cases', nargs='+', default=DEFAULT_CASES, choices=sorted(CASES), help='Cases to run')
+    parser.add_argument('--modes', nargs='+', default=['file', 'stream'], choices=['file', 'stream'])
+    parser.add_argument('--model', default='stub', choices=['stub', 'real'], help='Detector to run')
+    parser.add_argument('--repeat', type=int, default=1, help='Runs per case; the fastest is kept')
+    parser.add_argument('--baseline', default=DEFAULT_BASELINE, help='Baseline JSON file')
+    parser.add_argument('--save-baseline', action='store_true', help='Store the results as the new baseline')
+    parser.add_argument('--tolerance', type=float, default=0.15, help='Allowed relative fps drop')
+    parser.add_argument('--memory-tolerance', type=float, default=0.25, help='Allowed relative peak RSS growth')
+    parser.add_argument('--json', action='store_true', help='Print results as JSON')
+    parser.add_argument('--save-profile', nargs='?', const=DEFAULT_PROFILE, metavar='PATH',
+                        help=f'Store the throughput per engine configuration for cost estimates (default: {DEFAULT_PROFILE})')
+    args = parser.parse_args()
+
+    results = {}
+    for name in args.cases:
+        for mode in args.modes:
+            key = f"{name}/{mode}/{args.model}"
+            print(f"Running {key}...", file=sys.stderr)
+            try:
+                results[key] = run_case(name, mode, args.model, args.repeat)
+            except Exception as e:
+                results[key] = {"error": str(e)}
+
+    baseline = {}
+    if os.path.exists(args.baseline):
+        with open(args.baseline) as f:
+            baseline = json.load(f)
+    regressions = compare(results, baseline, args.tolerance, args.memory_tolerance)
+
+    if args.json:
+        print(json.dumps({"results": results, "regressions": regressions}, indent=2))
+    else:
+        print(f"{'case':<26} {'size':>10} {'frames':>7} {'seconds':>8} {'fps':>8} {'peak MB':>8}  bottleneck")
+        for key, r in results.items():
+            if 'error' in r or 'skipped' in r:
+                print(f"{key:<26} {r.get('error') or 'skipped: ' + r['skipped']}")
+                continue
+            reference = (baseline.get('results') or {}).get(key, {}).get('fps')
+            delta = f" ({(r['fps'] / reference - 1) * 100:+.1f}%)" if reference else ""
+            size = f"{r['width']}x{r['height']}"
+            print(f"{key:<26} {size:>10} {r['frames']:>7} {r['seconds']:>8.2f} {r['fps']:>8.1f} "
+                  f"{r['peak_rss_mb'] or 0:>8.0f}  {r['bottleneck']}{delta}")
+        for line in regressions:
+            print(f"REGRESSION {line}")
+
+    if args.save_baseline:
+        baseline_results = dict(baseline.get('results') or {})
+        baseline_results.update({k: r for k, r in results.items() if 'fps' in r})
+        with open(args.baseline, 'w') as f:
+            json.dump({
+                "recorded_at": time.strftime('%Y-%m-%dT%H:%M:%S'),
+                "machine": f"{platform.node()} {platform.machine()} {platform.python_version()}",
+                "results": baseline_results
+            }, f, indent=2)
+        print(f"Baseline saved to {args.baseline}", file=sys.stderr)
+
+    if args.save_profile:
+        estimator = CostEstimator(args.save_profile)
+        for r in results.values():
+            if r.get('fps'):
+                estimator.add_benchmark(r['engine'], r['width'], r['height'], r['codec'], r['seconds'] / r['frames'],
+                                        r['cpu_seconds'] / r['frames'], r['frames'])
+        print(f"Throughput profile saved to {args.save_profile}", file=sys.stderr)
+
+    sys.exit(1 if regressions else 0)
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,354 @@
+#!/usr/bin/env python3
+"""
+Numerical-equivalence check of processing engine configurations.
+
+Runs a reference video through the baseline file pipeline and through alternative
+engine configurations (InferenceManager settings such as the decoder subprocess,
+batched inference or series chunking), then diffs their stats.json,
+timeline_intervals.json, coverage_per_frame.json and prominence_per_frame.json:
+every stats metric per brand within a tolerance, and the exact frames where the
+timeline or the per-frame series diverge. Two existing result directories can be
+diffed the same way with `diff`.
+
+Configurations are presets (see PRESETS) or NAME:key=value,... where keys are
+InferenceManager attributes (the settings of its SPONSORSPOTLIGHT_* variables) plus
+batch=N to route frames through a BatchInferenceServer of batch size N.
+
+Examples:
+    python benchmarks/equivalence.py run
+    python benchmarks/equivalence.py run --configs batched chunk16:series_chunk_size=16 --tol coverage=0.01
+    python benchmarks/equivalence.py run --video match.mp4 --model real --report report.json
+    python benchmarks/equivalence.py diff results/<job_a> results/<job_b>
+"""
+import argparse
+import json
+import math
+import os
+import shutil
+import sys
+import tempfile
+
+# Add the project root to the path so we can import the backend package
+ROOT_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, ROOT_DIR)
+
+from backend.core.interval_index import INTERVALS_FILE, load_intervals
+from benchmarks.synthetic import CLASS_NAMES, StubDetector, make_synthetic_video
+
+CACHE_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), '.cache')
+
+PRESETS = {
+    'decoder_process': {'decoder_process': 'opencv'},
+    'batched': {'batch': '4'},
+    'ring1': {'frame_ring_slots': '1'},
+    'chunk16': {'series_chunk_size': '16'},
+    # Spills the series and then infers every other frame, so it is expected to diverge
+    'memory_pressure': {'memory_soft_limit_mb': '1', 'memory_sample_seconds': '0', 'memory_max_stride': '2'},
+}
+DEFAULT_CONFIGS = ['decoder_process', 'batched', 'chunk16']
+SERIES = {'coverage': 'coverage_per_frame.json', 'prominence': 'prominence_per_frame.json'}
+# Divergent frame ranges listed per brand in the text report
+MAX_LISTED_RANGES = 10
+
+
+def parse_config(spec):
+    """(name, settings) from a preset name or NAME:key=value,..."""
+    if spec in PRESETS:
+        return spec, dict(PRESETS[spec])
+    name, _, assignments = spec.partition(':')
+    if not assignments:
+        raise ValueError(f"Unknown preset {spec!r}; use one of {', '.join(PRESETS)} or NAME:key=value,...")
+    settings = {}
+    for assignment in assignments.split(','):
+        key, sep, value = assignment.partition('=')
+        if not sep:
+            raise ValueError(f"Expected key=value in {spec!r}")
+        settings[key.strip()] = value.strip()
+    return name, settings
+
+
+def apply_settings(manager, settings):
+    """Set InferenceManager attributes from strings, converted to the type of their defaults"""
+    from backend.core.batch_inference import BatchInferenceServer
+
+    for key, value in settings.items():
+        if key == 'batch':
+            manager.batch_server = BatchInferenceServer(
+                manager.model, max_batch_size=int(value), max_wait=manager.batch_wait_ms / 1000.0,
+                imgsz=manager.imgsz, conf=manager._model_confidence()
+            ).start()
+            continue
+        if not hasattr(manager, key):
+            raise ValueError(f"InferenceManager has no setting {key!r}")
+        current = getattr(manager, key)
+        if isinstance(current, bool):
+            converted = value.lower() not in ('0', 'false', 'no', '')
+        elif isinstance(current, int):
+            converted = int(value)
+        elif isinstance(current, float):
+            converted = float(value)
+        elif isinstance(current, list):
+            # Items take the type of the default's (floats for an empty default)
+            item_type = type(current[0]) if current else float
+            converted = [item_type(v) for v in value.split('|') if v]
+        else:
+            converted = value
+        setattr(manager, key, converted)
+
+
+def run_config(video_path, settings, output_dir, model_kind='stub'):
+    """Process the video with the given settings; returns the result directory"""
+    from backend.core.inference_manager import InferenceManager
+    from backend.utils.cost_estimator import CostEstimator
+    from backend.utils.progress_manager import ProgressTracker
+
+    manager = InferenceManager(ProgressTracker())
+    manager.output_dir = output_dir
+    # Benchmark runs stay out of the service's throughput profile
+    manager.cost_estimator = CostEstimator(os.path.join(output_dir, 'throughput_profile.json'))
+    if model_kind == 'stub':
+        manager.model = StubDetector()
+        manager.class_names = list(CLASS_NAMES)
+        manager.logo_groups = {}
+    elif not manager._load_model():
+        raise RuntimeError("Failed to load the model")
+    apply_settings(manager, settings)
+    try:
+        manager._run_inference('video', video_path, 'job')
+    finally:
+        if manager.batch_server is not None:
+            manager.batch_server.close()
+    progress = manager.progress.get_progress()
+    if progress['stage'] != 'COMPLETE':
+        raise RuntimeError(progress['message'])
+    return os.path.join(output_dir, 'job')
+
+
+def frame_ranges(frames):
+    """Sorted frame numbers as [first, last] ranges of consecutive frames"""
+    ranges = []
+    for frame in frames:
+        if ranges and frame == ranges[-1][1] + 1:
+            ranges[-1][1] = frame
+        else:
+            ranges.append([frame, frame])
+    return ranges
+
+
+def _load(result_dir, filename):
+    path = os.path.join(result_dir, filename)
+    if not os.path.exists(path):
+        return None
+    with open(path) as f:
+        return json.load(f)
+
+
+def _differs(base, other, abs_tol, rel_tol):
+    if isinstance(base, (int, float)) and isinstance(other, (int, float)):
+        return not math.isclose(base, other, rel_tol=rel_tol, abs_tol=abs_tol)
+    return base != other
+
+
+def diff_results(base_dir, other_dir, abs_tol=0.0, rel_tol=0.0, tolerances=None):
+    """
+    Differences between two result directories, per brand. tolerances maps a stats
+    metric, or 'coverage'/'prominence' for the per-frame series, to its absolute tolerance.
+    """
+    tolerances = tolerances or {}
+    report = {"equivalent": True, "video_metadata": [], "missing_files": [], "brands": {}}
+
+    def brand_entry(brand):
+        report["equivalent"] = False
+        return report["brands"].setdefault(brand, {})
+
+    base_stats, other_stats = _load(base_dir, 'stats.json'), _load(other_dir, 'stats.json')
+    if base_stats is None or other_stats is None:
+        report["equivalent"] = False
+        report["missing_files"].append('stats.json')
+        return report
+    base_meta, other_meta = base_stats.get("video_metadata", {}), other_stats.get("video_metadata", {})
+    for field in sorted(set(base_meta) | set(other_meta)):
+        if _differs(base_meta.get(field), other_meta.get(field), abs_tol, rel_tol):
+            report["equivalent"] = False
+            report["video_metadata"].append({"field": field, "base": base_meta.get(field),
+                                             "other": other_meta.get(field)})
+
+    base_logos, other_logos = base_stats.get("logo_stats", {}), other_stats.get("logo_stats", {})
+    for brand in sorted(set(base_logos) | set(other_logos)):
+        if brand not in base_logos or brand not in other_logos:
+            brand_entry(brand)["stats_missing_in"] = 'base' if brand not in base_logos else 'other'
+            continue
+        metrics = []
+        for metric in sorted(set(base_logos[brand]) | set(other_logos[brand])):
+            base_value, other_value = base_logos[brand].get(metric), other_logos[brand].get(metric)
+            if _differs(base_value, other_value, tolerances.get(metric, abs_tol), rel_tol):
+                entry = {"metric": metric, "base": base_value, "other": other_value}
+                if isinstance(base_value, (int, float)) and isinstance(other_value, (int, float)):
+                    entry["diff"] = other_value - base_value
+                metrics.append(entry)
+        if metrics:
+            brand_entry(brand)["stats"] = metrics
+
+    base_index, other_index = load_intervals(base_dir), load_intervals(other_dir)
+    if base_index is None or other_index is None:
+        report["equivalent"] = False
+        report["missing_files"].append(INTERVALS_FILE)
+    else:
+        base_timeline, other_timeline = base_index.to_timeline(), other_index.to_timeline()
+        for brand in sorted(set(base_timeline) | set(other_timeline)):
+            base_frames = set(base_timeline.get(brand, []))
+            other_frames = set(other_timeline.get(brand, []))
+            if base_frames != other_frames:
+                brand_entry(brand)["timeline"] = {
+                    "only_in_base": frame_ranges(sorted(base_frames - other_frames)),
+                    "only_in_other": frame_ranges(sorted(other_frames - base_frames)),
+                    "frames_differing": len(base_frames ^ other_frames)
+                }
+
+    for series, filename in SERIES.items():
+        base_series, other_series = _load(base_dir, filename), _load(other_dir, filename)
+        if base_series is None or other_series is None:
+            report["equivalent"] = False
+            report["missing_files"].append(filename)
+            continue
+        tolerance = tolerances.get(series, abs_tol)
+        base_logos, other_logos = base_series.get("per_logo", {}), other_series.get("per_logo", {})
+        for brand in sorted(set(base_logos) | set(other_logos)):
+            base_values, other_values = base_logos.get(brand, []), other_logos.get(brand, [])
+            diverging = []
+            max_diff, max_frame = 0.0, None
+            for i in range(max(len(base_values), len(other_values))):
+                base_value = base_values[i] if i < len(base_values) else 0.0
+                other_value = other_values[i] if i < len(other_values) else 0.0
+                if not math.isclose(base_value, other_value, rel_tol=rel_tol, abs_tol=tolerance):
+                    # Series index i is frame i + 1
+                    diverging.append(i + 1)
+                    diff = abs(other_value - base_value)
+                    if diff > max_diff:
+                        max_diff, max_frame = diff, i + 1
+            if diverging or len(base_values) != len(other_values):
+                brand_entry(brand)[series] = {
+                    "frames": frame_ranges(diverging),
+                    "frames_differing": len(diverging),
+                    "max_abs_diff": round(max_diff, 6),
+                    "max_abs_diff_frame": max_frame,
+                    "lengths": [len(base_values), len(other_values)]
+                }
+    return report
+
+
+def _format_ranges(ranges):
+    text = ', '.join(f"{a}" if a == b else f"{a}-{b}" for a, b in ranges[:MAX_LISTED_RANGES])
+    if len(ranges) > MAX_LISTED_RANGES:
+        text += f", ... ({len(ranges) - MAX_LISTED_RANGES} more ranges)"
+    return text
+
+
+def print_report(name, report):
+    if report["equivalent"]:
+        print(f"{name}: equivalent")
+        return
+    print(f"{name}: DIVERGES")
+    for filename in report["missing_files"]:
+        print(f"  missing {filename}")
+    for entry in report["video_metadata"]:
+        print(f"  video_metadata.{entry['field']}: {entry['base']} -> {entry['other']}")
+    for brand, diffs in report["brands"].items():
+        print(f"  {brand}:")
+        if "stats_missing_in" in diffs:
+            print(f"    stats: brand missing in {diffs['stats_missing_in']}")
+        for entry in diffs.get("stats", []):
+            print(f"    stats.{entry['metric']}: {entry['base']} -> {entry['other']}")
+        if "timeline" in diffs:
+            timeline = diffs["timeline"]
+            print(f"    timeline: {timeline['frames_differing']} frames differ")
+            if timeline["only_in_base"]:
+                print(f"      only in base: {_format_ranges(timeline['only_in_base'])}")
+            if timeline["only_in_other"]:
+                print(f"      only in other: {_format_ranges(timeline['only_in_other'])}")
+        for series in SERIES:
+            if series in diffs:
+                d = diffs[series]
+                print(f"    {series}: {d['frames_differing']} frames differ (max {d['max_abs_diff']} "
+                      f"at frame {d['max_abs_diff_frame']}), lengths {d['lengths'][0]}/{d['lengths'][1]}")
+                if d["frames"]:
+                    print(f"      frames: {_format_ranges(d['frames'])}")
+
+
+def _parse_tolerances(values):
+    tolerances = {}
+    for value in values or []:
+        key, sep, tolerance = value.partition('=')
+        if not sep:
+            raise ValueError(f"Expected NAME=TOLERANCE, got {value!r}")
+        tolerances[key.strip()] = float(tolerance)
+    return tolerances
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Numerical-equivalence check of processing engine configurations')
+    parser.add_argument('--abs-tol', type=float, default=0.0, help='Default absolute tolerance')
+    parser.add_argument('--rel-tol', type=float, default=0.0, help='Relative tolerance')
+    parser.add_argument('--tol', action='append', metavar='NAME=TOL',
+                        help="Absolute tolerance for one stats metric, or 'coverage'/'prominence' for the series")
+    parser.add_argument('--report', help='Write the full report as JSON to this file')
+    commands = parser.add_subparsers(dest='command', required=True)
+
+    run_parser = commands.add_parser('run', help='Run the baseline and alternative configurations and diff them')
+    run_parser.add_argument('--video', help='Reference video (default: a synthetic 640x360 20 s video)')
+    run_parser.add_argument('--configs', nargs='+', default=DEFAULT_CONFIGS,
+                            help=f"Presets ({', '.join(PRESETS)}) or NAME:key=value,...")
+    run_parser.add_argument('--baseline', default='', help='Settings of the baseline run as key=value,...')
+    run_parser.add_argument('--model', default='stub', choices=['stub', 'real'], help='Detector to run')
+    run_parser.add_argument('--keep', help='Keep the result directories under this directory')
+
+    diff_parser = commands.add_parser('diff', help='Diff two existing result directories')
+    diff_parser.add_argument('base_dir')
+    diff_parser.add_argument('other_dir')
+    args = parser.parse_args()
+    try:
+        tolerances = _parse_tolerances(args.tol)
+    except ValueError as e:
+        parser.error(str(e))
+
+    reports = {}
+    if args.command == 'diff':
+        reports['other'] = diff_results(args.base_dir, args.other_dir, args.abs_tol, args.rel_tol, tolerances)
+    else:
+        try:
+            configs = [parse_config(spec) for spec in args.configs]
+            baseline = parse_config('baseline:' + args.baseline)[1] if args.baseline else {}
+        except ValueError as e:
+            parser.error(str(e))
+        video = args.video or make_synthetic_video(os.path.join(CACHE_DIR, 'equivalence_640x360_20s.avi'),
+                                                   640, 360, 20)['path']
+        work_dir = args.keep or tempfile.mkdtemp(prefix='equivalence_')
+        try:
+            print(f"Running baseline on {video}...", file=sys.stderr)
+            base_dir = run_config(video, baseline, os.path.join(work_dir, 'baseline'), args.model)
+            for name, settings in configs:
+                print(f"Running {name} ({', '.join(f'{k}={v}' for k, v in settings.items())})...", file=sys.stderr)
+                try:
+                    other_dir = run_config(video, settings, os.path.join(work_dir, name), args.model)
+                except Exception as e:
+                    reports[name] = {"equivalent": False, "error": str(e), "video_metadata": [],
+                                     "missing_files": [], "brands": {}}
+                    continue
+                reports[name] = diff_results(base_dir, other_dir, args.abs_tol, args.rel_tol, tolerances)
+        finally:
+            if not args.keep:
+                shutil.rmtree(work_dir, ignore_errors=True)
+
+    for name, report in reports.items():
+        if "error" in report:
+            print(f"{name}: FAILED ({report['error']})")
+        else:
+            print_report(name, report)
+    if args.report:
+        with open(args.report, 'w') as f:
+            json.dump(reports, f, indent=2)
+    sys.exit(0 if all(report["equivalent"] for report in reports.values()) else 1)
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,258 @@
+"""
+Detection fixtures for the micro-benchmarks.
+
+A fixture is a directory holding frame_detections.jsonl in the format the pipeline
+writes (one record per inferred frame) and fixture.json with the video properties.
+Fixtures are either generated (broadcast-like brand appearances at a given length,
+deterministic for a seed) or recorded from the result directory of a real job.
+The stats.json / timeline_intervals.json / coverage_per_frame.json derived from the
+detections are computed once with ExposureStatsAccumulator and kept alongside.
+"""
+import json
+import os
+import shutil
+import tempfile
+
+import cv2
+import numpy as np
+
+from backend.core.detection_store import DetectionStore, DetectionStoreWriter, STORE_DIR, detections_path, export_jsonl
+from backend.core.exposure_stats import ExposureStatsAccumulator
+from backend.core.interval_index import INTERVALS_FILE, IntervalIndex
+
+FIXTURES_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), '.cache', 'fixtures')
+
+# Generated fixture name -> length in seconds, from a short clip to a full broadcast
+SIZES = {
+    'clip_30s': 30,
+    'short_5m': 300,
+    'half_45m': 2700,
+    'broadcast_3h': 10800,
+}
+
+# Brand, mean seconds on screen per appearance, mean seconds between appearances
+BRANDS = [
+    ("redline", 12.0, 20.0),
+    ("bluewave", 8.0, 30.0),
+    ("sunbeam", 6.0, 45.0),
+    ("magenta", 4.0, 60.0),
+    ("aqua", 3.0, 90.0),
+    ("orangeco", 10.0, 25.0),
+    ("greenfield", 2.0, 120.0),
+    ("nightowl", 5.0, 300.0),
+]
+# Share of frames in which a visible logo is missed by the detector
+DROPOUT = 0.05
+
+
+def _polygon_record(brand, polygon, confidence):
+    polygon = [[round(float(x), 2), round(float(y), 2)] for x, y in polygon]
+    xs = [p[0] for p in polygon]
+    ys = [p[1] for p in polygon]
+    return {
+        "class": brand,
+        "raw_class": brand,
+        "confidence": round(confidence, 3),
+        "polygon": polygon,
+        "bbox": [min(xs), min(ys), max(xs), max(ys)]
+    }
+
+
+def generate_fixture(path, seconds, width=1280, height=720, fps=25.0, seed=0):
+    """
+    Write a generated fixture of the given length into path. Brands come and go in
+    appearances of random length (one to three instances each, drifting and rotating),
+    with occasional missed detections, like the detector output on a broadcast.
+    """
+    rng = np.random.default_rng(seed)
+    frames = int(round(seconds * fps))
+    # Per brand: frames left in the current state, and instances while on screen
+    states = [{"left": int(rng.exponential(gap) * fps), "instances": None} for _, _, gap in BRANDS]
+    os.makedirs(path, exist_ok=True)
+    with open(os.path.join(path, 'frame_detections.jsonl'), 'w') as f:
+        for frame in range(1, frames + 1):
+            detections = []
+            for (brand, on_seconds, gap_seconds), state in zip(BRANDS, states):
+                if state["left"] <= 0:
+                    if state["instances"] is None:
+                        state["left"] = max(1, int(rng.exponential(on_seconds) * fps))
+                        state["instances"] = [{
+                            "center": rng.uniform((0.1 * width, 0.1 * height), (0.9 * width, 0.9 * height)),
+                            "velocity": rng.normal(0, 0.01 * width, 2) / fps,
+                            "size": rng.uniform(0.04, 0.2) * width,
+                            "angle": rng.uniform(-30, 30),
+                            "spin": rng.normal(0, 5) / fps,
+                            "confidence": rng.uniform(0.5, 0.95)
+                        } for _ in range(int(rng.integers(1, 4)))]
+                    else:
+                        state["left"] = max(1, int(rng.exponential(gap_seconds) * fps))
+                        state["instances"] = None
+                state["left"] -= 1
+                if state["instances"] is None:
+                    continue
+                for instance in state["instances"]:
+                    instance["center"] += instance["velocity"]
+                    instance["angle"] += instance["spin"]
+                    if rng.random() < DROPOUT:
+                        continue
+                    cx, cy = instance["center"]
+                    size = instance["size"]
+                    polygon = cv2.boxPoints(((float(cx), float(cy)), (size, size * 0.4), float(instance["angle"])))
+                    polygon[:, 0] = np.clip(polygon[:, 0], 0, width)
+                    polygon[:, 1] = np.clip(polygon[:, 1], 0, height)
+                    detections.append(_polygon_record(brand, polygon, float(instance["confidence"])))
+            f.write(json.dumps({"frame": frame, "time": round(frame / fps, 3), "detections": detections}) + "\n")
+    _write_meta(path, {
+        "source": "generated", "seed": seed, "width": width, "height": height, "fps": fps, "frames": frames,
+        "classes": [brand for brand, _, _ in BRANDS]
+    })
+
+
+def record_fixture(result_dir, path):
+    """Make a fixture from the stored detections and stats.json of a finished job"""
+    with open(os.path.join(result_dir, 'stats.json')) as f:
+        video = json.load(f)["video_metadata"]
+    os.makedirs(path, exist_ok=True)
+    source = detections_path(result_dir)
+    if os.path.basename(source) == STORE_DIR:
+        with open(os.path.join(path, 'frame_detections.jsonl'), 'w') as f:
+            export_jsonl(DetectionStore(source), f)
+    else:
+        shutil.copyfile(source, os.path.join(path, 'frame_detections.jsonl'))
+    classes = set()
+    with open(os.path.join(path, 'frame_detections.jsonl')) as f:
+        for line in f:
+            if line.strip():
+                classes.update(d.get('raw_class', d['class']) for d in json.loads(line).get('detections', []))
+    _write_meta(path, {
+        "source": os.path.abspath(result_dir), "width": video["width"], "height": video["height"],
+        "fps": video["fps"], "frames": video["total_frames"], "classes": sorted(classes)
+    })
+
+
+def _write_meta(path, meta):
+    with open(os.path.join(path, 'fixture.json'), 'w') as f:
+        json.dump(meta, f, indent=2)
+
+
+def load_fixture(name, seed=0):
+    """Fixture by name: a generated size from SIZES (created on first use) or a recorded fixture"""
+    path = os.path.join(FIXTURES_DIR, name)
+    if not os.path.exists(os.path.join(path, 'fixture.json')):
+        if name not in SIZES:
+            raise ValueError(f"Unknown fixture: {name}")
+        print(f"Generating fixture {name}...")
+        os.makedirs(FIXTURES_DIR, exist_ok=True)
+        tmp_path = tempfile.mkdtemp(prefix='.' + name + '_', dir=FIXTURES_DIR)
+        generate_fixture(tmp_path, SIZES[name], seed=seed)
+        shutil.rmtree(path, ignore_errors=True)
+        os.replace(tmp_path, path)
+    return DetectionFixture(path)
+
+
+def available_fixtures():
+    """Generated sizes plus the fixtures recorded so far, shortest first"""
+    names = list(SIZES)
+    if os.path.isdir(FIXTURES_DIR):
+        names += sorted(n for n in os.listdir(FIXTURES_DIR)
+                        if n not in SIZES and not n.startswith('.') and os.path.exists(os.path.join(FIXTURES_DIR, n, 'fixture.json')))
+    return names
+
+
+class DetectionFixture:
+    """Recorded per-frame detections of one video and the outputs derived from them"""
+
+    def __init__(self, path):
+        self.path = path
+        self.name = os.path.basename(path.rstrip(os.sep))
+        with open(os.path.join(path, 'fixture.json')) as f:
+            self.meta = json.load(f)
+        self.width = int(self.meta["width"])
+        self.height = int(self.meta["height"])
+        self.fps = float(self.meta["fps"])
+        self.frames = int(self.meta["frames"])
+        self.classes = list(self.meta.get("classes") or [])
+        self.jsonl_path = os.path.join(path, 'frame_detections.jsonl')
+
+    def records(self):
+        """Iterate over the JSONL records"""
+        with open(self.jsonl_path) as f:
+            for line in f:
+                if line.strip():
+                    yield json.loads(line)
+
+    def detections(self, record):
+        """Detection dicts of a record, as InferenceManager._extract_detections returns them"""
+        detections = []
+        for det in record.get("detections") or []:
+            raw_class = det.get("raw_class", det["class"])
+            polygon = det.get("polygon")
+            detections.append({
+                "class": det["class"],
+                "raw_class": raw_class,
+                "class_id": self.classes.index(raw_class) if raw_class in self.classes else 0,
+                "confidence": float(det.get("confidence", 1.0)),
+                "points": np.array(polygon, dtype=np.float32) if polygon else None
+            })
+        return detections
+
+    def chunks(self, size=5000):
+        """Lists of (frame, weight, detections), so long fixtures need not be held in memory at once"""
+        chunk = []
+        for record in self.records():
+            chunk.append((int(record["frame"]), int(record.get("weight", 1)), self.detections(record)))
+            if len(chunk) >= size:
+                yield chunk
+                chunk = []
+        if chunk:
+            yield chunk
+
+    def sample(self, count):
+        """Up to count records evenly spread over the video, preferring frames with detections"""
+        step = max(1, self.frames // max(1, count))
+        picked = []
+        for record in self.records():
+            if record.get("detections") and (not picked or record["frame"] - picked[-1]["frame"] >= step):
+                picked.append(record)
+                if len(picked) >= count:
+                    break
+        return picked
+
+    def _derived_path(self, filename):
+        path = os.path.join(self.path, 'derived', filename)
+        if not os.path.exists(path):
+            self._derive()
+        return path
+
+    def _derive(self):
+        """Compute stats.json, timeline_intervals.json and the per-frame series from the detections"""
+        out_dir = os.path.join(self.path, 'derived')
+        os.makedirs(out_dir, exist_ok=True)
+        accumulator = ExposureStatsAccumulator(self.width, self.height, self.fps,
+                                               spill_dir=os.path.join(out_dir, '.series'))
+        for chunk in self.chunks():
+            for _, weight, detections in chunk:
+                accumulator.add_frame(detections, weight)
+        accumulator.write_outputs(out_dir, self.frames, self.frames / self.fps if self.fps > 0 else 0)
+        accumulator.close()
+
+    def detection_store_path(self):
+        """The fixture's detections as a detection store, written on first use"""
+        path = os.path.join(self.path, 'derived', STORE_DIR)
+        if not os.path.exists(os.path.join(path, 'store.json')):
+            writer = DetectionStoreWriter(path, self.fps)
+            for chunk in self.chunks():
+                for frame, _, detections in chunk:
+                    writer.add_frame(frame, detections)
+            writer.close()
+        return path
+
+    def load_derived(self, filename):
+        """One of the derived JSON outputs (stats.json, timeline_intervals.json, coverage_per_frame.json, ...)"""
+        with open(self._derived_path(filename)) as f:
+            return json.load(f)
+
+    def busiest_brand(self):
+        """Brand on screen in the most frames"""
+        index = IntervalIndex.from_payload(self.load_derived(INTERVALS_FILE))
+        return max(index.brands(), key=index.frame_count) if index.brands() else None
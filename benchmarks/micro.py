@@ -0,0 +1,385 @@
+#!/usr/bin/env python3
+"""
+Micro-benchmarks of the statistics, annotation and overlay hot paths on detection fixtures.
+
+Benchmarks:
+    stats               per-frame stats loop of _process_video (ExposureStatsAccumulator.add_frame
+                        and BrandEventDetector.add_frame) and its finalize (write_outputs)
+    annotate_frame      InferenceManager._annotate_frame on sampled frames
+    brand_overlays      _draw_brand_overlays on sampled frames
+    load_detections_map _load_detections_map on the whole frame_detections.jsonl
+    load_detections_window
+                        _load_detections_map on a 5-second clip window of the detection store
+    find_best_clip      find_best_clip on the busiest brand
+    find_best_windows   _find_best_windows on the busiest brand's coverage series
+    rank_brands         rank_brands over every metric
+
+Fixtures range from a 30-second clip to a 3-hour broadcast (see benchmarks/fixtures.py);
+fixtures recorded from real jobs can be added with `record`. Each run is appended to a
+JSON-lines history, and `compare` flags benchmarks slower than a threshold.
+
+Examples:
+    python benchmarks/micro.py run
+    python benchmarks/micro.py run --benchmarks stats find_best_windows --sizes clip_30s broadcast_3h
+    python benchmarks/micro.py compare --threshold 0.1
+    python benchmarks/micro.py record frontend/static/results/<job_id> --name final_2024
+"""
+import argparse
+import contextlib
+import io
+import json
+import os
+import platform
+import shutil
+import statistics
+import subprocess
+import sys
+import tempfile
+import time
+
+# Add the project root to the path so we can import the backend package
+ROOT_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, ROOT_DIR)
+
+from benchmarks.fixtures import FIXTURES_DIR, SIZES, available_fixtures, load_fixture, record_fixture
+from benchmarks.synthetic import render_frame
+
+DEFAULT_HISTORY = os.path.join(os.path.dirname(os.path.abspath(__file__)), '.history', 'micro.jsonl')
+# Frames sampled from a fixture for the per-frame drawing benchmarks
+SAMPLE_FRAMES = 100
+# Distinct rendered frames the samples are drawn on
+RENDERED_FRAMES = 8
+# Clip length whose detections load_detections_window reads
+CLIP_SECONDS = 5.0
+
+
+def _tool_function(tool):
+    """Plain function behind a LangChain @tool"""
+    return getattr(tool, 'func', tool)
+
+
+def _rendered_frames(fixture, count):
+    frames = []
+    for i in range(count):
+        frames.append(render_frame(i * 250, fixture.width, fixture.height, fixture.fps))
+    return frames
+
+
+def bench_stats(fixture):
+    from backend.core.exposure_stats import ExposureStatsAccumulator
+    from backend.core.brand_events import BrandEventDetector
+
+    work_dir = tempfile.mkdtemp(prefix='micro_stats_')
+    try:
+        accumulator = ExposureStatsAccumulator(fixture.width, fixture.height, fixture.fps,
+                                               spill_dir=os.path.join(work_dir, '.series'))
+        brand_events = BrandEventDetector(fixture.fps, lambda event: None)
+        loop = 0.0
+        frames = 0
+        # Parsing the fixture is not timed
+        for chunk in fixture.chunks():
+            started = time.perf_counter()
+            for frame, weight, detections in chunk:
+                frame_summary = accumulator.add_frame(detections, weight)
+                brand_events.add_frame(frame, frame_summary, weight)
+            loop += time.perf_counter() - started
+            frames += len(chunk)
+        started = time.perf_counter()
+        brand_events.finish()
+        accumulator.write_outputs(work_dir, fixture.frames, fixture.frames / fixture.fps)
+        accumulator.close()
+        finalize = time.perf_counter() - started
+    finally:
+        shutil.rmtree(work_dir, ignore_errors=True)
+    return {
+        "stats_loop": (loop, frames, 'frame'),
+        "stats_finalize": (finalize, fixture.frames, 'frame')
+    }
+
+
+def bench_annotate_frame(fixture):
+    from backend.core.inference_manager import InferenceManager
+    from backend.utils.progress_manager import ProgressTracker
+
+    with contextlib.redirect_stdout(io.StringIO()):
+        manager = InferenceManager(ProgressTracker())
+    frames = _rendered_frames(fixture, RENDERED_FRAMES)
+    samples = [fixture.detections(record) for record in fixture.sample(SAMPLE_FRAMES)]
+    started = time.perf_counter()
+    for i, detections in enumerate(samples):
+        manager._annotate_frame(frames[i % len(frames)], detections)
+    return {"annotate_frame": (time.perf_counter() - started, len(samples), 'frame')}
+
+
+def bench_brand_overlays(fixture):
+    from backend.agent.tools.create_brand_clip_tool import _draw_brand_overlays, _normalize_brand
+
+    brand = _normalize_brand(fixture.busiest_brand())
+    frames = _rendered_frames(fixture, RENDERED_FRAMES)
+    samples = [record["detections"] for record in fixture.sample(SAMPLE_FRAMES)]
+    started = time.perf_counter()
+    for i, detections in enumerate(samples):
+        _draw_brand_overlays(frames[i % len(frames)], detections, brand)
+    return {"brand_overlays": (time.perf_counter() - started, len(samples), 'frame')}
+
+
+def bench_load_detections_map(fixture):
+    from backend.agent.tools.create_brand_clip_tool import _load_detections_map
+
+    started = time.perf_counter()
+    detections_map = _load_detections_map(fixture.jsonl_path)
+    elapsed = time.perf_counter() - started
+    return {"load_detections_map": (elapsed, len(detections_map), 'frame')}
+
+
+def bench_load_detections_window(fixture):
+    from backend.agent.tools.create_brand_clip_tool import _load_detections_map
+
+    store_path = fixture.detection_store_path()
+    first = max(1, fixture.frames // 2)
+    last = first + int(round(CLIP_SECONDS * fixture.fps)) - 1
+    started = time.perf_counter()
+    detections_map = _load_detections_map(store_path, [(first, last)])
+    elapsed = time.perf_counter() - started
+    return {"load_detections_window": (elapsed, len(detections_map), 'frame')}
+
+
+def bench_find_best_clip(fixture):
+    from backend.agent.tools.find_clip_tool import find_best_clip
+    from backend.core.interval_index import INTERVALS_FILE, IntervalIndex
+
+    brand = fixture.busiest_brand()
+    intervals = fixture.load_derived(INTERVALS_FILE)
+    file_info = {
+        'timeline_intervals': intervals,
+        'video_metadata': fixture.load_derived('stats.json')['video_metadata']
+    }
+    started = time.perf_counter()
+    _tool_function(find_best_clip)(brand, file_info)
+    return {"find_best_clip": (time.perf_counter() - started, IntervalIndex.from_payload(intervals).frame_count(brand), 'frame')}
+
+
+def bench_find_best_windows(fixture):
+    from backend.agent.tools.highlight_brand_montage_tool import _find_best_windows
+
+    series = fixture.load_derived('coverage_per_frame.json')['per_logo'][fixture.busiest_brand()]
+    started = time.perf_counter()
+    _find_best_windows(series, fixture.fps, 30.0, 1.0)
+    return {"find_best_windows": (time.perf_counter() - started, len(series), 'frame')}
+
+
+def bench_rank_brands(fixture):
+    from backend.agent.tools.metrics_tool import rank_brands
+
+    rank = _tool_function(rank_brands)
+    file_info = {'stats_data': fixture.load_derived('stats.json')}
+    metrics = ['percentage', 'detections', 'frames', 'time', 'coverage_avg_present', 'coverage_avg_overall',
+               'coverage_max', 'prominence_avg_present', 'prominence_max', 'share_of_voice_avg_present',
+               'share_of_voice_solo_time', 'sov', 'exposure']
+    calls = 0
+    # rank_brands logs every call; its output is discarded but still paid for
+    with open(os.devnull, 'w') as devnull, contextlib.redirect_stdout(devnull):
+        started = time.perf_counter()
+        for _ in range(50):
+            for metric in metrics:
+                rank(file_info, metric, 5)
+                calls += 1
+        elapsed = time.perf_counter() - started
+    return {"rank_brands": (elapsed, calls, 'call')}
+
+
+BENCHMARKS = {
+    'stats': bench_stats,
+    'annotate_frame': bench_annotate_frame,
+    'brand_overlays': bench_brand_overlays,
+    'load_detections_map': bench_load_detections_map,
+    'load_detections_window': bench_load_detections_window,
+    'find_best_clip': bench_find_best_clip,
+    'find_best_windows': bench_find_best_windows,
+    'rank_brands': bench_rank_brands,
+}
+
+
+def run_benchmarks(names, sizes, repeat=3, budget=60.0):
+    """
+    Run the benchmarks on each fixture, shortest first, keeping the fastest of `repeat` runs.
+    Once a run takes longer than `budget` seconds, that benchmark is skipped on longer fixtures.
+    """
+    results = {}
+    fixtures = sorted((load_fixture(size) for size in sizes), key=lambda fixture: fixture.frames)
+    for name in names:
+        over_budget = None
+        for fixture in fixtures:
+            if over_budget is not None:
+                results[f"{name}/{fixture.name}"] = {"skipped": f"over the {budget:g}s budget on {over_budget}"}
+                continue
+            print(f"Running {name} on {fixture.name}...", file=sys.stderr)
+            # Derived outputs are computed outside the timings
+            fixture.busiest_brand()
+            if name == 'load_detections_window':
+                fixture.detection_store_path()
+            runs = {}
+            for _ in range(max(1, repeat)):
+                started = time.perf_counter()
+                measured = BENCHMARKS[name](fixture)
+                for key, value in measured.items():
+                    runs.setdefault(key, []).append(value)
+                if time.perf_counter() - started > budget:
+                    over_budget = fixture.name
+                    break
+            for key, values in runs.items():
+                seconds = [v[0] for v in values]
+                _, items, unit = values[0]
+                best = min(seconds)
+                results[f"{key}/{fixture.name}"] = {
+                    "seconds": round(best, 6),
+                    "median_seconds": round(statistics.median(seconds), 6),
+                    "runs": len(seconds),
+                    "items": items,
+                    "unit": unit,
+                    "us_per_item": round(best / items * 1e6, 3) if items else None
+                }
+    return results
+
+
+def _git_commit():
+    try:
+        return subprocess.run(['git', 'rev-parse', '--short', 'HEAD'], cwd=ROOT_DIR, capture_output=True,
+                              text=True, timeout=10).stdout.strip() or None
+    except Exception:
+        return None
+
+
+def load_history(path):
+    runs = []
+    if os.path.exists(path):
+        with open(path) as f:
+            for line in f:
+                if line.strip():
+                    runs.append(json.loads(line))
+    return runs
+
+
+def append_history(path, run):
+    os.makedirs(os.path.dirname(os.path.abspath(path)), exist_ok=True)
+    with open(path, 'a') as f:
+        f.write(json.dumps(run) + "\n")
+
+
+def _find_run(runs, ref):
+    """A run by id or by negative index into the history (-1 is the latest)"""
+    try:
+        index = int(ref)
+        if index < 0:
+            return runs[index] if len(runs) >= -index else None
+    except ValueError:
+        pass
+    return next((run for run in runs if run["id"] == ref), None)
+
+
+def compare_runs(base, head, threshold):
+    """Rows (key, base seconds, head seconds, relative change, flag) for benchmarks in both runs"""
+    rows = []
+    for key, result in head["results"].items():
+        reference = base["results"].get(key)
+        if not reference or "seconds" not in result or "seconds" not in reference or not reference["seconds"]:
+            continue
+        change = result["seconds"] / reference["seconds"] - 1.0
+        flag = 'REGRESSION' if change > threshold else ('faster' if change < -threshold else '')
+        rows.append((key, reference["seconds"], result["seconds"], change, flag))
+    return rows
+
+
+def print_results(results):
+    print(f"{'benchmark':<44} {'seconds':>10} {'median':>10} {'items':>9} {'us/item':>11}")
+    for key, r in results.items():
+        if 'skipped' in r:
+            print(f"{key:<44} skipped: {r['skipped']}")
+            continue
+        print(f"{key:<44} {r['seconds']:>10.4f} {r['median_seconds']:>10.4f} {r['items']:>9} "
+              f"{r['us_per_item'] or 0:>11.2f}")
+
+
+def print_comparison(base, head, rows):
+    print(f"Comparing {head['id']} ({head.get('commit') or '-'}) with {base['id']} ({base.get('commit') or '-'})")
+    print(f"{'benchmark':<44} {'base s':>10} {'head s':>10} {'change':>8}")
+    for key, base_seconds, head_seconds, change, flag in rows:
+        print(f"{key:<44} {base_seconds:>10.4f} {head_seconds:>10.4f} {change * 100:>+7.1f}%  {flag}")
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Micro-benchmarks of the statistics, annotation and overlay hot paths')
+    parser.add_argument('--history', default=DEFAULT_HISTORY, help='JSON-lines history of runs')
+    commands = parser.add_subparsers(dest='command', required=True)
+
+    run_parser = commands.add_parser('run', help='Run benchmarks and append the results to the history')
+    run_parser.add_argument('--benchmarks', nargs='+', default=list(BENCHMARKS), choices=list(BENCHMARKS))
+    run_parser.add_argument('--sizes', nargs='+', default=list(SIZES),
+                            help=f"Fixtures to run on: {', '.join(SIZES)} or recorded fixture names")
+    run_parser.add_argument('--repeat', type=int, default=3, help='Runs per benchmark; the fastest is kept')
+    run_parser.add_argument('--budget', type=float, default=60.0,
+                            help='Seconds a run may take before longer fixtures are skipped')
+    run_parser.add_argument('--label', default='', help='Free-form label stored with the run')
+    run_parser.add_argument('--no-save', action='store_true', help='Do not append the run to the history')
+    run_parser.add_argument('--threshold', type=float, default=0.1,
+                            help='Relative slowdown flagged against the previous run')
+
+    compare_parser = commands.add_parser('compare', help='Compare two runs from the history')
+    compare_parser.add_argument('--base', default='-2', help='Run id, or negative index (default: the previous run)')
+    compare_parser.add_argument('--head', default='-1', help='Run id, or negative index (default: the latest run)')
+    compare_parser.add_argument('--threshold', type=float, default=0.1, help='Relative slowdown flagged as a regression')
+
+    record_parser = commands.add_parser('record', help="Record a fixture from a job's result directory")
+    record_parser.add_argument('result_dir', help='Result directory with stored detections and stats.json')
+    record_parser.add_argument('--name', required=True, help='Fixture name')
+
+    commands.add_parser('history', help='List the recorded runs')
+    args = parser.parse_args()
+
+    if args.command == 'record':
+        if args.name in SIZES:
+            parser.error(f"{args.name} is a generated fixture name")
+        record_fixture(args.result_dir, os.path.join(FIXTURES_DIR, args.name))
+        print(f"Recorded fixture {args.name}; available: {', '.join(available_fixtures())}")
+        return
+
+    runs = load_history(args.history)
+    if args.command == 'history':
+        for run in runs:
+            print(f"{run['id']}  {run.get('commit') or '-':<10} {len(run['results']):>4} results  {run.get('label', '')}")
+        return
+
+    if args.command == 'compare':
+        base, head = _find_run(runs, args.base), _find_run(runs, args.head)
+        if base is None or head is None:
+            print(f"Runs not found in {args.history} (it has {len(runs)} runs)")
+            sys.exit(2)
+        rows = compare_runs(base, head, args.threshold)
+        print_comparison(base, head, rows)
+        sys.exit(1 if any(flag == 'REGRESSION' for *_, flag in rows) else 0)
+
+    results = run_benchmarks(args.benchmarks, args.sizes, args.repeat, args.budget)
+    run = {
+        "id": time.strftime('%Y%m%d-%H%M%S'),
+        "recorded_at": time.time(),
+        "commit": _git_commit(),
+        "machine": f"{platform.node()} {platform.machine()} {platform.python_version()}",
+        "label": args.label,
+        "results": results
+    }
+    print_results(results)
+    regressions = False
+    if runs:
+        rows = compare_runs(runs[-1], run, args.threshold)
+        if rows:
+            print()
+            print_comparison(runs[-1], run, rows)
+            regressions = any(flag == 'REGRESSION' for *_, flag in rows)
+    if not args.no_save:
+        append_history(args.history, run)
+        print(f"Run {run['id']} appended to {args.history}", file=sys.stderr)
+    sys.exit(1 if regressions else 0)
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,188 @@
+"""
+Synthetic match-like test videos and a deterministic CPU stub detector.
+
+Videos show a textured pitch with a scrolling LED board carrying logos, plus logos
+drifting and rotating across the pitch. Logos are solid, fully saturated colour
+patches with a label, one colour per brand, so the stub detector can find them
+again with colour segmentation and report oriented boxes like the OBB model.
+"""
+import math
+import os
+
+import cv2
+import numpy as np
+
+# Brand name and BGR colour of each synthetic logo; hues are far from the pitch and board
+LOGOS = [
+    ("redline", (0, 0, 255)),
+    ("bluewave", (255, 0, 0)),
+    ("sunbeam", (0, 255, 255)),
+    ("magenta", (255, 0, 255)),
+    ("aqua", (255, 255, 0)),
+    ("orangeco", (0, 128, 255)),
+]
+CLASS_NAMES = [name for name, _ in LOGOS]
+
+
+def _logo_hues():
+    hues = []
+    for _, bgr in LOGOS:
+        hsv = cv2.cvtColor(np.uint8([[bgr]]), cv2.COLOR_BGR2HSV)[0, 0]
+        hues.append(int(hsv[0]))
+    return hues
+
+
+LOGO_HUES = _logo_hues()
+
+
+def logo_positions(frame_index, width, height, fps=25.0):
+    """
+    Ground truth for a frame: list of (class_id, (4, 2) float32 polygon) in pixels.
+    Board logos scroll with the board; floating logos drift and rotate.
+    """
+    t = frame_index / float(fps)
+    positions = []
+    board_top = int(height * 0.12)
+    board_height = max(8, int(height * 0.1))
+    logo_width = max(16, int(width * 0.12))
+    spacing = logo_width * 2
+    # Board logos: one per slot, cycling through the first three brands and scrolling
+    # left at a tenth of the width per second (the pattern repeats every three slots)
+    offset = (t * width * 0.1) % (spacing * 3)
+    for slot in range(int((width + offset) // spacing) + 2):
+        x = slot * spacing - offset
+        x0, x1 = max(0.0, x), min(float(width), x + logo_width)
+        if x1 - x0 < 4:
+            continue
+        y0, y1 = board_top + 2.0, board_top + board_height - 2.0
+        positions.append((slot % 3, np.float32([[x0, y0], [x1, y0], [x1, y1], [x0, y1]])))
+    # Floating logos: one per remaining brand, visible part of the time
+    for k, class_id in enumerate(range(3, len(LOGOS))):
+        phase = t * (0.15 + 0.05 * k) + k * 1.7
+        if math.sin(phase * 0.7) < -0.3:
+            continue
+        cx = width * (0.5 + 0.35 * math.sin(phase))
+        cy = height * (0.6 + 0.25 * math.cos(phase * 1.3))
+        w = width * (0.08 + 0.04 * math.sin(phase * 2.1 + k))
+        h = w * 0.45
+        angle = 20.0 * math.sin(phase * 0.9)
+        box = cv2.boxPoints(((cx, cy), (w, h), angle)).astype(np.float32)
+        box[:, 0] = np.clip(box[:, 0], 0, width - 1)
+        box[:, 1] = np.clip(box[:, 1], 0, height - 1)
+        if cv2.contourArea(box) >= 16:
+            positions.append((class_id, box))
+    return positions
+
+
+def _background(width, height, seed):
+    rng = np.random.default_rng(seed)
+    # Mown-grass stripes with low-saturation noise
+    background = np.empty((height, width, 3), np.uint8)
+    stripes = ((np.arange(width) // max(1, width // 12)) % 2).astype(np.int16) * 12
+    noise = rng.integers(-10, 11, size=(height, width), dtype=np.int16)
+    background[:, :, 0] = np.clip(60 + noise, 0, 255)
+    background[:, :, 1] = np.clip(110 + stripes[None, :] + noise, 0, 255)
+    background[:, :, 2] = np.clip(70 + noise, 0, 255)
+    return background
+
+
+def _board_texture(width, height, seed):
+    rng = np.random.default_rng(seed + 1)
+    texture = rng.integers(25, 60, size=(height, width * 2), dtype=np.uint8)
+    return cv2.cvtColor(texture, cv2.COLOR_GRAY2BGR)
+
+
+def render_frame(frame_index, width, height, fps=25.0, background=None, board=None, seed=0):
+    """Render one synthetic frame"""
+    if background is None:
+        background = _background(width, height, seed)
+    if board is None:
+        board = _board_texture(width, max(8, int(height * 0.1)), seed)
+    frame = background.copy()
+    board_top = int(height * 0.12)
+    board_height = board.shape[0]
+    shift = int(frame_index / float(fps) * width * 0.1) % width
+    frame[board_top:board_top + board_height] = board[:, shift:shift + width]
+    font_scale = max(0.3, height / 1200.0)
+    for class_id, polygon in logo_positions(frame_index, width, height, fps):
+        name, color = LOGOS[class_id]
+        cv2.fillConvexPoly(frame, polygon.astype(np.int32), color)
+        x, y = polygon[:, 0].min(), polygon[:, 1].max()
+        cv2.putText(frame, name, (int(x) + 2, int(y) - 3), cv2.FONT_HERSHEY_SIMPLEX, font_scale,
+                    (255, 255, 255), 1, cv2.LINE_AA)
+    return frame
+
+
+def make_synthetic_video(path, width=1280, height=720, seconds=10.0, fps=25.0, seed=0):
+    """
+    Write a synthetic match-like video (MJPG AVI, no ffmpeg needed) and return its
+    properties. Existing files with the same name are reused.
+    """
+    frames = int(round(seconds * fps))
+    info = {"path": path, "width": width, "height": height, "fps": fps, "frames": frames, "seed": seed}
+    if os.path.exists(path) and os.path.getsize(path) > 0:
+        return info
+    os.makedirs(os.path.dirname(os.path.abspath(path)), exist_ok=True)
+    background = _background(width, height, seed)
+    board = _board_texture(width, max(8, int(height * 0.1)), seed)
+    tmp_path = path + '.tmp.avi'
+    writer = cv2.VideoWriter(tmp_path, cv2.VideoWriter_fourcc(*'MJPG'), fps, (width, height))
+    if not writer.isOpened():
+        raise RuntimeError(f"Cannot write {tmp_path}")
+    for i in range(frames):
+        writer.write(render_frame(i, width, height, fps, background, board, seed))
+    writer.release()
+    os.replace(tmp_path, path)
+    return info
+
+
+class _StubOBB:
+    def __init__(self, boxes):
+        self.conf = np.array([b[1] for b in boxes], dtype=np.float32)
+        self.cls = np.array([b[0] for b in boxes], dtype=np.int64)
+        self.xyxyxyxy = (np.array([b[2] for b in boxes], dtype=np.float32).reshape(-1, 4, 2)
+                         if boxes else np.zeros((0, 4, 2), np.float32))
+
+
+class _StubResult:
+    def __init__(self, boxes):
+        self.obb = _StubOBB(boxes)
+
+
+class StubDetector:
+    """
+    Deterministic CPU stand-in for the YOLO OBB model on synthetic videos.
+
+    Finds the logo colour patches by HSV segmentation and returns results with the
+    same obb.conf / obb.cls / obb.xyxyxyxy layout as the model (pixel coordinates of
+    the frame it was given). Accepts single frames and lists of frames (batching).
+    """
+
+    def __init__(self, imgsz=1280, min_area=24):
+        self.overrides = {'imgsz': imgsz}
+        self.min_area = min_area
+
+    def __call__(self, frame, **kwargs):
+        if isinstance(frame, list):
+            return [self._detect(f) for f in frame]
+        return [self._detect(frame)]
+
+    def _detect(self, frame):
+        hsv = cv2.cvtColor(frame, cv2.COLOR_BGR2HSV)
+        saturated = cv2.inRange(hsv, (0, 170, 140), (180, 255, 255))
+        hue = hsv[:, :, 0]
+        boxes = []
+        for class_id, logo_hue in enumerate(LOGO_HUES):
+            distance = cv2.absdiff(hue, np.full_like(hue, logo_hue))
+            # Hue wraps around at 180
+            distance = cv2.min(distance, 180 - distance)
+            mask = cv2.bitwise_and(saturated, cv2.inRange(distance, 0, 6))
+            contours, _ = cv2.findContours(mask, cv2.RETR_EXTERNAL, cv2.CHAIN_APPROX_SIMPLE)
+            for contour in contours:
+                area = cv2.contourArea(contour)
+                if area < self.min_area:
+                    continue
+                rect = cv2.minAreaRect(contour)
+                fill = area / max(1.0, rect[1][0] * rect[1][1])
+                boxes.append((class_id, round(0.5 + 0.5 * min(1.0, fill), 3), cv2.boxPoints(rect)))
+        return _StubResult(boxes)
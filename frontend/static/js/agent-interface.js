@@ -48,20 +48,45 @@ class AgentInterface {
         }
     }
 
+    handleTaskStatus(data) {
+        if (data.status !== 'not_found' && this.loadingText) {
+            this.loadingText.textContent = data.message;
+        }
+
+        if (data.is_complete) {
+            this.loadingSpinner.style.display = 'none';
+            this.responseElement.style.display = 'block';
+            this.renderAgentResponseUI(data.result);
+            return true;
+        }
+        return false;
+    }
+
     pollTaskStatus(taskId) {
+        // Prefer status pushed by the server; fall back to polling if the stream fails
+        if (window.EventSource) {
+            const source = new EventSource(`/api/agent_task_status/${taskId}/stream`);
+            let finished = false;
+            source.addEventListener('status', (event) => {
+                finished = this.handleTaskStatus(JSON.parse(event.data));
+                if (finished) source.close();
+            });
+            source.onerror = () => {
+                source.close();
+                if (!finished) this.pollTaskStatusFallback(taskId);
+            };
+            return;
+        }
+        this.pollTaskStatusFallback(taskId);
+    }
+
+    pollTaskStatusFallback(taskId) {
         const interval = setInterval(() => {
             fetch(`/api/agent_task_status/${taskId}`)
                 .then(response => response.json())
                 .then(data => {
-                    if (data.status !== 'not_found' && this.loadingText) {
-                        this.loadingText.textContent = data.message;
-                    }
-
-                    if (data.is_complete) {
+                    if (this.handleTaskStatus(data)) {
                         clearInterval(interval);
-                        this.loadingSpinner.style.display = 'none';
-                        this.responseElement.style.display = 'block';
-                        this.renderAgentResponseUI(data.result);
                     }
                 })
                 .catch(error => {
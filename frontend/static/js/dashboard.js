@@ -42,6 +42,9 @@ class Dashboard {
         const data = await response.json();
         this.logoStats = data.logo_stats || {};
         this.videoMetadata = data.video_metadata || {};
+        // Snapshot published while the video is still being processed
+        this.partial = !!data.partial;
+        document.getElementById('partial-badge')?.classList.toggle('d-none', !this.partial);
         // Preload per-frame series if video for segment filtering
         if (this.fileType === 'video') {
             try {
@@ -57,9 +60,9 @@ class Dashboard {
                 }
             } catch {}
             try {
-                const tlResp = await fetch(`/api/timeline_stats/${this.fileHash}`);
+                const tlResp = await fetch(`/api/timeline_intervals/${this.fileHash}`);
                 if (tlResp.ok) {
-                    this.timelineStats = await tlResp.json();
+                    this.timelineIntervals = (await tlResp.json()).intervals;
                 }
             } catch {}
         }
@@ -335,9 +338,9 @@ class Dashboard {
             logos.forEach(logo => {
                 const covSeries = covData[logo] || [];
                 const promSeries = promData[logo] || [];
-                const presentFrames = (this.timelineStats && this.timelineStats[logo]) || [];
-                // Convert presence list to a Set for O(1)
-                const presentSet = new Set(presentFrames);
+                // Runs of frames present, walked alongside the frame loop
+                const runs = (this.timelineIntervals && this.timelineIntervals[logo]) || [];
+                let run = 0;
 
                 let start = null;
                 const flush = (endFrame) => {
@@ -350,7 +353,8 @@ class Dashboard {
                 // Iterate by frame index based on whichever series is longest
                 const maxLen = Math.max(covSeries.length, promSeries.length);
                 for (let f = 0; f < maxLen; f++) {
-                    const isPresent = presentSet.size === 0 ? true : presentSet.has(f + 1);
+                    while (run < runs.length && runs[run][1] < f + 1) run++;
+                    const isPresent = runs.length === 0 ? true : (run < runs.length && runs[run][0] <= f + 1);
                     const covOk = (covSeries[f] || 0) >= minCov;
                     const promOk = (promSeries[f] || 0) >= minProm;
                     if (isPresent && covOk && promOk) {
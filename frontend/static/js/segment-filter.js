@@ -76,8 +76,8 @@ class SegmentFilter {
         logos.forEach(logo => {
             const covSeries = covData[logo] || [];
             const promSeries = promData[logo] || [];
-            const presentFrames = (this.dashboard.timelineStats && this.dashboard.timelineStats[logo]) || [];
-            const presentSet = new Set(presentFrames);
+            const runs = (this.dashboard.timelineIntervals && this.dashboard.timelineIntervals[logo]) || [];
+            let run = 0;
 
             let start = null;
             const flush = (endFrame) => {
@@ -89,7 +89,8 @@ class SegmentFilter {
 
             const maxLen = Math.max(covSeries.length, promSeries.length);
             for (let f = 0; f < maxLen; f++) {
-                const isPresent = presentSet.size === 0 ? true : presentSet.has(f + 1);
+                while (run < runs.length && runs[run][1] < f + 1) run++;
+                const isPresent = runs.length === 0 ? true : (run < runs.length && runs[run][0] <= f + 1);
                 const covOk = (covSeries[f] || 0) >= minCov;
                 const promOk = (promSeries[f] || 0) >= minProm;
                 if (isPresent && covOk && promOk) {
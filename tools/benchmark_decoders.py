@@ -0,0 +1,60 @@
+#!/usr/bin/env python3
+"""
+Benchmark decode throughput of the available video decoder backends.
+
+Example:
+    python tools/benchmark_decoders.py match.mp4 --backends opencv ffmpeg --threads 0 4 --frames 1000
+"""
+import argparse
+import json
+import os
+import sys
+
+# Add the project root to the path so we can import the backend package
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from backend.core.video_decoder import benchmark_decoder
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Benchmark video decoder backends')
+    parser.add_argument('source', help='Video file or stream URL')
+    parser.add_argument('--backends', nargs='+', default=['opencv', 'ffmpeg'], help='Decoder backends to compare')
+    parser.add_argument('--threads', nargs='+', type=int, default=[0], help='Decoder thread counts to try (0 = auto)')
+    parser.add_argument('--pixel-format', default='bgr24', help='Output pixel format (bgr24, rgb24, gray)')
+    parser.add_argument('--size', default=None, help='Optional output size WIDTHxHEIGHT to scale to while decoding')
+    parser.add_argument('--frames', type=int, default=None, help='Maximum number of frames to decode')
+    parser.add_argument('--json', action='store_true', help='Print results as JSON')
+    args = parser.parse_args()
+
+    output_size = None
+    if args.size:
+        w, h = args.size.lower().split('x')
+        output_size = (int(w), int(h))
+
+    results = []
+    for backend in args.backends:
+        for threads in args.threads:
+            try:
+                results.append(benchmark_decoder(
+                    args.source, backend, max_frames=args.frames,
+                    threads=threads, pixel_format=args.pixel_format, output_size=output_size
+                ))
+            except Exception as e:
+                results.append({"backend": backend, "threads": threads, "error": str(e)})
+
+    if args.json:
+        print(json.dumps(results, indent=2))
+        return
+
+    print(f"{'backend':<8} {'threads':>7} {'size':>11} {'frames':>7} {'seconds':>8} {'fps':>9}")
+    for r in results:
+        if 'error' in r:
+            print(f"{r['backend']:<8} {r['threads']:>7} error: {r['error']}")
+            continue
+        size = f"{r['width']}x{r['height']}"
+        print(f"{r['backend']:<8} {r['threads']:>7} {size:>11} {r['frames']:>7} {r['decode_seconds']:>8.2f} {r['fps']:>9.1f}")
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,154 @@
+#!/usr/bin/env python3
+"""
+Serve a video file as a live HLS stream for testing real-time processing locally.
+
+The video is cut into MPEG-TS segments with ffmpeg once, then the playlist exposes
+a sliding window of the segments that "exist" at the current wall-clock time, the
+way a live encoder would. Segments are published at real-time rate and the playlist
+never carries #EXT-X-ENDLIST (unless --no-loop is given and the video ran out).
+
+Example:
+    python tools/hls_live_standin.py match.mp4 --port 8090
+    SPONSORSPOTLIGHT_REALTIME=1 ... then process http://127.0.0.1:8090/live.m3u8
+"""
+import argparse
+import math
+import os
+import subprocess
+import sys
+import tempfile
+import time
+from http.server import ThreadingHTTPServer, BaseHTTPRequestHandler
+
+
+def segment_video(source, out_dir, segment_seconds):
+    """Cut the source into TS segments; returns a list of (filename, duration)"""
+    playlist = os.path.join(out_dir, 'vod.m3u8')
+    subprocess.run([
+        'ffmpeg', '-hide_banner', '-loglevel', 'error', '-y', '-i', source,
+        '-c:v', 'libx264', '-preset', 'veryfast', '-an',
+        '-force_key_frames', f'expr:gte(t,n_forced*{segment_seconds})',
+        '-f', 'hls', '-hls_time', str(segment_seconds), '-hls_list_size', '0',
+        '-hls_segment_filename', os.path.join(out_dir, 'seg%05d.ts'), playlist
+    ], check=True)
+    segments = []
+    duration = None
+    with open(playlist) as f:
+        for line in f:
+            line = line.strip()
+            if line.startswith('#EXTINF:'):
+                duration = float(line.split(':', 1)[1].split(',')[0])
+            elif line and not line.startswith('#') and duration is not None:
+                segments.append((line, duration))
+                duration = None
+    return segments
+
+
+class LivePlaylist:
+    """Sliding-window live playlist over pre-cut segments, advancing with wall-clock time"""
+
+    def __init__(self, segments, window=6, loop=True):
+        self.segments = segments
+        self.window = window
+        self.loop = loop
+        self.started = time.monotonic()
+        self.total_duration = sum(d for _, d in segments)
+
+    def _published(self):
+        """Number of segments fully published so far (counting loops)"""
+        elapsed = time.monotonic() - self.started
+        loops = int(elapsed // self.total_duration) if self.loop else 0
+        count = loops * len(self.segments)
+        remaining = elapsed - loops * self.total_duration
+        for _, duration in self.segments:
+            if remaining < duration:
+                break
+            remaining -= duration
+            count += 1
+        if not self.loop:
+            count = min(count, len(self.segments))
+        # Start with a few segments available, like a live stream joined mid-way
+        return max(count, min(3, len(self.segments)))
+
+    def render(self):
+        published = self._published()
+        first = max(0, published - self.window)
+        target = int(math.ceil(max(d for _, d in self.segments)))
+        lines = [
+            '#EXTM3U',
+            '#EXT-X-VERSION:3',
+            f'#EXT-X-TARGETDURATION:{target}',
+            f'#EXT-X-MEDIA-SEQUENCE:{first}',
+        ]
+        for seq in range(first, published):
+            name, duration = self.segments[seq % len(self.segments)]
+            if seq > first and seq % len(self.segments) == 0:
+                lines.append('#EXT-X-DISCONTINUITY')
+            lines.append(f'#EXTINF:{duration:.3f},')
+            # Sequence-numbered URIs so loops look like new segments to the client
+            lines.append(f'{seq}/{name}')
+        if not self.loop and published >= len(self.segments) and \
+                time.monotonic() - self.started >= self.total_duration:
+            lines.append('#EXT-X-ENDLIST')
+        return '\n'.join(lines) + '\n'
+
+
+def make_handler(playlist, segment_dir):
+    class Handler(BaseHTTPRequestHandler):
+        def do_GET(self):
+            path = self.path.split('?', 1)[0]
+            if path == '/live.m3u8':
+                body = playlist.render().encode()
+                content_type = 'application/vnd.apple.mpegurl'
+            else:
+                name = os.path.basename(path)
+                file_path = os.path.join(segment_dir, name)
+                if not name.endswith('.ts') or not os.path.isfile(file_path):
+                    self.send_error(404)
+                    return
+                with open(file_path, 'rb') as f:
+                    body = f.read()
+                content_type = 'video/mp2t'
+            self.send_response(200)
+            self.send_header('Content-Type', content_type)
+            self.send_header('Content-Length', str(len(body)))
+            self.send_header('Cache-Control', 'no-cache')
+            self.end_headers()
+            self.wfile.write(body)
+
+        def log_message(self, format, *args):
+            pass
+
+    return Handler
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Serve a video file as a live HLS stream')
+    parser.add_argument('source', help='Video file to stream')
+    parser.add_argument('--host', default='127.0.0.1')
+    parser.add_argument('--port', type=int, default=8090)
+    parser.add_argument('--segment-seconds', type=float, default=2.0, help='Target segment duration')
+    parser.add_argument('--window', type=int, default=6, help='Segments listed in the live playlist')
+    parser.add_argument('--no-loop', action='store_true', help='End the stream when the video ends')
+    args = parser.parse_args()
+
+    with tempfile.TemporaryDirectory(prefix='hls_standin_') as segment_dir:
+        print(f"Segmenting {args.source} ...")
+        segments = segment_video(args.source, segment_dir, args.segment_seconds)
+        if not segments:
+            print("No segments produced")
+            sys.exit(1)
+        playlist = LivePlaylist(segments, window=args.window, loop=not args.no_loop)
+        server = ThreadingHTTPServer((args.host, args.port), make_handler(playlist, segment_dir))
+        print(f"Live stream at http://{args.host}:{args.port}/live.m3u8 "
+              f"({len(segments)} segments, {playlist.total_duration:.1f}s per loop)")
+        try:
+            server.serve_forever()
+        except KeyboardInterrupt:
+            pass
+        finally:
+            server.server_close()
+
+
+if __name__ == '__main__':
+    main()
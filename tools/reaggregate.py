@@ -0,0 +1,67 @@
+#!/usr/bin/env python3
+"""
+Rebuild the statistics of a processed video from its stored detections with other
+post-processing parameters, without re-running the model.
+
+Examples:
+    python tools/reaggregate.py frontend/static/results/<hash> --min-detections 20
+    python tools/reaggregate.py frontend/static/results/<hash> --min-confidence 0.5 --prominence-weights 0.5 0.5
+    python tools/reaggregate.py frontend/static/results/<hash> --high-prominence 0.7 --apply
+"""
+import argparse
+import json
+import os
+import sys
+import time
+
+# Add the project root to the path so we can import the backend package
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from backend.core.reaggregation import reaggregate
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Rebuild stats.json and per-frame series from stored detections')
+    parser.add_argument('result_dir', help='Result directory of a processed video')
+    parser.add_argument('--min-detections', type=int, default=None, help='Detections a brand needs to be reported')
+    parser.add_argument('--min-confidence', type=float, default=None, help='Drop detections below this confidence')
+    parser.add_argument('--prominence-weights', type=float, nargs=2, default=None, metavar=('CENTER', 'SIZE'),
+                        help='Weights of center proximity and size in the prominence score')
+    parser.add_argument('--high-prominence', type=float, default=None,
+                        help='Prominence score counted as high-prominence time')
+    parser.add_argument('--logo-groups', default=None, help='JSON file mapping class names to brands')
+    output = parser.add_mutually_exclusive_group()
+    output.add_argument('--output', default=None, help='Output directory (default: <result_dir>/reaggregated/<variant>)')
+    output.add_argument('--apply', action='store_true', help="Replace the result directory's own outputs")
+    parser.add_argument('--json', action='store_true', help='Print the stats as JSON')
+    args = parser.parse_args()
+
+    params = {
+        "min_detections": args.min_detections,
+        "min_confidence": args.min_confidence,
+        "prominence_weights": args.prominence_weights,
+        "prominence_high_threshold": args.high_prominence
+    }
+    if args.logo_groups:
+        with open(args.logo_groups) as f:
+            params["logo_groups"] = json.load(f)
+    started = time.perf_counter()
+    try:
+        stats = reaggregate(args.result_dir, params, output_dir=args.result_dir if args.apply else args.output)
+    except (ValueError, RuntimeError, FileNotFoundError) as e:
+        print(f"Error: {e}", file=sys.stderr)
+        sys.exit(1)
+    elapsed = time.perf_counter() - started
+
+    if args.json:
+        print(json.dumps(stats, indent=2))
+        return
+    print(f"Re-aggregated {stats['video_metadata']['total_frames']} frames in {elapsed:.2f}s")
+    print(f"{'brand':<24} {'detections':>10} {'time':>8} {'%':>6} {'cov avg':>8} {'prom avg':>9} {'high prom':>9}")
+    for brand, s in sorted(stats['logo_stats'].items(), key=lambda item: -item[1]['time']):
+        print(f"{brand:<24} {s['detections']:>10} {s['time']:>8.2f} {s['percentage']:>6.2f} "
+              f"{s['coverage_avg_present']:>8.2f} {s['prominence_avg_present']:>9.2f} {s['prominence_high_time']:>9.2f}")
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,67 @@
+#!/usr/bin/env python3
+"""
+Minimal HTTP endpoint that receives brand events POSTed as JSON and prints them.
+
+Example:
+    python tools/webhook_receiver.py --port 8099 --out events.jsonl
+    SPONSORSPOTLIGHT_EVENT_WEBHOOK=http://127.0.0.1:8099/events python tools/run_app.py
+"""
+import argparse
+import json
+import threading
+import time
+from http.server import ThreadingHTTPServer, BaseHTTPRequestHandler
+
+
+def make_handler(out_path=None, delay=0.0):
+    lock = threading.Lock()
+
+    class Handler(BaseHTTPRequestHandler):
+        def do_POST(self):
+            length = int(self.headers.get('Content-Length') or 0)
+            body = self.rfile.read(length)
+            try:
+                event = json.loads(body or b'{}')
+            except ValueError:
+                self.send_error(400, 'Invalid JSON')
+                return
+            if delay > 0:
+                # Simulate a slow consumer
+                time.sleep(delay)
+            latency = time.time() - event['emitted_at'] if 'emitted_at' in event else None
+            with lock:
+                latency_str = f" (+{latency * 1000:.0f} ms)" if latency is not None else ""
+                print(f"{event.get('event')} {event.get('brand')} "
+                      f"{event.get('start_time')}-{event.get('end_time')}s{latency_str}")
+                if out_path:
+                    with open(out_path, 'a') as f:
+                        f.write(json.dumps(event) + "\n")
+            self.send_response(204)
+            self.end_headers()
+
+        def log_message(self, format, *args):
+            pass
+
+    return Handler
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Receive brand event webhooks')
+    parser.add_argument('--host', default='127.0.0.1')
+    parser.add_argument('--port', type=int, default=8099)
+    parser.add_argument('--out', default=None, help='Append received events to this JSONL file')
+    parser.add_argument('--delay', type=float, default=0.0, help='Seconds to wait before answering each event')
+    args = parser.parse_args()
+
+    server = ThreadingHTTPServer((args.host, args.port), make_handler(args.out, args.delay))
+    print(f"Listening for events on http://{args.host}:{args.port}/")
+    try:
+        server.serve_forever()
+    except KeyboardInterrupt:
+        pass
+    finally:
+        server.server_close()
+
+
+if __name__ == '__main__':
+    main()